@@ -0,0 +1,112 @@
+"""
+common/api_cache.py — Cache đọc qua (read-through) cho TaskifyAPI, theo user.
+
+Mỗi mục được khoá bởi (resource, user_id, variant): ``variant`` phân biệt các
+truy vấn khác nhau trên cùng tài nguyên (vd. limit/search của notes).
+``invalidate(resource, user_id)`` xoá mọi variant của user đó, để một thao tác
+tạo/sửa/xoá của chính action server không bao giờ để lại dữ liệu cũ. Một lần
+đọc bắt đầu trước khi invalidate sẽ không được ghi vào cache (xem
+``generation``).
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+TASKS = "tasks"
+NOTES = "notes"
+FINANCE_CATEGORIES = "finance_categories"
+
+_Key = Tuple[str, str, Hashable]
+
+
+class ApiCache:
+    """TTL + LRU cache of decoded response bodies, with hit-rate counters."""
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[_Key, Tuple[float, Any]]" = OrderedDict()
+        # (resource, user_id) -> keys of its cached variants
+        self._index: Dict[Tuple[str, str], Set[_Key]] = {}
+        # Bumped by every invalidation; see ``generation``.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, resource: str, user_id: str, variant: Hashable = None) -> Optional[Any]:
+        """A copy of the cached body, or None on a miss."""
+        key = (resource, user_id, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._drop(key)
+                self._counts["expired"] += 1
+                entry = None
+            if entry is None:
+                self._counts["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            data = entry[1]
+        # Callers own what they get back; the cached body stays untouched.
+        return copy.deepcopy(data)
+
+    def generation(self) -> int:
+        """Take before a read and pass to ``put``: a read overtaken by any
+        invalidation is not cached, as it may predate the mutation."""
+        return self._generation
+
+    def put(
+        self, resource: str, user_id: str, variant: Hashable, data: Any, generation: int
+    ) -> None:
+        if not self.enabled:
+            return
+        key = (resource, user_id, variant)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(data))
+            self._entries.move_to_end(key)
+            self._index.setdefault((resource, user_id), set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self._counts["evictions"] += 1
+
+    def invalidate(self, resource: str, user_id: str) -> None:
+        """Forget every cached variant of one user's resource."""
+        with self._lock:
+            self._generation += 1
+            keys = self._index.pop((resource, user_id), set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self._counts["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters since start plus ``hit_rate`` and the current ``size``."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counts)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _drop(self, key: _Key) -> None:
+        self._entries.pop(key, None)
+        variants = self._index.get(key[:2])
+        if variants is not None:
+            variants.discard(key)
+            if not variants:
+                del self._index[key[:2]]
@@ -1,10 +1,53 @@
 """
 common/api_utils.py — Tiện ích gọi HTTP API nội bộ.
+
+``get_api_client()`` trả về client dùng chung cho mọi action: một
+``aiohttp.ClientSession`` giữ kết nối keep-alive tới TaskifyAPI, timeout riêng
+cho từng nhóm endpoint (tasks, notes, finance, ai). Mọi lời gọi đều là
+coroutine, nên một request chậm không chặn event loop của action server.
+Danh sách task, note và danh mục tài chính được cache theo user
+(``common/api_cache.py``); các thao tác ghi qua client tự xoá cache liên quan.
+Mỗi nhóm endpoint có circuit breaker riêng (``common/circuit_breaker.py``), và
+``api_deadline`` giới hạn tổng thời gian gọi API của một lần chạy action.
 """
 
-from typing import Dict, Optional, Tuple
+import asyncio
+import atexit
+import functools
+import json as jsonlib
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import aiohttp
+
+from actions.common.api_cache import FINANCE_CATEGORIES, NOTES, TASKS, ApiCache
+from actions.common.circuit_breaker import CircuitBreaker
+from actions.config import (
+    ACTION_DEADLINE,
+    API_BREAKER_COOLDOWN,
+    API_BREAKER_FAILURES,
+    API_BULK_CONCURRENCY,
+    API_CACHE_SIZE,
+    API_CACHE_TTL,
+    API_CONNECT_TIMEOUT,
+    API_POOL_SIZE,
+    API_TIMEOUTS,
+    RASA_API_KEY,
+    REQUEST_TIMEOUT,
+    TASKIFY_API_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Log the cache counters every this many lookups.
+_CACHE_STATS_EVERY = 500
 
-from actions.config import RASA_API_KEY
+# time.monotonic() by which the current action run's API calls must finish.
+_deadline: ContextVar[Optional[float]] = ContextVar("taskify_api_deadline", default=None)
 
 
 def get_api_headers() -> Dict[str, str]:
@@ -18,3 +61,437 @@ def split_sender(sender_id: str) -> Tuple[str, Optional[str]]:
         user, session = sender_id.split(":", 1)
         return user, session
     return sender_id, None
+
+
+class ApiError(Exception):
+    """A TaskifyAPI call failed before a response came back."""
+
+
+class ApiTimeout(ApiError):
+    """TaskifyAPI did not answer within the endpoint's timeout."""
+
+
+class ApiConnectionError(ApiError):
+    """TaskifyAPI could not be reached."""
+
+
+class CircuitOpenError(ApiConnectionError):
+    """An endpoint family's circuit is open; the call was not sent."""
+
+
+def api_deadline(seconds: float = ACTION_DEADLINE) -> Callable:
+    """Decorate an action's ``run`` so all its API calls share one budget.
+
+    Each call gets at most what is left of the budget; once it is spent,
+    calls raise ``ApiTimeout`` without being sent. A budget already set by
+    an enclosing run is only ever shortened.
+    """
+
+    def decorate(run: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(run)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            deadline = time.monotonic() + seconds
+            current = _deadline.get()
+            token = _deadline.set(deadline if current is None else min(current, deadline))
+            try:
+                return await run(*args, **kwargs)
+            finally:
+                _deadline.reset(token)
+
+        return wrapper
+
+    return decorate
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left in the current action run's budget, or None if unbounded."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@dataclass
+class ApiResponse:
+    """Status code and decoded JSON body (None when empty or not JSON)."""
+
+    status_code: int
+    data: Any = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 300
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise ApiError(f"TaskifyAPI returned status {self.status_code}")
+
+
+@dataclass
+class BulkResult:
+    """Per-id outcome of a bulk operation, in request order."""
+
+    succeeded: List[Any] = field(default_factory=list)
+    failed: List[Any] = field(default_factory=list)
+
+
+class TaskifyApiClient:
+    """Typed client for TaskifyAPI's /api/internal endpoints.
+
+    One instance is shared by all actions (see ``get_api_client``). The
+    aiohttp session is opened on first use inside the action server's event
+    loop, and reopened (the old one closed) if a different loop calls the
+    client. ``get_api_client`` closes it when the process exits.
+    """
+
+    def __init__(
+        self,
+        base_url: str = TASKIFY_API_URL,
+        timeouts: Optional[Dict[str, float]] = None,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+        pool_size: int = API_POOL_SIZE,
+        cache_size: int = API_CACHE_SIZE,
+        cache_ttl: float = API_CACHE_TTL,
+        bulk_concurrency: int = API_BULK_CONCURRENCY,
+        breaker_failures: int = API_BREAKER_FAILURES,
+        breaker_cooldown: float = API_BREAKER_COOLDOWN,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = dict(API_TIMEOUTS if timeouts is None else timeouts)
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self.cache = ApiCache(cache_size, cache_ttl)
+        self.bulk_concurrency = max(1, bulk_concurrency)
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Set["asyncio.Future[None]"] = set()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and not self._session.closed:
+                self._close_superseded(self._session, self._loop)
+            self._session = aiohttp.ClientSession(
+                headers=get_api_headers(),
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+            )
+            self._loop = loop
+        return self._session
+
+    def _close_superseded(
+        self, session: aiohttp.ClientSession, loop: Optional[asyncio.AbstractEventLoop]
+    ) -> None:
+        """Close a session opened by another event loop than the running one."""
+        if loop is not None and not loop.is_closed():
+            # Its connections belong to that loop; close them there.
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        # A closed loop can't run anything. Closing from here still empties
+        # the pool; the sockets are freed along with their transports.
+        future = asyncio.ensure_future(session.close())
+        self._closing.add(future)
+        future.add_done_callback(self._closing.discard)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def close_at_exit(self) -> None:
+        """Close the session from outside any running loop (process exit)."""
+        if self._session is None or self._session.closed:
+            return
+        loop = self._loop
+        if loop is not None and not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(self.close())
+        else:
+            asyncio.run(self.close())
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers.setdefault(
+                endpoint,
+                CircuitBreaker(endpoint, self.breaker_failures, self.breaker_cooldown),
+            )
+        return breaker
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+    ) -> ApiResponse:
+        """Send one request; ``endpoint`` picks the timeout and circuit breaker."""
+        read_timeout = self.timeouts.get(endpoint, REQUEST_TIMEOUT)
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            raise ApiTimeout(f"{method} {path}: action deadline exceeded")
+
+        breaker = self._breaker(endpoint)
+        if not breaker.allow():
+            raise CircuitOpenError(
+                f"{method} {path}: circuit '{endpoint}' is {breaker.state}, "
+                f"retry in {breaker.retry_after():.1f}s"
+            )
+
+        timeout = aiohttp.ClientTimeout(
+            total=remaining,
+            sock_connect=self.connect_timeout,
+            sock_read=read_timeout,
+        )
+        try:
+            async with self._get_session().request(
+                method,
+                f"{self.base_url}/api/internal/{path}",
+                params=_query(params),
+                json=json,
+                timeout=timeout,
+            ) as response:
+                status, body = response.status, await response.read()
+        except asyncio.TimeoutError as exc:
+            # aiohttp raises the same errors whichever timer fired. If the
+            # budget is spent, the run's deadline cut the call short, which
+            # says little about the backend; otherwise connect/read timed out.
+            budget_left = remaining_budget()
+            if budget_left is not None and budget_left <= 0:
+                breaker.release()
+            else:
+                breaker.record_failure()
+            raise ApiTimeout(f"{method} {path} timed out") from exc
+        except aiohttp.ClientError as exc:
+            breaker.record_failure()
+            raise ApiConnectionError(f"{method} {path}: {exc}") from exc
+        except BaseException:
+            breaker.release()
+            raise
+
+        if status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        try:
+            data = jsonlib.loads(body) if body else None
+        except ValueError:
+            data = None
+        return ApiResponse(status, data)
+
+    async def _cached_get(
+        self,
+        resource: str,
+        user_id: str,
+        path: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> ApiResponse:
+        """GET through the cache; only 200 responses are stored."""
+        query = _query(params)
+        variant = tuple(sorted(query.items())) if query else None
+        data = self.cache.get(resource, user_id, variant)
+        stats = self.cache.stats()
+        if (stats["hits"] + stats["misses"]) % _CACHE_STATS_EVERY == 0:
+            logger.info("TaskifyAPI cache: %s", stats)
+        if data is not None:
+            return ApiResponse(200, data)
+
+        generation = self.cache.generation()
+        response = await self.request("GET", path, endpoint, params=params)
+        if response.status_code == 200 and response.data is not None:
+            self.cache.put(resource, user_id, variant, response.data, generation)
+        return response
+
+    async def _write(
+        self,
+        invalidates: Iterable[str],
+        user_id: str,
+        method: str,
+        path: str,
+        endpoint: str,
+        json: Any = None,
+    ) -> ApiResponse:
+        """Send a mutation and drop the user's cached copies of ``invalidates``."""
+        try:
+            return await self.request(method, path, endpoint, json=json)
+        finally:
+            # Also after a timeout or an error status: the write may have landed.
+            for resource in invalidates:
+                self.cache.invalidate(resource, user_id)
+
+    async def _bulk(
+        self,
+        invalidates: Iterable[str],
+        user_id: str,
+        ids: Iterable[Any],
+        send: Callable[[Any], Awaitable[ApiResponse]],
+    ) -> BulkResult:
+        """Run ``send`` for each distinct id, ``bulk_concurrency`` at a time."""
+        semaphore = asyncio.Semaphore(self.bulk_concurrency)
+
+        async def one(item: Any) -> bool:
+            async with semaphore:
+                try:
+                    response = await send(item)
+                except ApiError as exc:
+                    logger.warning("Bulk request for user %s, id %s failed: %s", user_id, item, exc)
+                    return False
+            return response.status_code in (200, 204)
+
+        unique = list(dict.fromkeys(ids))
+        try:
+            outcomes = await asyncio.gather(*(one(item) for item in unique))
+        finally:
+            for resource in invalidates:
+                self.cache.invalidate(resource, user_id)
+        result = BulkResult()
+        for item, ok in zip(unique, outcomes):
+            (result.succeeded if ok else result.failed).append(item)
+        return result
+
+    # -- tasks ---------------------------------------------------------------
+
+    async def list_tasks(self, user_id: str, params: Optional[Dict[str, Any]] = None) -> ApiResponse:
+        return await self._cached_get(TASKS, user_id, f"tasks/{user_id}", "tasks", params=params)
+
+    async def create_task(self, user_id: str, payload: Dict[str, Any]) -> ApiResponse:
+        return await self._write((TASKS,), user_id, "POST", f"tasks/{user_id}", "tasks", json=payload)
+
+    async def delete_tasks(self, user_id: str, payload: Dict[str, Any]) -> ApiResponse:
+        return await self._write(
+            (TASKS,), user_id, "POST", f"tasks/{user_id}/delete", "tasks", json=payload
+        )
+
+    async def undo_delete_tasks(self, user_id: str, payload: Dict[str, Any]) -> ApiResponse:
+        return await self._write(
+            (TASKS,), user_id, "POST", f"tasks/{user_id}/undo-delete", "tasks", json=payload
+        )
+
+    # -- notes ---------------------------------------------------------------
+
+    async def list_notes(self, user_id: str, limit: int, search: Optional[str] = None) -> ApiResponse:
+        params: Dict[str, Any] = {"limit": limit}
+        if search:
+            params["search"] = search
+        return await self._cached_get(NOTES, user_id, f"notes/{user_id}", "notes", params=params)
+
+    async def create_note(self, user_id: str, payload: Dict[str, Any]) -> ApiResponse:
+        return await self._write((NOTES,), user_id, "POST", f"notes/{user_id}", "notes", json=payload)
+
+    async def update_note(self, user_id: str, note_id: Any, payload: Dict[str, Any]) -> ApiResponse:
+        return await self._write(
+            (NOTES,), user_id, "PUT", f"notes/{user_id}/{note_id}", "notes", json=payload
+        )
+
+    async def set_note_pin(self, user_id: str, note_id: Any, pinned: bool) -> ApiResponse:
+        return await self._write(
+            (NOTES,), user_id, "PATCH", f"notes/{user_id}/{note_id}/pin", "notes", json=pinned
+        )
+
+    async def delete_note(self, user_id: str, note_id: Any) -> ApiResponse:
+        return await self._write((NOTES,), user_id, "DELETE", f"notes/{user_id}/{note_id}", "notes")
+
+    async def delete_notes(self, user_id: str, note_ids: Iterable[Any]) -> BulkResult:
+        return await self._bulk(
+            (NOTES,),
+            user_id,
+            note_ids,
+            lambda note_id: self.request("DELETE", f"notes/{user_id}/{note_id}", "notes"),
+        )
+
+    # -- finance -------------------------------------------------------------
+
+    async def list_entries(self, user_id: str, params: Optional[Dict[str, Any]] = None) -> ApiResponse:
+        return await self.request("GET", f"finance/{user_id}/entries", "finance", params=params)
+
+    async def create_entry(self, user_id: str, payload: Dict[str, Any]) -> ApiResponse:
+        return await self._write(
+            (FINANCE_CATEGORIES,), user_id, "POST", f"finance/{user_id}/entries", "finance", json=payload
+        )
+
+    async def update_entry(self, user_id: str, entry_id: Any, payload: Dict[str, Any]) -> ApiResponse:
+        return await self._write(
+            (FINANCE_CATEGORIES,),
+            user_id,
+            "PUT",
+            f"finance/{user_id}/entries/{entry_id}",
+            "finance",
+            json=payload,
+        )
+
+    async def delete_entry(self, user_id: str, entry_id: Any) -> ApiResponse:
+        return await self.request("DELETE", f"finance/{user_id}/entries/{entry_id}", "finance")
+
+    async def delete_entries(self, user_id: str, entry_ids: Iterable[Any]) -> BulkResult:
+        return await self._bulk(
+            (),
+            user_id,
+            entry_ids,
+            lambda entry_id: self.request("DELETE", f"finance/{user_id}/entries/{entry_id}", "finance"),
+        )
+
+    async def finance_summary(self, user_id: str, params: Optional[Dict[str, Any]] = None) -> ApiResponse:
+        return await self.request("GET", f"finance/{user_id}/summary", "finance", params=params)
+
+    async def list_categories(self, user_id: str) -> ApiResponse:
+        return await self._cached_get(
+            FINANCE_CATEGORIES, user_id, f"finance/{user_id}/categories", "finance"
+        )
+
+    async def create_category(self, user_id: str, name: str) -> ApiResponse:
+        return await self._write(
+            (FINANCE_CATEGORIES,),
+            user_id,
+            "POST",
+            f"finance/{user_id}/categories",
+            "finance",
+            json={"name": name},
+        )
+
+    async def update_category(self, user_id: str, category_id: Any, name: str) -> ApiResponse:
+        return await self._write(
+            (FINANCE_CATEGORIES,),
+            user_id,
+            "PUT",
+            f"finance/{user_id}/categories/{category_id}",
+            "finance",
+            json={"name": name},
+        )
+
+    async def delete_category(self, user_id: str, category_id: Any) -> ApiResponse:
+        return await self._write(
+            (FINANCE_CATEGORIES,), user_id, "DELETE", f"finance/{user_id}/categories/{category_id}", "finance"
+        )
+
+    # -- ai ------------------------------------------------------------------
+
+    async def ai_fallback(self, user_id: str, text: str, locale: str) -> ApiResponse:
+        return await self.request(
+            "POST", f"ai/fallback/{user_id}", "ai", json={"messageText": text, "locale": locale}
+        )
+
+
+def _query(params: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    """Query string values as requests would send them (None dropped)."""
+    if params is None:
+        return None
+    return {key: str(value) for key, value in params.items() if value is not None}
+
+
+_client: Optional[TaskifyApiClient] = None
+_client_lock = threading.Lock()
+
+
+def get_api_client() -> TaskifyApiClient:
+    """The process-wide client, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TaskifyApiClient()
+                # rasa_sdk has no shutdown hook for action code; the action
+                # server's loop has stopped by the time atexit runs.
+                atexit.register(_client.close_at_exit)
+    return _client
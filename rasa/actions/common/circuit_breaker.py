@@ -0,0 +1,87 @@
+"""
+common/circuit_breaker.py — Circuit breaker cho từng nhóm endpoint TaskifyAPI.
+
+Sau ``failure_threshold`` lỗi liên tiếp (timeout, mất kết nối, 5xx) breaker
+mở: mọi lời gọi bị từ chối ngay trong ``reset_timeout`` giây. Hết thời gian
+đó breaker nửa mở (half-open) và cho đúng một request thăm dò đi qua; thành
+công thì đóng lại, thất bại thì mở tiếp.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; a True in half-open is the probe."""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() < self._opened_at + self.reset_timeout:
+                    return False
+                self._state = HALF_OPEN
+                self._probing = False
+                logger.info("Circuit '%s' half-open, probing TaskifyAPI", self.name)
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Circuit '%s' closed", self.name)
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(
+                        "Circuit '%s' open after %s failure(s); failing fast for %gs",
+                        self.name,
+                        self._failures,
+                        self.reset_timeout,
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """End a request that gave no verdict on the backend's health."""
+        with self._lock:
+            self._probing = False
@@ -3,20 +3,11 @@ common/date_utils.py — Xử lý ngày giờ, parse duckling entity,
                         và chuẩn hóa độ ưu tiên.
 """
 
-import re
-import unicodedata
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
 from actions.common.text_utils import normalize_lower
-
-
-def _fold_ascii(value: Optional[str]) -> str:
-    return (
-        unicodedata.normalize("NFD", normalize_lower(value))
-        .encode("ascii", "ignore")
-        .decode("ascii")
-    )
+from custom_components.temporal_grammar import find_all, find_first, parse_clock
 
 
 # ---------------------------------------------------------------------------
@@ -46,56 +37,7 @@ def parse_time(time_str: Optional[str]) -> Optional[Tuple[int, int]]:
     if not value:
         return None
 
-    if "sáng" in value or "morning" in value:
-        match = re.search(r"(\d{1,2})", value)
-        if match:
-            hour = int(match.group(1))
-            return (hour, 0) if 0 <= hour <= 11 else None
-        return (9, 0)
-    if "trưa" in value or "noon" in value:
-        return (12, 0)
-    if "chiều" in value or "afternoon" in value:
-        match = re.search(r"(\d{1,2})", value)
-        if match:
-            hour = int(match.group(1))
-            if hour < 12:
-                hour += 12
-            return (hour, 0) if hour <= 23 else None
-        return (14, 0)
-    if "tối" in value or "evening" in value or "night" in value:
-        match = re.search(r"(\d{1,2})", value)
-        if match:
-            hour = int(match.group(1))
-            if hour < 12:
-                hour += 12
-            return (hour, 0) if hour <= 23 else None
-        return (19, 0)
-
-    match = re.fullmatch(r"(\d{1,2})h(\d{1,2})?", value)
-    if match:
-        hour = int(match.group(1))
-        minute = int(match.group(2)) if match.group(2) else 0
-        if 0 <= hour <= 23 and 0 <= minute <= 59:
-            return (hour, minute)
-
-    match = re.fullmatch(r"(\d{1,2}):(\d{2})", value)
-    if match:
-        hour = int(match.group(1))
-        minute = int(match.group(2))
-        if 0 <= hour <= 23 and 0 <= minute <= 59:
-            return (hour, minute)
-
-    match = re.fullmatch(r"(\d{1,2})\s*(am|pm)", value)
-    if match:
-        hour = int(match.group(1))
-        if match.group(2) == "pm" and hour != 12:
-            hour += 12
-        elif match.group(2) == "am" and hour == 12:
-            hour = 0
-        if 0 <= hour <= 23:
-            return (hour, 0)
-
-    return None
+    return parse_clock(value)
 
 
 # ---------------------------------------------------------------------------
@@ -123,51 +65,11 @@ def parse_due_date(
         return result_date, inferred_time, had_date
 
     had_date = True
-    if value in {"today", "hôm nay"}:
-        result_date = now
-    elif value in {"tomorrow", "ngày mai"}:
-        result_date = now + timedelta(days=1)
-    elif value in {"ngày kia", "day after tomorrow"}:
-        result_date = now + timedelta(days=2)
-    elif value in {"next week", "tuần sau"}:
-        result_date = now + timedelta(days=7)
-    elif value in {"next month", "tháng sau"}:
-        result_date = now + timedelta(days=30)
-    elif value == "chiều nay":
-        result_date = now
-        inferred_time = (14, 0)
-    elif value == "tối nay":
-        result_date = now
-        inferred_time = (19, 0)
-    elif value == "sáng mai":
-        result_date = now + timedelta(days=1)
-        inferred_time = (9, 0)
-    elif "thứ hai" in value or "monday" in value:
-        result_date = next_weekday(now, 0)
-    elif "thứ ba" in value or "tuesday" in value:
-        result_date = next_weekday(now, 1)
-    elif "thứ tư" in value or "wednesday" in value:
-        result_date = next_weekday(now, 2)
-    elif "thứ năm" in value or "thursday" in value:
-        result_date = next_weekday(now, 3)
-    elif "thứ sáu" in value or "friday" in value:
-        result_date = next_weekday(now, 4)
-    elif "thứ bảy" in value or "saturday" in value:
-        result_date = next_weekday(now, 5)
-    elif "chủ nhật" in value or "sunday" in value:
-        result_date = next_weekday(now, 6)
-    else:
-        for date_format in ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%d/%m"):
-            try:
-                parsed = datetime.strptime(value, date_format)
-                if date_format == "%d/%m":
-                    parsed = parsed.replace(year=now.year)
-                    if parsed.date() < now.date():
-                        parsed = parsed.replace(year=now.year + 1)
-                result_date = now.replace(year=parsed.year, month=parsed.month, day=parsed.day)
-                break
-            except ValueError:
-                continue
+    match = find_first(value, now)
+    if match is not None:
+        anchor = match.anchor
+        result_date = now.replace(year=anchor.year, month=anchor.month, day=anchor.day)
+        inferred_time = match.time
 
     return result_date, inferred_time, had_date
 
@@ -194,6 +96,9 @@ def parse_finance_date(date_str: Optional[str], now: datetime) -> Tuple[datetime
     - dd/MM -> use current year
     - dd -> use current month and year
     - natural-language relative dates keep existing finance behavior
+    - weekdays -> the latest such day, today included; "thứ 6 này" is this
+      week's Friday; a weekday that is still ahead ("thứ 6 tuần sau", or
+      "thứ 6 này" before Friday) is not a date
     """
     result_date = now
     had_date = False
@@ -205,45 +110,16 @@ def parse_finance_date(date_str: Optional[str], now: datetime) -> Tuple[datetime
     if not value:
         return result_date, had_date
 
-    folded_value = _fold_ascii(value)
-
-    had_date = True
-    if folded_value in {"today", "hom nay"}:
-        return now, had_date
-    if folded_value in {"tomorrow", "ngay mai"}:
-        return now + timedelta(days=1), had_date
-    if folded_value in {"ngay kia", "day after tomorrow"}:
-        return now + timedelta(days=2), had_date
-    if folded_value in {"next week", "tuan sau"}:
-        return now + timedelta(days=7), had_date
-    if folded_value in {"next month", "thang sau"}:
-        return now + timedelta(days=30), had_date
-
-    for date_format in ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y"):
-        try:
-            parsed = datetime.strptime(value, date_format)
-            return now.replace(year=parsed.year, month=parsed.month, day=parsed.day), had_date
-        except ValueError:
-            continue
+    # A clock time alone ("lúc 9h") does not date an expense.
+    match = next(
+        (match for match in find_all(value, now, roll_future=False, bare_day=True) if match.dated),
+        None,
+    )
+    if match is None:
+        return result_date, False
 
-    day_month_match = re.fullmatch(r"(\d{1,2})/(\d{1,2})", value)
-    if day_month_match:
-        day = int(day_month_match.group(1))
-        month = int(day_month_match.group(2))
-        try:
-            return now.replace(month=month, day=day), had_date
-        except ValueError:
-            return result_date, False
-
-    day_match = re.fullmatch(r"(\d{1,2})", value)
-    if day_match:
-        day = int(day_match.group(1))
-        try:
-            return now.replace(day=day), had_date
-        except ValueError:
-            return result_date, False
-
-    return result_date, False
+    anchor = match.anchor
+    return now.replace(year=anchor.year, month=anchor.month, day=anchor.day), True
 
 
 # ---------------------------------------------------------------------------
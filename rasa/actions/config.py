@@ -39,6 +39,33 @@ RASA_API_KEY = os.getenv("RASA_API_KEY", "rasa-internal-api-key-taskify-2026")
 # The backend may fan out to slower local providers such as Ollama, so
 # the action server should wait longer than the provider-level timeout.
 REQUEST_TIMEOUT = int(os.getenv("TASKIFY_API_TIMEOUT", "60"))  # seconds
+# CRUD endpoints answer from the database; a minute-long wait there means
+# the backend is unhealthy, not busy. Read timeouts per endpoint family.
+API_TIMEOUTS = {
+    "tasks": float(os.getenv("TASKIFY_API_TASKS_TIMEOUT", "10")),
+    "notes": float(os.getenv("TASKIFY_API_NOTES_TIMEOUT", "10")),
+    "finance": float(os.getenv("TASKIFY_API_FINANCE_TIMEOUT", "10")),
+    "ai": float(REQUEST_TIMEOUT),
+}
+API_CONNECT_TIMEOUT = float(os.getenv("TASKIFY_API_CONNECT_TIMEOUT", "3"))  # seconds
+# Keep-alive connections to TaskifyAPI kept open by the shared client.
+API_POOL_SIZE = int(os.getenv("TASKIFY_API_POOL_SIZE", "20"))
+# Requests in flight at once when deleting many notes or finance entries.
+API_BULK_CONCURRENCY = int(os.getenv("TASKIFY_API_BULK_CONCURRENCY", "8"))
+# Time budget shared by all TaskifyAPI calls of one action run.
+ACTION_DEADLINE = float(os.getenv("TASKIFY_ACTION_DEADLINE", "15"))  # seconds
+# The AI fallback's budget fits a full connect + read, so a stalled AI call
+# hits its own read timeout (and counts against the "ai" circuit) first.
+AI_ACTION_DEADLINE = API_CONNECT_TIMEOUT + API_TIMEOUTS["ai"]
+# Consecutive failures (timeouts, connection errors, 5xx) that open an
+# endpoint family's circuit, and how long it fails fast before probing.
+API_BREAKER_FAILURES = int(os.getenv("TASKIFY_API_BREAKER_FAILURES", "5"))
+API_BREAKER_COOLDOWN = float(os.getenv("TASKIFY_API_BREAKER_COOLDOWN", "30"))  # seconds
+# Read-through cache of task lists, notes and finance categories, per user.
+# Our own mutations invalidate it; the TTL bounds staleness from edits made
+# elsewhere (web app, other devices). 0 disables the cache.
+API_CACHE_TTL = float(os.getenv("TASKIFY_API_CACHE_TTL", "30"))  # seconds
+API_CACHE_SIZE = int(os.getenv("TASKIFY_API_CACHE_SIZE", "1024"))
 
 # ---------------------------------------------------------------------------
 # Logging
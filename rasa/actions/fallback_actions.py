@@ -5,13 +5,12 @@ fallback_actions.py - Dynamic fallback action powered by backend AI fallback pro
 import logging
 from typing import Any, Dict, List, Text
 
-import requests
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 
-from actions.common.api_utils import get_api_headers, split_sender
+from actions.common.api_utils import api_deadline, get_api_client, split_sender
 from actions.common.text_utils import get_locale, t
-from actions.config import REQUEST_TIMEOUT, TASKIFY_API_URL
+from actions.config import AI_ACTION_DEADLINE
 
 logger = logging.getLogger(__name__)
 
@@ -27,22 +26,17 @@ class ActionFallbackGemini(Action):
             "Toi khong hieu. Hay thu hoi ve task, tom tat tuan, hoac tao task moi.",
         )
 
-    def _call_backend_fallback(self, user_id: str, user_text: str, locale: str) -> str:
-        url = f"{TASKIFY_API_URL}/api/internal/ai/fallback/{user_id}"
-        response = requests.post(
-            url,
-            headers=get_api_headers(),
-            json={"messageText": user_text, "locale": locale},
-            timeout=REQUEST_TIMEOUT,
-        )
+    async def _call_backend_fallback(self, user_id: str, user_text: str, locale: str) -> str:
+        response = await get_api_client().ai_fallback(user_id, user_text, locale)
         response.raise_for_status()
-        data: Dict[Text, Any] = response.json() or {}
+        data: Dict[Text, Any] = response.data or {}
         text = str(data.get("text") or "").strip()
         if not text:
             raise ValueError("Backend AI fallback returned empty text")
         return text
 
-    def run(
+    @api_deadline(AI_ACTION_DEADLINE)
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -54,7 +48,7 @@ class ActionFallbackGemini(Action):
         default_text = self._default_fallback(locale)
 
         try:
-            answer = self._call_backend_fallback(
+            answer = await self._call_backend_fallback(
                 user_id=user_id,
                 user_text=user_text,
                 locale=locale,
@@ -8,15 +8,14 @@ import unicodedata
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Text
 
-import requests
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 
-from actions.config import TASKIFY_API_URL, REQUEST_TIMEOUT
-from actions.common.api_utils import get_api_headers, split_sender
+from actions.common.api_utils import BulkResult, api_deadline, get_api_client, split_sender
 from actions.common.date_utils import extract_duckling_date_value, parse_finance_date
 from actions.common.text_utils import first_entity_value, tracker_slot_or_entity
+from custom_components.temporal_grammar import find_all
 
 logger = logging.getLogger(__name__)
 
@@ -87,23 +86,19 @@ def _parse_amount(raw: Optional[str], text: str) -> Optional[float]:
 
 
 def _parse_date(raw: Optional[str], text: str) -> str:
-    phrase = raw or ""
-    if not phrase:
-        match = re.search(
-            r"(hom nay|ngay mai|ngay kia|tuan sau|thang sau|\d{1,2}/\d{1,2}(?:/\d{2,4})?|\b\d{1,2}\b)",
-            _fold(text),
-        )
-        phrase = match.group(1) if match else ""
-
     now = datetime.now()
-    if phrase:
-        parsed, had_date = parse_finance_date(phrase, now)
-        if had_date:
-            return parsed.date().isoformat()
+    parsed, had_date = parse_finance_date(raw or text, now)
+    if had_date:
+        return parsed.date().isoformat()
 
     return now.date().isoformat()
 
 
+def _mentions_date(text: str) -> bool:
+    matches = find_all(text, datetime.now(), roll_future=False, bare_day=True)
+    return any(match.dated for match in matches)
+
+
 def _resolve_date_value(tracker: Tracker, text: str) -> str:
     duckling_date = extract_duckling_date_value(tracker.latest_message or {})
     if duckling_date:
@@ -133,7 +128,8 @@ class ActionCreateFinanceEntry(Action):
     def name(self) -> Text:
         return "action_create_finance_entry"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
         text = tracker.latest_message.get("text", "").strip()
         amount = _parse_amount(tracker_slot_or_entity(tracker, "finance_amount"), text)
@@ -156,10 +152,9 @@ class ActionCreateFinanceEntry(Action):
         }
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/entries"
-            response = requests.post(url, json=payload, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().create_entry(user_id, payload)
             if response.status_code in [200, 201]:
-                entry = response.json()
+                entry = response.data
                 dispatcher.utter_message(
                     text=f"Đã thêm chi phí: {_entry_label(entry)}",
                     json_message={"type": "finance_entry_list", "entries": [entry]},
@@ -176,18 +171,20 @@ class ActionListFinanceEntries(Action):
     def name(self) -> Text:
         return "action_list_finance_entries"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
-        return _reply_with_entries(dispatcher, user_id, tracker, "Các mục chi tiêu gần đây:")
+        return await _reply_with_entries(dispatcher, user_id, tracker, "Các mục chi tiêu gần đây:")
 
 
 class ActionSearchFinanceEntries(Action):
     def name(self) -> Text:
         return "action_search_finance_entries"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
-        return _reply_with_entries(dispatcher, user_id, tracker, "Kết quả tìm kiếm:")
+        return await _reply_with_entries(dispatcher, user_id, tracker, "Kết quả tìm kiếm:")
 
 
 def _build_entry_query(tracker: Tracker) -> Dict[str, Any]:
@@ -202,9 +199,8 @@ def _build_entry_query(tracker: Tracker) -> Dict[str, Any]:
         params["search"] = keyword.strip()
 
     date_phrase = tracker_slot_or_entity(tracker, "finance_date")
-    folded = _fold(text)
     duckling_date = extract_duckling_date_value(tracker.latest_message or {})
-    if duckling_date or date_phrase or any(term in folded for term in ["hom nay", "ngay mai", "ngay kia", "tuan sau", "thang sau"]) or re.search(r"\b\d{1,2}(?:/\d{1,2}(?:/\d{2,4})?)?\b", folded):
+    if duckling_date or date_phrase or _mentions_date(text):
         date_value = duckling_date or _parse_date(date_phrase, text)
         params["from"] = date_value
         params["to"] = date_value
@@ -212,20 +208,19 @@ def _build_entry_query(tracker: Tracker) -> Dict[str, Any]:
     return params
 
 
-def _reply_with_entries(
+async def _reply_with_entries(
     dispatcher: CollectingDispatcher,
     user_id: str,
     tracker: Tracker,
     heading: str,
 ) -> List[Dict[Text, Any]]:
     try:
-        url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/entries"
-        response = requests.get(url, params=_build_entry_query(tracker), headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+        response = await get_api_client().list_entries(user_id, params=_build_entry_query(tracker))
         if response.status_code != 200:
             dispatcher.utter_message(text="Không lấy được danh sách tài chính.")
             return _reset_finance_slots()
 
-        entries = response.json()
+        entries = response.data
         if not entries:
             dispatcher.utter_message(text="Chưa có mục tài chính nào phù hợp.")
             return _reset_finance_slots()
@@ -245,10 +240,11 @@ class ActionUpdateFinanceEntry(Action):
     def name(self) -> Text:
         return "action_update_finance_entry"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
         text = tracker.latest_message.get("text", "").strip()
-        target = _find_first_entry(user_id, tracker)
+        target = await _find_first_entry(user_id, tracker)
         if target is None:
             dispatcher.utter_message(text="Không tìm thấy mục tài chính để cập nhật.")
             return _reset_finance_slots()
@@ -259,7 +255,7 @@ class ActionUpdateFinanceEntry(Action):
         raw_date = tracker_slot_or_entity(tracker, "finance_date")
         date_value = str(target.get("date", ""))[:10]
         duckling_date = extract_duckling_date_value(tracker.latest_message or {})
-        if duckling_date or raw_date or any(term in _fold(text) for term in ["hom nay", "ngay mai", "ngay kia", "tuan sau", "thang sau"]) or re.search(r"\b\d{1,2}(?:/\d{1,2}(?:/\d{2,4})?)?\b", _fold(text)):
+        if duckling_date or raw_date or _mentions_date(text):
             date_value = duckling_date or _parse_date(raw_date, text)
 
         payload = {
@@ -270,10 +266,9 @@ class ActionUpdateFinanceEntry(Action):
         }
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/entries/{target.get('id')}"
-            response = requests.put(url, json=payload, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().update_entry(user_id, target.get("id"), payload)
             if response.status_code == 200:
-                entry = response.json()
+                entry = response.data
                 dispatcher.utter_message(
                     text=f"Đã cập nhật mục tài chính: {_entry_label(entry)}",
                     json_message={"type": "finance_entry_list", "entries": [entry]},
@@ -290,25 +285,26 @@ class ActionDeleteFinanceEntry(Action):
     def name(self) -> Text:
         return "action_delete_finance_entry"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
         metadata = tracker.latest_message.get("metadata") or {}
         action_name = str(metadata.get("action") or "").strip().lower()
 
         if action_name == "confirm_delete_finance_entry":
             entry_ids = metadata.get("entryIds") or []
-            deleted = _delete_entry_ids(user_id, entry_ids)
-            dispatcher.utter_message(text=f"Đã xóa {deleted} mục tài chính.")
+            deleted = await _delete_entry_ids(user_id, entry_ids)
+            dispatcher.utter_message(text=_deleted_entries_text(deleted))
             return _reset_finance_slots()
 
-        entries = _fetch_entries(user_id, tracker)
+        entries = await _fetch_entries(user_id, tracker)
         if not entries:
             dispatcher.utter_message(text="Không tìm thấy mục tài chính để xóa.")
             return _reset_finance_slots()
 
         if len(entries) == 1:
-            deleted = _delete_entry_ids(user_id, [entries[0].get("id")])
-            dispatcher.utter_message(text=f"Đã xóa {deleted} mục tài chính.")
+            deleted = await _delete_entry_ids(user_id, [entries[0].get("id")])
+            dispatcher.utter_message(text=_deleted_entries_text(deleted))
             return _reset_finance_slots()
 
         dispatcher.utter_message(
@@ -322,45 +318,50 @@ class ActionDeleteFinanceEntry(Action):
         return _reset_finance_slots()
 
 
-def _fetch_entries(user_id: str, tracker: Tracker) -> List[Dict[str, Any]]:
+async def _fetch_entries(user_id: str, tracker: Tracker) -> List[Dict[str, Any]]:
     try:
-        url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/entries"
-        response = requests.get(url, params=_build_entry_query(tracker), headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+        response = await get_api_client().list_entries(user_id, params=_build_entry_query(tracker))
         if response.status_code != 200:
             return []
-        return response.json() or []
+        return response.data or []
     except Exception:
         logger.exception("Error fetching finance entries for user %s", user_id)
         return []
 
 
-def _find_first_entry(user_id: str, tracker: Tracker) -> Optional[Dict[str, Any]]:
-    entries = _fetch_entries(user_id, tracker)
+async def _find_first_entry(user_id: str, tracker: Tracker) -> Optional[Dict[str, Any]]:
+    entries = await _fetch_entries(user_id, tracker)
     return entries[0] if entries else None
 
 
-def _delete_entry_ids(user_id: str, entry_ids: Any) -> int:
+async def _delete_entry_ids(user_id: str, entry_ids: Any) -> BulkResult:
     if not isinstance(entry_ids, list):
-        return 0
+        return BulkResult()
 
-    deleted = 0
+    ids = []
+    invalid = []
     for raw_id in entry_ids:
         try:
-            entry_id = int(str(raw_id))
+            ids.append(int(str(raw_id)))
         except (TypeError, ValueError):
-            continue
-        url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/entries/{entry_id}"
-        response = requests.delete(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
-        if response.status_code in [200, 204]:
-            deleted += 1
-    return deleted
+            invalid.append(raw_id)
+    result = await get_api_client().delete_entries(user_id, ids)
+    result.failed.extend(invalid)
+    return result
+
+
+def _deleted_entries_text(result: BulkResult) -> str:
+    if result.failed:
+        return f"Đã xóa {len(result.succeeded)} mục tài chính, {len(result.failed)} mục không xóa được."
+    return f"Đã xóa {len(result.succeeded)} mục tài chính."
 
 
 class ActionSummarizeFinance(Action):
     def name(self) -> Text:
         return "action_summarize_finance"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
         params = _build_entry_query(tracker)
         params.pop("page", None)
@@ -369,13 +370,12 @@ class ActionSummarizeFinance(Action):
             params.pop("search", None)
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/summary"
-            response = requests.get(url, params=params, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().finance_summary(user_id, params=params)
             if response.status_code != 200:
                 dispatcher.utter_message(text="Khong lay duoc tong ket tai chinh.")
                 return _reset_finance_slots()
 
-            summary = response.json()
+            summary = response.data
             dispatcher.utter_message(
                 text=(
                     "Tong ket tai chinh:\n"
@@ -395,9 +395,10 @@ class ActionListFinanceCategories(Action):
     def name(self) -> Text:
         return "action_list_finance_categories"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
-        categories = _fetch_categories(user_id)
+        categories = await _fetch_categories(user_id)
         if not categories:
             dispatcher.utter_message(text="Ban chua co danh muc tai chinh nao.")
             return _reset_finance_slots()
@@ -414,7 +415,8 @@ class ActionCreateFinanceCategory(Action):
     def name(self) -> Text:
         return "action_create_finance_category"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
         name = tracker_slot_or_entity(tracker, "finance_category")
         if not name:
@@ -422,8 +424,7 @@ class ActionCreateFinanceCategory(Action):
             return []
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/categories"
-            response = requests.post(url, json={"name": name.strip()}, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().create_category(user_id, name.strip())
             if response.status_code in [200, 201]:
                 dispatcher.utter_message(text=f"Da tao danh muc tai chinh: {name.strip()}")
             else:
@@ -438,7 +439,8 @@ class ActionUpdateFinanceCategory(Action):
     def name(self) -> Text:
         return "action_update_finance_category"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
         old_name = tracker_slot_or_entity(tracker, "finance_keyword")
         new_name = tracker_slot_or_entity(tracker, "finance_category")
@@ -446,15 +448,14 @@ class ActionUpdateFinanceCategory(Action):
             dispatcher.utter_message(text="Hay cho minh biet danh muc cu va ten moi.")
             return []
 
-        categories = _fetch_categories(user_id)
+        categories = await _fetch_categories(user_id)
         target = next((item for item in categories if _fold(item.get("name", "")) == _fold(old_name)), None)
         if not target:
             dispatcher.utter_message(text="Khong tim thay danh muc tai chinh de cap nhat.")
             return _reset_finance_slots()
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/categories/{target.get('id')}"
-            response = requests.put(url, json={"name": new_name.strip()}, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().update_category(user_id, target.get("id"), new_name.strip())
             if response.status_code == 200:
                 dispatcher.utter_message(text=f"Da doi danh muc {old_name} thanh {new_name.strip()}.")
             else:
@@ -469,7 +470,8 @@ class ActionDeleteFinanceCategory(Action):
     def name(self) -> Text:
         return "action_delete_finance_category"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    @api_deadline()
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_id, _ = split_sender(tracker.sender_id)
         name = (
             tracker_slot_or_entity(tracker, "finance_keyword")
@@ -479,15 +481,14 @@ class ActionDeleteFinanceCategory(Action):
             dispatcher.utter_message(text="Ban muon xoa danh muc tai chinh nao?")
             return []
 
-        categories = _fetch_categories(user_id)
+        categories = await _fetch_categories(user_id)
         target = next((item for item in categories if _fold(item.get("name", "")) == _fold(name)), None)
         if not target:
             dispatcher.utter_message(text="Khong tim thay danh muc tai chinh de xoa.")
             return _reset_finance_slots()
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/categories/{target.get('id')}"
-            response = requests.delete(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().delete_category(user_id, target.get("id"))
             if response.status_code in [200, 204]:
                 dispatcher.utter_message(text=f"Da xoa danh muc tai chinh: {name}.")
             elif response.status_code == 409:
@@ -500,13 +501,12 @@ class ActionDeleteFinanceCategory(Action):
         return _reset_finance_slots()
 
 
-def _fetch_categories(user_id: str) -> List[Dict[str, Any]]:
+async def _fetch_categories(user_id: str) -> List[Dict[str, Any]]:
     try:
-        url = f"{TASKIFY_API_URL}/api/internal/finance/{user_id}/categories"
-        response = requests.get(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+        response = await get_api_client().list_categories(user_id)
         if response.status_code != 200:
             return []
-        return response.json() or []
+        return response.data or []
     except Exception:
         logger.exception("Error fetching finance categories for user %s", user_id)
         return []
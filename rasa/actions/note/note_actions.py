@@ -11,12 +11,10 @@ Actions:
 import logging
 from typing import Any, Dict, List, Text
 
-import requests
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 
-from actions.config import TASKIFY_API_URL, REQUEST_TIMEOUT
-from actions.common.api_utils import get_api_headers, split_sender
+from actions.common.api_utils import api_deadline, get_api_client, split_sender
 from actions.common.text_utils import tracker_slot_or_entity
 
 logger = logging.getLogger(__name__)
@@ -33,7 +31,8 @@ class ActionCreateNote(Action):
     def name(self) -> Text:
         return "action_create_note"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -56,8 +55,7 @@ class ActionCreateNote(Action):
         }
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}"
-            response = requests.post(url, json=payload, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().create_note(user_id, payload)
             if response.status_code in [200, 201]:
                 dispatcher.utter_message(text=f"Đã tạo note: **{note_title}**")
             elif response.status_code == 401:
@@ -82,7 +80,8 @@ class ActionListNotes(Action):
     def name(self) -> Text:
         return "action_list_notes"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -91,13 +90,12 @@ class ActionListNotes(Action):
         user_id, _ = split_sender(tracker.sender_id)
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}?limit=5"
-            response = requests.get(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().list_notes(user_id, limit=5)
             if response.status_code != 200:
                 dispatcher.utter_message(text="Không lấy được danh sách note.")
                 return []
 
-            notes = response.json()
+            notes = response.data
             if not notes:
                 dispatcher.utter_message(text="Bạn chưa có note nào.")
                 return []
@@ -132,7 +130,8 @@ class ActionSearchNotes(Action):
     def name(self) -> Text:
         return "action_search_notes"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -151,13 +150,12 @@ class ActionSearchNotes(Action):
             return []
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}?limit=5&search={keyword}"
-            response = requests.get(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().list_notes(user_id, limit=5, search=keyword)
             if response.status_code != 200:
                 dispatcher.utter_message(text="Không tìm được note.")
                 return []
 
-            notes = response.json()
+            notes = response.data
             if not notes:
                 dispatcher.utter_message(text=f'Không có note nào khớp với "{keyword}".')
                 return []
@@ -192,7 +190,8 @@ class ActionTogglePinNote(Action):
     def name(self) -> Text:
         return "action_toggle_pin_note"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -218,15 +217,12 @@ class ActionTogglePinNote(Action):
 
         try:
             search_param = keyword.strip() if keyword else ""
-            url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}?limit=3"
-            if search_param:
-                url += f"&search={search_param}"
-            response = requests.get(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().list_notes(user_id, limit=3, search=search_param)
             if response.status_code != 200:
                 dispatcher.utter_message(text="Không tìm thấy note để ghim.")
                 return []
 
-            notes = response.json()
+            notes = response.data
             if not notes:
                 dispatcher.utter_message(text="Không có note nào khớp.")
                 return []
@@ -235,8 +231,7 @@ class ActionTogglePinNote(Action):
             note_id = target.get("id")
             note_title = target.get("title", "note")
 
-            patch_url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}/{note_id}/pin"
-            response = requests.patch(patch_url, json=desired_pin, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().set_note_pin(user_id, note_id, desired_pin)
             if response.status_code in [200, 201]:
                 effective_pin = desired_pin if desired_pin is not None else not target.get("isPinned", False)
                 state_text = "đã ghim" if effective_pin else "đã bỏ ghim"
@@ -260,7 +255,8 @@ class ActionUpdateNote(Action):
     def name(self) -> Text:
         return "action_update_note"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -276,13 +272,12 @@ class ActionUpdateNote(Action):
         new_text = tracker_slot_or_entity(tracker, "note_text")
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}?limit=3&search={keyword.strip()}"
-            response = requests.get(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
-            if response.status_code != 200 or not response.json():
+            response = await get_api_client().list_notes(user_id, limit=3, search=keyword.strip())
+            if response.status_code != 200 or not response.data:
                 dispatcher.utter_message(text="Không tìm thấy note để cập nhật.")
                 return []
 
-            target = response.json()[0]
+            target = response.data[0]
             note_id = target.get("id")
 
             payload = {}
@@ -293,8 +288,7 @@ class ActionUpdateNote(Action):
                 dispatcher.utter_message(text="Bạn muốn cập nhật nội dung gì cho note này?")
                 return []
 
-            patch_url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}/{note_id}"
-            response = requests.put(patch_url, json=payload, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().update_note(user_id, note_id, payload)
             if response.status_code in [200, 201]:
                 dispatcher.utter_message(text=f"Đã cập nhật note thành công.")
             else:
@@ -316,7 +310,8 @@ class ActionDeleteNote(Action):
     def name(self) -> Text:
         return "action_delete_note"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -332,10 +327,15 @@ class ActionDeleteNote(Action):
             note_ids = metadata.get("noteIds") or []
             if note_ids:
                 try:
-                    for nid in note_ids:
-                        delete_url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}/{nid}"
-                        requests.delete(delete_url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
-                    dispatcher.utter_message(text=f"Đã xoá {len(note_ids)} note thành công.")
+                    result = await get_api_client().delete_notes(user_id, note_ids)
+                    if not result.failed:
+                        dispatcher.utter_message(text=f"Đã xoá {len(result.succeeded)} note thành công.")
+                    elif result.succeeded:
+                        dispatcher.utter_message(
+                            text=f"Đã xoá {len(result.succeeded)} note, {len(result.failed)} note không xoá được."
+                        )
+                    else:
+                        dispatcher.utter_message(text="Không thể xoá note lúc này.")
                     return []
                 except Exception as exc:
                     logger.exception("Error deleting note via UI for user %s: %s", user_id, exc)
@@ -349,17 +349,15 @@ class ActionDeleteNote(Action):
         )
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}?limit=3&search={keyword.strip()}"
-            response = requests.get(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
-            if response.status_code != 200 or not response.json():
+            response = await get_api_client().list_notes(user_id, limit=3, search=keyword.strip())
+            if response.status_code != 200 or not response.data:
                 dispatcher.utter_message(text="Không tìm thấy note để xoá.")
                 return []
 
-            target = response.json()[0]
+            target = response.data[0]
             note_id = target.get("id")
 
-            delete_url = f"{TASKIFY_API_URL}/api/internal/notes/{user_id}/{note_id}"
-            response = requests.delete(delete_url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().delete_note(user_id, note_id)
             if response.status_code in [200, 204]:
                 dispatcher.utter_message(text=f"Đã xoá note thành công.")
             else:
@@ -17,14 +17,18 @@ import re
 from typing import Any, Dict, List, Optional, Text, Tuple
 from datetime import datetime, timedelta
 
-import requests
 from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.forms import FormValidationAction
 
-from actions.config import TASKIFY_API_URL, REQUEST_TIMEOUT
-from actions.common.api_utils import get_api_headers, split_sender
+from actions.common.api_utils import (
+    ApiConnectionError,
+    ApiTimeout,
+    api_deadline,
+    get_api_client,
+    split_sender,
+)
 from actions.common.text_utils import (
     get_locale,
     t,
@@ -50,6 +54,7 @@ from actions.common.format_utils import (
     utter_create_task_cancelled,
     utter_ask_delete_title,
 )
+from custom_components.temporal_grammar import find_first
 
 logger = logging.getLogger(__name__)
 
@@ -158,24 +163,8 @@ def _extract_due_date_phrase(latest_message: Dict[Text, Any], text: str) -> Opti
     if due_date_entity:
         return due_date_entity
 
-    match = re.search(
-        r"\b(today|tomorrow|day after tomorrow|next week|next month|next monday|next tuesday|next wednesday|next thursday|next friday|next saturday|next sunday)\b",
-        text,
-        flags=re.IGNORECASE,
-    )
-    if match:
-        return match.group(1)
-
-    match = re.search(
-        r"(hôm nay|ngày mai|ngày kia|tuần sau|tháng sau|chiều nay|tối nay|sáng mai|"
-        r"thứ hai|thứ ba|thứ tư|thứ năm|thứ sáu|thứ bảy|chủ nhật|\d{1,2}/\d{1,2}(?:/\d{2,4})?)",
-        text,
-        flags=re.IGNORECASE,
-    )
-    if match:
-        return match.group(1)
-
-    return None
+    match = find_first(text, datetime.now())
+    return match.text if match else None
 
 
 def _extract_due_window_from_message(
@@ -225,7 +214,8 @@ class ActionListTasks(Action):
     def name(self) -> Text:
         return "action_list_tasks"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -235,11 +225,10 @@ class ActionListTasks(Action):
         locale = get_locale(tracker)
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/tasks/{user_id}"
-            response = requests.get(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().list_tasks(user_id)
 
             if response.status_code == 200:
-                data = response.json()
+                data = response.data
                 tasks = data.get("tasks", [])
                 overdue_count = data.get("overdueCount", 0)
                 total_count = data.get("totalCount", 0)
@@ -323,12 +312,12 @@ class ActionListTasks(Action):
                     )
                 )
 
-        except requests.exceptions.Timeout:
+        except ApiTimeout:
             logger.error("Timeout calling TaskifyAPI for user %s", user_id)
             dispatcher.utter_message(
                 text=t(locale, "The request timed out. Please try again.", "Yêu cầu bị hết thời gian. Bạn thử lại nhé.")
             )
-        except requests.exceptions.ConnectionError:
+        except ApiConnectionError:
             logger.error("Connection error calling TaskifyAPI for user %s", user_id)
             dispatcher.utter_message(
                 text=t(
@@ -357,7 +346,8 @@ class ActionFilterTasks(Action):
     def name(self) -> Text:
         return "action_filter_tasks"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -401,16 +391,10 @@ class ActionFilterTasks(Action):
                 params[key] = value
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/tasks/{user_id}"
-            response = requests.get(
-                url,
-                params=params,
-                headers=get_api_headers(),
-                timeout=REQUEST_TIMEOUT,
-            )
+            response = await get_api_client().list_tasks(user_id, params=params)
 
             if response.status_code == 200:
-                data = response.json() or {}
+                data = response.data or {}
                 page = int(data.get("page") or params["page"])
                 page_size = int(data.get("pageSize") or params["pageSize"])
                 total_count = int(data.get("totalCount") or 0)
@@ -498,12 +482,12 @@ class ActionFilterTasks(Action):
                     )
                 )
 
-        except requests.exceptions.Timeout:
+        except ApiTimeout:
             logger.error("Timeout calling TaskifyAPI for filtered tasks user %s", user_id)
             dispatcher.utter_message(
                 text=t(locale, "The request timed out. Please try again.", "Yêu cầu bị hết thời gian. Bạn thử lại nhé.")
             )
-        except requests.exceptions.ConnectionError:
+        except ApiConnectionError:
             logger.error("Connection error calling TaskifyAPI for filtered tasks user %s", user_id)
             dispatcher.utter_message(
                 text=t(
@@ -638,7 +622,8 @@ class ActionCreateTask(Action):
     def name(self) -> Text:
         return "action_create_task"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -677,7 +662,6 @@ class ActionCreateTask(Action):
         )
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/tasks/{user_id}"
             payload = {
                 "title": display_title,
                 "description": "Created via AI assistant",
@@ -685,10 +669,10 @@ class ActionCreateTask(Action):
                 "dueDate": due_datetime.isoformat(),
             }
 
-            response = requests.post(url, json=payload, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().create_task(user_id, payload)
 
             if response.status_code in (200, 201):
-                task = response.json()
+                task = response.data
                 task_title_response = task.get("title", display_title)
                 dispatcher.utter_message(
                     text=(
@@ -715,12 +699,12 @@ class ActionCreateTask(Action):
                     text=t(locale, "I couldn't create the task right now. Please try again later.", "Không thể tạo task. Vui lòng thử lại sau.")
                 )
 
-        except requests.exceptions.Timeout:
+        except ApiTimeout:
             logger.error("Timeout calling TaskifyAPI for user %s", user_id)
             dispatcher.utter_message(
                 text=t(locale, "The request timed out. Please try again.", "Yêu cầu bị hết thời gian. Vui lòng thử lại.")
             )
-        except requests.exceptions.ConnectionError:
+        except ApiConnectionError:
             logger.error("Connection error calling TaskifyAPI for user %s", user_id)
             dispatcher.utter_message(
                 text=t(locale, "I couldn't connect to the server. Please check the connection.", "Không kết nối được server. Vui lòng kiểm tra kết nối.")
@@ -745,7 +729,8 @@ class ActionDeleteTask(Action):
     def name(self) -> Text:
         return "action_delete_task"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -768,7 +753,7 @@ class ActionDeleteTask(Action):
                     )
                 )
                 return []
-            return self._delete_ids_and_reply(
+            return await self._delete_ids_and_reply(
                 dispatcher, user_id, session_id, selected_ids, locale
             )
 
@@ -783,11 +768,11 @@ class ActionDeleteTask(Action):
                     )
                 )
                 return []
-            return self._undo_delete_and_reply(
+            return await self._undo_delete_and_reply(
                 dispatcher, user_id, session_id, undo_token, locale
             )
 
-        tasks = self._fetch_tasks(user_id)
+        tasks = await self._fetch_tasks(user_id)
         if tasks is None:
             dispatcher.utter_message(
                 text=t(
@@ -840,7 +825,7 @@ class ActionDeleteTask(Action):
                     )
                 )
                 return []
-            return self._delete_ids_and_reply(
+            return await self._delete_ids_and_reply(
                 dispatcher,
                 user_id,
                 session_id,
@@ -889,10 +874,9 @@ class ActionDeleteTask(Action):
 
         return sorted(set(ids))
 
-    def _fetch_tasks(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+    async def _fetch_tasks(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/tasks/{user_id}"
-            response = requests.get(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().list_tasks(user_id)
             if response.status_code != 200:
                 logger.warning(
                     "DeleteTask: failed to fetch tasks for user %s status %s",
@@ -900,13 +884,13 @@ class ActionDeleteTask(Action):
                     response.status_code,
                 )
                 return None
-            data = response.json()
+            data = response.data
             return data.get("tasks", [])
         except Exception as exc:
             logger.exception("DeleteTask: error fetching tasks for user %s: %s", user_id, exc)
             return None
 
-    def _delete_ids_and_reply(
+    async def _delete_ids_and_reply(
         self,
         dispatcher: CollectingDispatcher,
         user_id: str,
@@ -915,12 +899,11 @@ class ActionDeleteTask(Action):
         locale: str,
     ) -> List[Dict[Text, Any]]:
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/tasks/{user_id}/delete"
             payload = {"taskIds": task_ids, "sessionId": session_id}
-            response = requests.post(url, json=payload, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().delete_tasks(user_id, payload)
 
             if response.status_code == 200:
-                body = response.json() or {}
+                body = response.data or {}
                 deleted_count = int(body.get("deletedCount", 0))
                 deleted_ids = [str(item) for item in body.get("deletedTaskIds", [])]
                 deleted_titles = [
@@ -963,7 +946,7 @@ class ActionDeleteTask(Action):
                     task_ids,
                     response.status_code,
                 )
-        except requests.exceptions.Timeout:
+        except ApiTimeout:
             dispatcher.utter_message(
                 text=t(
                     locale,
@@ -971,7 +954,7 @@ class ActionDeleteTask(Action):
                     "Yêu cầu xóa bị timeout, thử lại nhé.",
                 )
             )
-        except requests.exceptions.ConnectionError:
+        except ApiConnectionError:
             dispatcher.utter_message(
                 text=t(
                     locale,
@@ -997,7 +980,7 @@ class ActionDeleteTask(Action):
             SlotSet("priority", None),
         ]
 
-    def _undo_delete_and_reply(
+    async def _undo_delete_and_reply(
         self,
         dispatcher: CollectingDispatcher,
         user_id: str,
@@ -1006,12 +989,11 @@ class ActionDeleteTask(Action):
         locale: str,
     ) -> List[Dict[Text, Any]]:
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/tasks/{user_id}/undo-delete"
             payload = {"undoToken": undo_token, "sessionId": session_id}
-            response = requests.post(url, json=payload, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().undo_delete_tasks(user_id, payload)
 
             if response.status_code == 200:
-                body = response.json() or {}
+                body = response.data or {}
                 restored_count = int(body.get("restoredCount", 0))
                 restored_ids = [str(item) for item in body.get("restoredTaskIds", [])]
                 dispatcher.utter_message(
@@ -1043,7 +1025,7 @@ class ActionDeleteTask(Action):
                     undo_token,
                     response.status_code,
                 )
-        except requests.exceptions.Timeout:
+        except ApiTimeout:
             dispatcher.utter_message(
                 text=t(
                     locale,
@@ -1051,7 +1033,7 @@ class ActionDeleteTask(Action):
                     "Yêu cầu undo bị timeout, thử lại nhé.",
                 )
             )
-        except requests.exceptions.ConnectionError:
+        except ApiConnectionError:
             dispatcher.utter_message(
                 text=t(
                     locale,
@@ -1110,7 +1092,8 @@ class ActionSummarizeWeek(Action):
     def name(self) -> Text:
         return "action_summarize_week"
 
-    def run(
+    @api_deadline()
+    async def run(
         self,
         dispatcher: CollectingDispatcher,
         tracker: Tracker,
@@ -1120,11 +1103,10 @@ class ActionSummarizeWeek(Action):
         locale = get_locale(tracker)
 
         try:
-            url = f"{TASKIFY_API_URL}/api/internal/tasks/{user_id}"
-            response = requests.get(url, headers=get_api_headers(), timeout=REQUEST_TIMEOUT)
+            response = await get_api_client().list_tasks(user_id)
 
             if response.status_code == 200:
-                data = response.json()
+                data = response.data
                 overdue_count = data.get("overdueCount", 0)
                 completed_this_week = data.get("completedThisWeek", 0)
                 pending_count = data.get("pendingCount", 0)
@@ -1170,10 +1152,10 @@ class ActionSummarizeWeek(Action):
                     text=t(locale, "I'm having trouble getting your summary right now. Please try again later.", "Mình đang gặp lỗi khi lấy phần tóm tắt tuần. Bạn thử lại sau nhé.")
                 )
 
-        except requests.exceptions.Timeout:
+        except ApiTimeout:
             logger.error("Timeout calling TaskifyAPI for user %s", user_id)
             dispatcher.utter_message(text=t(locale, "The request timed out. Please try again.", "Yêu cầu bị hết thời gian. Bạn thử lại nhé."))
-        except requests.exceptions.ConnectionError:
+        except ApiConnectionError:
             logger.error("Connection error calling TaskifyAPI for user %s", user_id)
             dispatcher.utter_message(
                 text=t(locale, "I couldn't connect to the task service. Please make sure the server is running.", "Mình không kết nối được tới dịch vụ task. Hãy kiểm tra server đang chạy.")
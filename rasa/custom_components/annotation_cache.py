@@ -0,0 +1,136 @@
+"""
+On-disk cache of PhoBERT predictions over training examples.
+
+``rasa train`` runs every component's ``process_training_data``. The PhoBERT
+components are not trainable, so annotating the training data is opt-in
+(``annotate_training_data``); when it is on, predictions are stored in a
+SQLite file keyed by component, model fingerprint and normalized example text,
+and the next ``rasa train`` only runs the model on new or edited examples.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Text
+
+from custom_components.prediction_cache import model_fingerprint, normalize_text
+
+DEFAULT_ANNOTATION_CACHE = os.path.join(".rasa", "phobert_annotations.sqlite")
+# SQLite's default limit on host parameters is 999.
+_LOOKUP_CHUNK = 500
+
+
+class AnnotationStore:
+    def __init__(self, name: Text, fingerprint: Text, path: Optional[Text]) -> None:
+        self.name = name
+        self.fingerprint = fingerprint
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the file on first use, so `rasa run` never touches it."""
+        if self._connection is None and self.path:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS annotations ("
+                    "component TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+                    "text TEXT NOT NULL, value TEXT NOT NULL, "
+                    "PRIMARY KEY (component, fingerprint, text))"
+                )
+                # Rows of an older model of this component can never hit again.
+                self._connection.execute(
+                    "DELETE FROM annotations WHERE component = ? AND fingerprint != ?",
+                    (self.name, self.fingerprint),
+                )
+        return self._connection
+
+    def _lookup(self, texts: Sequence[Text]) -> Dict[Text, Any]:
+        found: Dict[Text, Any] = {}
+        if self._connection is None:
+            return found
+        unique = list(dict.fromkeys(texts))
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_CHUNK):
+                chunk = unique[start : start + _LOOKUP_CHUNK]
+                rows = self._connection.execute(
+                    "SELECT text, value FROM annotations WHERE component = ? "
+                    "AND fingerprint = ? AND text IN "
+                    f"({', '.join('?' * len(chunk))})",
+                    (self.name, self.fingerprint, *chunk),
+                )
+                found.update((text, json.loads(value)) for text, value in rows)
+        return found
+
+    def _store(self, items: Dict[Text, Any]) -> None:
+        if self._connection is None or not items:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO annotations VALUES (?, ?, ?, ?)",
+                [
+                    (self.name, self.fingerprint, text, json.dumps(value, ensure_ascii=False))
+                    for text, value in items.items()
+                ],
+            )
+
+    def predict(
+        self,
+        messages: List[Any],
+        words: Iterable[Iterable[Text]],
+        predict: Callable[[List[Any]], List[Any]],
+    ) -> List[Any]:
+        """``predict(messages)``, served from the file for already-seen texts.
+
+        Values round-trip through JSON, so tuples come back as lists.
+        """
+        texts = [normalize_text(item) for item in words]
+        with self._lock:
+            self._connect()
+        found = self._lookup(texts)
+        missing = [index for index, text in enumerate(texts) if text not in found]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        predictions: List[Any] = [found.get(text) for text in texts]
+        if missing:
+            computed = predict([messages[index] for index in missing])
+            for index, prediction in zip(missing, computed):
+                predictions[index] = prediction
+            self._store({texts[index]: predictions[index] for index in missing})
+
+        if self._connection is not None:
+            print(
+                f"[{self.name}] Training annotations: "
+                f"{len(texts) - len(missing)} cached, {len(missing)} predicted "
+                f"({self.path})."
+            )
+        return predictions
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def create_annotation_store(
+    name: Text, model_dir: Text, config: Dict[Text, Any]
+) -> Optional[AnnotationStore]:
+    """Store for ``annotate_training_data``; None when annotation is off.
+
+    ``annotation_cache`` names the SQLite file; an empty value annotates
+    without caching.
+    """
+    if not config.get("annotate_training_data", False):
+        return None
+    return AnnotationStore(
+        name,
+        model_fingerprint(model_dir, config),
+        config.get("annotation_cache") or None,
+    )
@@ -0,0 +1,114 @@
+"""
+BIO decoding of PhoBERT token predictions on numpy arrays.
+
+``first_subwords`` picks the row of each word's first subword, ``decode``
+turns the word-level probabilities into label ids (per-word argmax, or a
+Viterbi pass that only allows ``I-x`` after ``B-x``/``I-x``), and
+``entity_spans`` finds the entities in a label sequence without a per-word
+Python loop. A greedy ``I-x`` that doesn't continue an ``x`` entity starts
+nothing, as the old loop-based decoding did.
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence, Text, Tuple
+
+import numpy as np
+
+GREEDY = "greedy"
+VITERBI = "viterbi"
+DECODERS = (GREEDY, VITERBI)
+
+_OUTSIDE, _BEGIN, _INSIDE = 0, 1, 2
+# label -> (tag, entity type code); the label set is small and fixed per model.
+_LABEL_CODES: Dict[Text, Tuple[int, int]] = {}
+_TYPE_CODES: Dict[Text, int] = {}
+_LABEL_CODES_LOCK = threading.Lock()
+
+
+def first_subwords(word_ids: Sequence[Optional[int]]) -> np.ndarray:
+    """Token positions of each word's first subword, in word order."""
+    # None (special tokens) becomes NaN, which equals nothing.
+    ids = np.array(word_ids, dtype=np.float64)
+    starts = ids[1:] != ids[:-1]
+    return np.flatnonzero(np.concatenate(([ids[0] == ids[0]], starts)) & (ids == ids))
+
+
+def _label_code(label: Text) -> Tuple[int, int]:
+    code = _LABEL_CODES.get(label)
+    if code is None:
+        tag = _OUTSIDE
+        if label[:2] in ("B-", "I-"):
+            tag = _BEGIN if label[0] == "B" else _INSIDE
+        with _LABEL_CODES_LOCK:
+            entity_type = _TYPE_CODES.setdefault(label[2:], len(_TYPE_CODES)) if tag else -1
+            code = _LABEL_CODES.setdefault(label, (tag, entity_type))
+    return code
+
+
+def label_scheme(labels: Sequence[Text]) -> Tuple[np.ndarray, np.ndarray]:
+    """(tag, entity type code) arrays for BIO label strings."""
+    codes = np.array([_label_code(label) for label in labels], dtype=np.int64).reshape(-1, 2)
+    return codes[:, 0], codes[:, 1]
+
+
+def _allowed_transitions(tags: np.ndarray, types: np.ndarray) -> np.ndarray:
+    """allowed[i, j]: label j may follow label i."""
+    inside = tags == _INSIDE
+    continues = (types[:, None] == types[None, :]) & (tags[:, None] != _OUTSIDE)
+    return ~inside[None, :] | continues
+
+
+def viterbi(log_probs: np.ndarray, tags: np.ndarray, types: np.ndarray) -> np.ndarray:
+    """Most likely label sequence with no ``I-x`` outside an ``x`` entity."""
+    penalty = np.where(_allowed_transitions(tags, types), 0.0, -np.inf)
+    score = np.where(tags == _INSIDE, -np.inf, log_probs[0])
+    backpointers = np.zeros(log_probs.shape, dtype=np.int64)
+    for position in range(1, len(log_probs)):
+        candidates = score[:, None] + penalty
+        backpointers[position] = candidates.argmax(axis=0)
+        score = candidates.max(axis=0) + log_probs[position]
+
+    path = np.zeros(len(log_probs), dtype=np.int64)
+    path[-1] = int(score.argmax())
+    for position in range(len(log_probs) - 1, 0, -1):
+        path[position - 1] = backpointers[position, path[position]]
+    return path
+
+
+def decode(
+    word_probs: np.ndarray, labels: Sequence[Text], decoder: Text = GREEDY
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Label id and its probability for each word of a (words, labels) array."""
+    if decoder not in DECODERS:
+        raise ValueError(f"Unknown BIO decoder '{decoder}'. Use one of {DECODERS}.")
+    if not len(word_probs):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=word_probs.dtype)
+
+    if decoder == VITERBI:
+        tags, types = label_scheme(labels)
+        with np.errstate(divide="ignore"):
+            label_ids = viterbi(np.log(word_probs), tags, types)
+    else:
+        label_ids = word_probs.argmax(axis=-1)
+    return label_ids, word_probs[np.arange(len(word_probs)), label_ids]
+
+
+def entity_spans(labels: Sequence[Text]) -> List[Tuple[int, int, Text]]:
+    """(first word, last word, entity type) of each entity in a BIO sequence."""
+    if not labels:
+        return []
+    tags, types = label_scheme(labels)
+
+    # A word continues the previous word's span if it is I- of the same type
+    # after a B-/I-; every other word starts a new span.
+    continues = np.zeros(len(labels), dtype=bool)
+    continues[1:] = (tags[1:] == _INSIDE) & (types[1:] == types[:-1]) & (tags[:-1] != _OUTSIDE)
+    heads = np.flatnonzero(~continues)
+    ends = np.append(heads[1:], len(labels)) - 1
+    # A span is an entity only if it starts with B- (this also drops a stray
+    # I- and the I-s continuing it).
+    entity = tags[heads] == _BEGIN
+    return [
+        (start, end, labels[start][2:])
+        for start, end in zip(heads[entity].tolist(), ends[entity].tolist())
+    ]
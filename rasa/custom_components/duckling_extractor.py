@@ -0,0 +1,175 @@
+import logging
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Text
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rasa.engine.recipes.default_recipe import DefaultV1Recipe
+from rasa.nlu.extractors.duckling_entity_extractor import DucklingEntityExtractor
+from rasa.shared.nlu.training_data.message import Message
+
+from custom_components.extraction_gate import (
+    DEFAULT_GATE_MIN_CONFIDENCE,
+    DEFAULT_INTENT_EXTRACTORS,
+    GRAMMAR_COVERED_ATTRIBUTE,
+    has_time_cue,
+    intent_allows,
+)
+from custom_components.metadata_intent_router import is_routed
+from custom_components.prediction_cache import PredictionCache
+
+logger = logging.getLogger(__name__)
+
+# Dimensions the lexical time-cue prefilter can vouch for.
+_TEMPORAL_DIMENSIONS = {"time", "duration"}
+# Duckling resolves these relative to the reference clock time ("9h" is the
+# next 9:00), not just the reference day, so their cache entries expire fast.
+_FINE_GRAINS = {"second", "minute", "hour"}
+
+
+def _grains(value: Any) -> List[Text]:
+    if isinstance(value, dict):
+        found = [value["grain"]] if isinstance(value.get("grain"), str) else []
+        for child in value.values():
+            found.extend(_grains(child))
+        return found
+    if isinstance(value, list):
+        return [grain for child in value for grain in _grains(child)]
+    return []
+
+
+def reference_datetime(reference_time_ms: int, timezone: Optional[Text]) -> datetime:
+    tz = None
+    if timezone:
+        try:
+            from zoneinfo import ZoneInfo
+
+            tz = ZoneInfo(timezone)
+        except Exception:
+            tz = None
+    return datetime.fromtimestamp(reference_time_ms / 1000, tz)
+
+
+@DefaultV1Recipe.register(
+    [DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR], is_trainable=False
+)
+class GatedDucklingEntityExtractor(DucklingEntityExtractor):
+    """DucklingEntityExtractor that only calls Duckling for messages that need it."""
+
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            **DucklingEntityExtractor.get_default_config(),
+            # intent -> extractor names allowed to run; intents not listed run
+            # all extractors.
+            "intent_extractors": dict(DEFAULT_INTENT_EXTRACTORS),
+            # Below this intent confidence the map above is ignored.
+            "gate_min_confidence": DEFAULT_GATE_MIN_CONFIDENCE,
+            # Skip the HTTP call when the text has no date/time wording. Only
+            # applied when every configured dimension is temporal.
+            "time_cue_prefilter": True,
+            # Parses cached per (text, reference day, timezone, locale); 0 disables.
+            "cache_size": 1000,
+            # Seconds to keep parses with an hour/minute/second grain, which
+            # depend on the reference clock time rather than only the day.
+            "fine_grain_ttl": 60,
+            # Keep-alive connections kept open to the Duckling server.
+            "pool_size": 4,
+        }
+
+    def __init__(self, config: Dict[Text, Any]) -> None:
+        super().__init__(config)
+        pool_size = max(1, int(config.get("pool_size") or 1))
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        cache_size = int(config.get("cache_size") or 0)
+        self._cache = (
+            PredictionCache("GatedDucklingEntityExtractor", "duckling", cache_size, 0)
+            if cache_size > 0
+            else None
+        )
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        super().process([message for message in messages if self._needs_duckling(message)])
+        return messages
+
+    def _needs_duckling(self, message: Message) -> bool:
+        if is_routed(message) or message.get(GRAMMAR_COVERED_ATTRIBUTE):
+            return False
+        if not intent_allows(message, "GatedDucklingEntityExtractor", self.component_config):
+            return False
+
+        dimensions = set(self.component_config.get("dimensions") or [])
+        if (
+            self.component_config.get("time_cue_prefilter")
+            and dimensions
+            and dimensions <= _TEMPORAL_DIMENSIONS
+        ):
+            return has_time_cue(message.get("text") or "")
+        return True
+
+    def _duckling_parse(self, text: Text, reference_time: int) -> List[Dict[Text, Any]]:
+        """Cached, connection-pooled replacement for the parent's HTTP call."""
+        timezone = self.component_config.get("timezone")
+        reference = reference_datetime(reference_time, timezone)
+        cache_key = None
+        if self._cache is not None:
+            cache_key = "|".join(
+                [
+                    reference.date().isoformat(),
+                    str(timezone),
+                    str(self._locale()),
+                    ",".join(sorted(self.component_config.get("dimensions") or [])),
+                    unicodedata.normalize("NFC", text),
+                ]
+            )
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            response = self._session.post(
+                self._url() + "/parse",
+                data=self._payload(text, reference_time),
+                headers={
+                    "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"
+                },
+                timeout=self.component_config.get("timeout"),
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout) as exc:
+            logger.error(
+                "Failed to connect to duckling http server. Make sure the duckling "
+                "server is running at %s. Error: %s",
+                self._url(),
+                exc,
+            )
+            return []
+        if response.status_code != 200:
+            logger.error(
+                "Failed to get a proper response from remote duckling at %s. "
+                "Status Code: %s. Response: %s",
+                self._url(),
+                response.status_code,
+                response.text,
+            )
+            return []
+
+        matches = response.json()
+        if cache_key is not None:
+            if _FINE_GRAINS.intersection(_grains(matches)):
+                ttl = float(self.component_config.get("fine_grain_ttl") or 0)
+            else:
+                # Day-level parses stay valid until the reference day ends; the
+                # key already changes at midnight, this just evicts old days.
+                next_day = (reference + timedelta(days=1)).replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                )
+                ttl = max(1.0, (next_day - reference).total_seconds())
+            if ttl > 0:
+                self._cache.put(cache_key, matches, ttl_seconds=ttl)
+        return matches
@@ -0,0 +1,78 @@
+"""
+Cheap checks that let entity extractors skip messages that cannot need them.
+
+``intent_extractors`` maps an intent to the extractor class names allowed to
+run for it; intents missing from the map run every extractor. The map is only
+trusted when the predicted intent is at least ``gate_min_confidence`` sure.
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Text
+
+# Chit-chat intents never carry task/note/finance entities.
+DEFAULT_INTENT_EXTRACTORS: Dict[Text, List[Text]] = {
+    "greet": [],
+    "goodbye": [],
+    "affirm": [],
+    "deny": [],
+    "ask_howcanhelp": [],
+}
+DEFAULT_GATE_MIN_CONFIDENCE = 0.7
+
+# Set by TemporalGrammarExtractor when its grammar parsed every time cue in
+# the message; Duckling then has nothing left to add.
+GRAMMAR_COVERED_ATTRIBUTE = "temporal_grammar_covered"
+
+# Any digit may be a clock time or date ("9h", "15/3", "2 ngày nữa"), except
+# one that is clearly an amount ("50k", "2.5 triệu").
+_TIME_CUE_PATTERN = re.compile(
+    r"\d(?![\d.,]*\s*(?:k|nghìn|ngàn|tr|triệu|củ|đ|đồng|vnd|₫|%)(?!\w))"
+    r"|\b(?:giờ|phút|giây|rưỡi|sáng|trưa|chiều|tối|đêm|khuya|hôm|mai|mốt|ngày"
+    r"|tuần|tháng|năm|thứ|chủ nhật|lúc|cuối|đầu|tết)\b"
+    r"|\b(?:today|tomorrow|tonight|yesterday|now|week|weekend|month|year"
+    r"|morning|noon|afternoon|evening|night|hour|minute"
+    r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday)s?\b",
+    re.IGNORECASE,
+)
+# Unaccented spellings, checked on ASCII-folded text. Single folded words such
+# as "toi" or "nam" are too ambiguous ("tôi", "nam"), so only phrases here.
+_FOLDED_TIME_CUE_PATTERN = re.compile(
+    r"\b(?:gio|phut"
+    r"|ngay (?:mai|kia|nay)|hom (?:nay|qua|kia)|chu nhat|cuoi tuan"
+    r"|(?:tuan|thang|nam) (?:sau|toi|nay|truoc|nua)"
+    r"|thu (?:hai|ba|tu|nam|sau|bay)"
+    r"|(?:sang|trua|chieu|toi|dem) (?:nay|mai|qua))\b"
+)
+
+
+def _fold_ascii(text: Text) -> Text:
+    decomposed = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    return decomposed.encode("ascii", "ignore").decode("ascii")
+
+
+def has_time_cue(text: Text) -> bool:
+    """Recall-oriented lexical check for a possible temporal expression."""
+    if not text:
+        return False
+    normalized = unicodedata.normalize("NFC", text.replace("_", " "))
+    if _TIME_CUE_PATTERN.search(normalized):
+        return True
+    return bool(_FOLDED_TIME_CUE_PATTERN.search(_fold_ascii(normalized)))
+
+
+def intent_allows(message: Any, extractor: Text, config: Dict[Text, Any]) -> bool:
+    """Whether ``extractor`` should run for the message's predicted intent."""
+    intent_extractors = config.get("intent_extractors") or {}
+    intent = message.get("intent") or {}
+    if not isinstance(intent, dict):
+        # Training examples carry their gold intent as a plain name.
+        intent = {"name": intent, "confidence": 1.0}
+    name = intent.get("name")
+    if name not in intent_extractors:
+        return True
+
+    min_confidence = float(config.get("gate_min_confidence") or 0.0)
+    if float(intent.get("confidence") or 0.0) < min_confidence:
+        return True
+    return extractor in (intent_extractors[name] or [])
@@ -0,0 +1,200 @@
+"""
+Micro-batching executor in front of a PhoBERT inference backend.
+
+Callers submit encoded messages (token id lists) from any thread. A dedicated
+worker thread takes up to ``max_batch`` of them, waiting at most
+``max_wait_ms`` after the first for more to arrive, pads them into one batch,
+runs a single forward and hands each caller its own row of the logits.
+Concurrent parses therefore share forwards instead of each running a batch of
+one, and torch only ever runs on the worker thread. The wait only applies
+while the previous forward was shared, so a lone parse on an idle server is
+not delayed.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence, Text, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT_MS = 2.0
+# Token counts of the warm-up inputs: a short command and a long note.
+WARMUP_LENGTHS = (16, 64)
+
+_Request = Tuple[List[int], Future]
+
+
+def pad_batch(batch: Sequence[List[int]], pad_token_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Right-padded ``input_ids`` and the matching ``attention_mask``."""
+    width = max(len(ids) for ids in batch)
+    input_ids = np.full((len(batch), width), pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+    for row, ids in enumerate(batch):
+        input_ids[row, : len(ids)] = ids
+        attention_mask[row, : len(ids)] = 1
+    return input_ids, attention_mask
+
+
+class InferenceExecutor:
+    def __init__(
+        self,
+        backend: Any,
+        pad_token_id: int,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        threaded: bool = True,
+        name: Text = "PhoBERT",
+    ) -> None:
+        self.backend = backend
+        self.pad_token_id = pad_token_id
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.name = name
+        self.forwards = 0
+        self.rows = 0
+        self._coalescing = False
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._submit_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        if threaded:
+            self._thread = threading.Thread(
+                target=self._work, name=f"{name}-inference", daemon=True
+            )
+            self._thread.start()
+
+    def run(self, encoded: Sequence[List[int]]) -> List[Any]:
+        """Logits row(s) for each encoded message, in input order.
+
+        A row is the output for that message alone (still padded to its
+        batch's width for token-level outputs); tuple outputs give tuples.
+        """
+        if not encoded:
+            return []
+        futures: List[Future] = []
+        with self._submit_lock:
+            # Checked under the lock so nothing is queued behind close()'s
+            # sentinel; a caller still holding a closed executor runs inline.
+            if self._thread is not None:
+                futures = [self._enqueue(ids) for ids in encoded]
+        if not futures:
+            return self._run_inline(encoded)
+        return [future.result() for future in futures]
+
+    def submit(self, input_ids: List[int]) -> Future:
+        with self._submit_lock:
+            if self._thread is None:
+                raise RuntimeError(f"[{self.name}] Inference executor is not threaded.")
+            return self._enqueue(input_ids)
+
+    def _enqueue(self, input_ids: List[int]) -> Future:
+        future: Future = Future()
+        self._queue.put((input_ids, future))
+        return future
+
+    def warm_up(self, bos_token_id: int, eos_token_id: int, filler_id: int) -> float:
+        """Run fixed inputs once so the first parse doesn't pay for lazy init.
+
+        Goes through the worker thread like real traffic. Returns milliseconds.
+        """
+        encoded = [
+            [bos_token_id] + [filler_id] * (length - 2) + [eos_token_id]
+            for length in WARMUP_LENGTHS
+        ]
+        started = time.perf_counter()
+        for ids in encoded:
+            self.run([ids])
+        self.forwards = 0
+        self.rows = 0
+        return (time.perf_counter() - started) * 1000
+
+    def close(self) -> None:
+        """Stop the worker once everything already queued has run."""
+        with self._submit_lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> Dict[Text, Any]:
+        return {
+            "forwards": self.forwards,
+            "rows": self.rows,
+            "mean_batch": round(self.rows / self.forwards, 2) if self.forwards else 0.0,
+        }
+
+    def _run_inline(self, encoded: Sequence[List[int]]) -> List[Any]:
+        results: List[Any] = [None] * len(encoded)
+        # Bucket by token length so padding stays small inside each batch.
+        order = sorted(range(len(encoded)), key=lambda index: len(encoded[index]))
+        for start in range(0, len(order), self.max_batch):
+            bucket = order[start : start + self.max_batch]
+            rows = self._forward([encoded[index] for index in bucket])
+            for index, row in zip(bucket, rows):
+                results[index] = row
+        return results
+
+    def _forward(self, batch: Sequence[List[int]]) -> List[Any]:
+        outputs = self.backend.run(*pad_batch(batch, self.pad_token_id))
+        self.forwards += 1
+        self.rows += len(batch)
+        if isinstance(outputs, tuple):
+            return [tuple(output[row] for output in outputs) for row in range(len(batch))]
+        return [outputs[row] for row in range(len(batch))]
+
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        """``first`` plus what arrives within ``max_wait``; True when closing."""
+        requests = [first]
+        deadline = time.monotonic() + (self.max_wait if self._coalescing else 0.0)
+        while len(requests) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                # Already queued requests are taken even once the wait is over.
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return requests, True
+            requests.append(item)
+        return requests, False
+
+    def _work(self) -> None:
+        closing = False
+        while not closing:
+            first = self._queue.get()
+            if first is None:
+                break
+            requests, closing = self._collect(first)
+            self._coalescing = len(requests) > 1
+            requests.sort(key=lambda request: len(request[0]))
+            try:
+                rows = self._forward([input_ids for input_ids, _ in requests])
+            except BaseException as exc:
+                for _, future in requests:
+                    future.set_exception(exc)
+                continue
+            for (_, future), row in zip(requests, rows):
+                future.set_result(row)
+
+
+def create_executor(
+    backend: Any, pad_token_id: int, config: Dict[Text, Any], name: Text
+) -> InferenceExecutor:
+    """Executor configured by ``batch_size`` / ``max_wait_ms`` / ``inference_thread``."""
+    executor = InferenceExecutor(
+        backend,
+        pad_token_id,
+        max_batch=config.get("batch_size") or DEFAULT_MAX_BATCH,
+        max_wait_ms=config.get("max_wait_ms", DEFAULT_MAX_WAIT_MS),
+        threaded=bool(config.get("inference_thread", True)),
+        name=name,
+    )
+    mode = "worker thread" if executor._thread is not None else "inline"
+    print(
+        f"[{name}] Inference executor: {mode}, max_batch={executor.max_batch}, "
+        f"max_wait_ms={executor.max_wait * 1000:g}"
+    )
+    return executor
@@ -0,0 +1,73 @@
+"""
+Multi-task PhoBERT: one RoBERTa encoder with an intent head on <s> and a
+BIO tagging head on every subword.
+
+Kept free of Rasa imports so the training and export tools can load it.
+Label maps live on the config as ``intent_id2label`` / ``ner_id2label``.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import torch
+from torch import nn
+from transformers import RobertaConfig, RobertaModel, RobertaPreTrainedModel
+from transformers.utils import ModelOutput
+
+IGNORE_INDEX = -100
+
+
+@dataclass
+class JointOutput(ModelOutput):
+    loss: Optional[torch.Tensor] = None
+    intent_logits: Optional[torch.Tensor] = None
+    ner_logits: Optional[torch.Tensor] = None
+
+
+def label_maps(config: RobertaConfig) -> tuple[Dict[int, str], Dict[int, str]]:
+    """Return (intent_id2label, ner_id2label) with int keys."""
+    intent = {int(key): value for key, value in config.intent_id2label.items()}
+    ner = {int(key): value for key, value in config.ner_id2label.items()}
+    return intent, ner
+
+
+class PhobertJointModel(RobertaPreTrainedModel):
+    def __init__(self, config: RobertaConfig) -> None:
+        super().__init__(config)
+        intent_id2label, ner_id2label = label_maps(config)
+
+        self.roberta = RobertaModel(config, add_pooling_layer=False)
+        dropout = config.classifier_dropout
+        self.dropout = nn.Dropout(
+            dropout if dropout is not None else config.hidden_dropout_prob
+        )
+        self.intent_classifier = nn.Linear(config.hidden_size, len(intent_id2label))
+        self.ner_classifier = nn.Linear(config.hidden_size, len(ner_id2label))
+        self.post_init()
+
+    def forward(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: Optional[torch.Tensor] = None,
+        intent_labels: Optional[torch.Tensor] = None,
+        ner_labels: Optional[torch.Tensor] = None,
+    ) -> JointOutput:
+        hidden = self.roberta(input_ids=input_ids, attention_mask=attention_mask)[0]
+        hidden = self.dropout(hidden)
+        intent_logits = self.intent_classifier(hidden[:, 0])
+        ner_logits = self.ner_classifier(hidden)
+
+        loss = None
+        if intent_labels is not None or ner_labels is not None:
+            # The corpora are disjoint: intent rows carry IGNORE_INDEX tags and
+            # NER rows an IGNORE_INDEX intent, so each head only sees its own data.
+            loss_fn = nn.CrossEntropyLoss(ignore_index=IGNORE_INDEX)
+            loss = intent_logits.new_zeros(())
+            if intent_labels is not None and (intent_labels != IGNORE_INDEX).any():
+                loss = loss + loss_fn(intent_logits, intent_labels)
+            if ner_labels is not None and (ner_labels != IGNORE_INDEX).any():
+                loss = loss + loss_fn(
+                    ner_logits.reshape(-1, ner_logits.size(-1)), ner_labels.reshape(-1)
+                )
+
+        return JointOutput(loss=loss, intent_logits=intent_logits, ner_logits=ner_logits)
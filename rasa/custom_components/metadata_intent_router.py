@@ -0,0 +1,154 @@
+from typing import Any, Dict, List, Optional, Text
+
+from rasa.engine.graph import ExecutionContext, GraphComponent
+from rasa.engine.recipes.default_recipe import DefaultV1Recipe
+from rasa.engine.storage.resource import Resource
+from rasa.engine.storage.storage import ModelStorage
+from rasa.nlu.classifiers.classifier import IntentClassifier
+from rasa.shared.nlu.training_data.message import Message
+from rasa.shared.nlu.training_data.training_data import TrainingData
+
+
+EXTRACTOR_NAME = "MetadataIntentRouter"
+# Set on routed messages; the tokenizer and PhoBERT/Duckling components skip them.
+ROUTED_ATTRIBUTE = "metadata_routed"
+
+
+def get_metadata(message: Message) -> Dict[Text, Any]:
+    metadata = message.get("metadata")
+    if isinstance(metadata, dict):
+        return metadata
+
+    raw_data = getattr(message, "data", {}) or {}
+    fallback = raw_data.get("metadata")
+    return fallback if isinstance(fallback, dict) else {}
+
+
+def is_routed(message: Message) -> bool:
+    return bool(message.get(ROUTED_ATTRIBUTE))
+
+
+@DefaultV1Recipe.register(
+    [DefaultV1Recipe.ComponentType.INTENT_CLASSIFIER], is_trainable=False
+)
+class MetadataIntentRouter(IntentClassifier, GraphComponent):
+    """Resolve structured frontend actions from message metadata without NLU.
+
+    Must be first in the pipeline so later components can skip routed messages.
+    """
+
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            # metadata.action -> intent. The actions read the rest of the
+            # metadata (taskIds, undoToken, direction, ...) themselves.
+            "action_intents": {
+                "task_filter_page": "filter_tasks",
+                "confirm_delete_selection": "confirm_delete_selection",
+                "undo_delete": "undo_delete_task",
+                "confirm_delete_note": "delete_note",
+                "confirm_delete_finance_entry": "delete_finance_entry",
+            },
+            # Also trust an intent resolved upstream in metadata.intent
+            # (a name or {"name", "confidence"}) plus optional metadata.entities.
+            "accept_metadata_intent": True,
+        }
+
+    def __init__(self, config: Dict[Text, Any]) -> None:
+        self._config = config
+        self.action_intents: Dict[Text, Text] = {
+            str(action).strip().lower(): str(intent).strip()
+            for action, intent in (config.get("action_intents") or {}).items()
+        }
+        self.accept_metadata_intent = bool(config.get("accept_metadata_intent"))
+
+    @classmethod
+    def create(
+        cls,
+        config: Dict[Text, Any],
+        model_storage: ModelStorage,
+        resource: Resource,
+        execution_context: ExecutionContext,
+    ) -> "MetadataIntentRouter":
+        return cls(config)
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        for message in messages:
+            metadata = get_metadata(message)
+            if not metadata:
+                continue
+
+            intent = self._resolve_intent(metadata)
+            if intent is None:
+                continue
+
+            message.set("intent", intent, add_to_output=True)
+            message.set("intent_ranking", [intent], add_to_output=True)
+            entities = self._metadata_entities(metadata, message.get("text") or "")
+            if entities:
+                existing = list(message.get("entities") or [])
+                existing.extend(entities)
+                message.set("entities", existing, add_to_output=True)
+            message.set(ROUTED_ATTRIBUTE, True)
+
+        return messages
+
+    def process_training_data(self, training_data: TrainingData) -> TrainingData:
+        return training_data
+
+    def _resolve_intent(self, metadata: Dict[Text, Any]) -> Optional[Dict[Text, Any]]:
+        action_name = str(metadata.get("action") or "").strip().lower()
+        if action_name in self.action_intents:
+            return {"name": self.action_intents[action_name], "confidence": 1.0}
+
+        if not self.accept_metadata_intent:
+            return None
+
+        raw_intent = metadata.get("intent")
+        if isinstance(raw_intent, dict):
+            name = str(raw_intent.get("name") or "").strip()
+            try:
+                confidence = float(raw_intent.get("confidence", 1.0))
+            except (TypeError, ValueError):
+                confidence = 1.0
+        else:
+            name = str(raw_intent or "").strip()
+            confidence = 1.0
+
+        if not name:
+            return None
+        return {"name": name, "confidence": confidence}
+
+    @staticmethod
+    def _metadata_entities(
+        metadata: Dict[Text, Any], text: Text
+    ) -> List[Dict[Text, Any]]:
+        entities: List[Dict[Text, Any]] = []
+        raw_entities = metadata.get("entities")
+        if not isinstance(raw_entities, list):
+            return entities
+
+        for item in raw_entities:
+            if not isinstance(item, dict):
+                continue
+            entity_name = str(item.get("entity") or "").strip()
+            value = item.get("value")
+            if not entity_name or value is None or value == "":
+                continue
+
+            start, end = item.get("start"), item.get("end")
+            if not isinstance(start, int) or not isinstance(end, int):
+                # Button payloads rarely carry offsets; locate the value if we can.
+                start = max(0, text.find(str(value)))
+                end = start + len(str(value)) if str(value) in text else start
+            entities.append(
+                {
+                    "entity": entity_name,
+                    "value": value,
+                    "start": start,
+                    "end": end,
+                    "confidence": 1.0,
+                    "extractor": EXTRACTOR_NAME,
+                }
+            )
+        return entities
@@ -0,0 +1,153 @@
+"""
+Memory-mapped safetensors weights shared between Rasa worker processes.
+
+``mmap_safetensors`` maps ``model.safetensors`` read-only (copy-on-write) and
+returns tensors that are views into the mapping instead of private copies.
+Loading them into the model with ``assign=True`` makes the parameters those
+views, so every process serving the same file reads the same page-cache
+pages; a worker only pays for the pages it writes, and inference writes none.
+``memory_report`` reads ``/proc/self/smaps`` to show how much of that mapping
+is resident and how much of it other processes share.
+"""
+
+import json
+import os
+import struct
+from typing import Any, Callable, Dict, Iterable, Optional, Text
+
+SAFETENSORS_FILE = "model.safetensors"
+_DTYPES = {
+    "F64": "float64",
+    "F32": "float32",
+    "F16": "float16",
+    "BF16": "bfloat16",
+    "I64": "int64",
+    "I32": "int32",
+    "I16": "int16",
+    "I8": "int8",
+    "U8": "uint8",
+    "BOOL": "bool",
+}
+_MB = 1024
+
+
+def read_header(path: Text) -> Dict[Text, Any]:
+    """Tensor entries of a safetensors file, plus ``__data_start__``."""
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+    header.pop("__metadata__", None)
+    header["__data_start__"] = 8 + header_size
+    return header
+
+
+def mmap_safetensors(path: Text) -> Dict[Text, Any]:
+    """State dict whose tensors are views into a private read-only mapping."""
+    import torch
+
+    header = read_header(path)
+    data_start = header.pop("__data_start__")
+    storage = torch.UntypedStorage.from_file(
+        path, shared=False, nbytes=os.path.getsize(path)
+    )
+    data = torch.empty(0, dtype=torch.uint8)
+    data.set_(storage)
+
+    state_dict: Dict[Text, Any] = {}
+    for name, entry in header.items():
+        dtype = getattr(torch, _DTYPES[entry["dtype"]])
+        start, end = entry["data_offsets"]
+        raw = data[data_start + start : data_start + end]
+        if (data_start + start) % dtype.itemsize:
+            # Unaligned offsets cannot be viewed in place.
+            raw = raw.clone()
+        state_dict[name] = raw.view(dtype).reshape(entry["shape"])
+    return state_dict
+
+
+def _no_init_weights() -> Any:
+    """transformers' context manager that skips random init, wherever it lives."""
+    try:
+        from transformers.initialization import no_init_weights
+    except ImportError:
+        from transformers.modeling_utils import no_init_weights
+    return no_init_weights()
+
+
+def load_mmap_model(
+    from_config: Callable[[Any], Any], config: Any, weights_path: Text
+) -> Optional[Any]:
+    """Model built from ``config`` with its parameters mapped from ``weights_path``.
+
+    None when the file's keys don't match the model exactly, so the caller can
+    fall back to ``from_pretrained`` (which also handles renamed checkpoints).
+    """
+    state_dict = mmap_safetensors(weights_path)
+    # The parameters are replaced by the mapped tensors right away, so their
+    # uninitialized storage is never touched and never becomes resident.
+    with _no_init_weights():
+        model = from_config(config)
+    expected = set(model.state_dict())
+    if expected != set(state_dict):
+        return None
+    model.load_state_dict(state_dict, strict=True, assign=True)
+    return model
+
+
+def _smaps_fields(lines: Iterable[Text], path: Optional[Text]) -> Dict[Text, int]:
+    """Summed kB fields of the mappings of ``path`` (every mapping when None)."""
+    totals: Dict[Text, int] = {}
+    selected = path is None
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if not parts[0].endswith(":"):
+            # Mapping header: "start-end perms offset dev inode [pathname]".
+            selected = path is None or (len(parts) > 5 and parts[5] == path)
+        elif selected and len(parts) >= 2 and parts[1].isdigit():
+            totals[parts[0][:-1]] = totals.get(parts[0][:-1], 0) + int(parts[1])
+    return totals
+
+
+def memory_report(weights_path: Optional[Text]) -> Optional[Dict[Text, int]]:
+    """Resident / shared kB of the process and of the weights mapping.
+
+    None where ``/proc`` is unavailable (non-Linux).
+    """
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            process = _smaps_fields(f, None)
+        weights: Dict[Text, int] = {}
+        if weights_path:
+            with open("/proc/self/smaps", "r") as f:
+                weights = _smaps_fields(f, os.path.realpath(weights_path))
+    except OSError:
+        return None
+
+    return {
+        "rss": process.get("Rss", 0),
+        "pss": process.get("Pss", 0),
+        "shared": process.get("Shared_Clean", 0) + process.get("Shared_Dirty", 0),
+        "weights_rss": weights.get("Rss", 0),
+        "weights_shared": weights.get("Shared_Clean", 0) + weights.get("Shared_Dirty", 0),
+        "weights_private": weights.get("Private_Clean", 0) + weights.get("Private_Dirty", 0),
+    }
+
+
+def describe_memory(weights_path: Optional[Text]) -> Text:
+    report = memory_report(weights_path)
+    if report is None:
+        return "unavailable on this platform"
+
+    text = (
+        f"process rss={report['rss'] / _MB:.1f} MB, pss={report['pss'] / _MB:.1f} MB, "
+        f"shared={report['shared'] / _MB:.1f} MB"
+    )
+    if not weights_path:
+        return f"{text}; weights are private copies"
+    return (
+        f"{text}; mapped weights rss={report['weights_rss'] / _MB:.1f} MB, "
+        f"shared={report['weights_shared'] / _MB:.1f} MB, "
+        f"private={report['weights_private'] / _MB:.1f} MB"
+    )
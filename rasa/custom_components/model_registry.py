@@ -0,0 +1,321 @@
+"""
+Versioned PhoBERT model directories and hot swapping of the served version.
+
+Layout under a component's model directory (e.g. ``data/model/intent_model``):
+
+    ACTIVE                 name of the version to serve
+    history.json           versions activated so far, oldest first
+    versions/<version>/    model files + manifest.json
+    versions/<version>_int8/
+
+Without ``ACTIVE`` the directory itself is the (single, unversioned) model,
+as before. ``manifest.json`` records the version, a SHA-256 fingerprint of
+the weight files, the label maps and evaluation metrics; it is written by
+``data/phobert/tools/manage_models.py``, which also activates versions and
+rolls back.
+
+``ModelSlot`` holds the loaded version of one component. A watcher thread
+polls ``ACTIVE``; when it names another version, that version is loaded and
+warmed up in the background while requests keep using the current one, then
+swapped in with a single assignment. A version that fails to load or verify
+is never swapped in.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Text
+
+from custom_components.annotation_cache import create_annotation_store
+from custom_components.inference_executor import create_executor
+from custom_components.model_memory import describe_memory
+from custom_components.phobert_backend import (
+    QUANTIZED_SUFFIX,
+    create_backend,
+    resolve_model_dir,
+)
+from custom_components.prediction_cache import create_cache
+
+ACTIVE_FILE = "ACTIVE"
+HISTORY_FILE = "history.json"
+VERSIONS_DIR = "versions"
+MANIFEST_FILE = "manifest.json"
+UNVERSIONED = "unversioned"
+DEFAULT_WATCH_INTERVAL = 10.0
+# Files whose bytes define the model; tokenizer and label files are checked
+# through the manifest's label maps instead.
+WEIGHT_FILE_SUFFIXES = (".safetensors", ".bin", ".pt", ".onnx")
+
+
+def active_version(root: Text) -> Optional[Text]:
+    path = os.path.join(root, ACTIVE_FILE)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def version_dir(root: Text, version: Text) -> Text:
+    if version == UNVERSIONED:
+        return root
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def list_versions(root: Text) -> List[Text]:
+    versions_root = os.path.join(root, VERSIONS_DIR)
+    if not os.path.isdir(versions_root):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(versions_root)
+        if os.path.isdir(os.path.join(versions_root, name))
+        and not name.endswith(QUANTIZED_SUFFIX)
+    )
+
+
+def read_history(root: Text) -> List[Text]:
+    path = os.path.join(root, HISTORY_FILE)
+    if not os.path.isfile(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return list(json.load(f))
+
+
+def read_manifest(directory: Text) -> Optional[Dict[Text, Any]]:
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def weights_fingerprint(directory: Text) -> Text:
+    """SHA-256 over the names and bytes of the weight files in ``directory``."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path) or not name.endswith(WEIGHT_FILE_SUFFIXES):
+            continue
+        digest.update(name.encode("utf-8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_manifest(
+    directory: Text,
+    version: Text,
+    labels: Dict[Text, Dict[int, Text]],
+    metrics: Optional[Dict[Text, Any]] = None,
+    source: Optional[Text] = None,
+) -> Dict[Text, Any]:
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source": source,
+        "fingerprint": weights_fingerprint(directory),
+        "labels": {
+            task: {str(key): value for key, value in sorted(id2label.items())}
+            for task, id2label in labels.items()
+        },
+        "metrics": metrics or {},
+    }
+    _write_atomic(
+        os.path.join(directory, MANIFEST_FILE),
+        json.dumps(manifest, ensure_ascii=False, indent=2) + "\n",
+    )
+    return manifest
+
+
+def _write_atomic(path: Text, content: Text) -> None:
+    """Readers see either the old or the new file, never a partial one."""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def activate(root: Text, version: Text) -> None:
+    """Point ``ACTIVE`` at ``version``; running components pick it up."""
+    if not os.path.isdir(version_dir(root, version)):
+        raise FileNotFoundError(f"Unknown model version '{version}' in {root}")
+    history = read_history(root)
+    if not history or history[-1] != version:
+        history.append(version)
+    _write_atomic(os.path.join(root, HISTORY_FILE), json.dumps(history, indent=2) + "\n")
+    _write_atomic(os.path.join(root, ACTIVE_FILE), version + "\n")
+
+
+def rollback(root: Text) -> Text:
+    """Re-activate the version that was active before the current one."""
+    history = read_history(root)
+    current = active_version(root)
+    if current is not None and history and history[-1] == current:
+        history.pop()
+    if not history:
+        raise ValueError(f"No earlier model version to roll back to in {root}")
+    previous = history[-1]
+    _write_atomic(os.path.join(root, HISTORY_FILE), json.dumps(history, indent=2) + "\n")
+    _write_atomic(os.path.join(root, ACTIVE_FILE), previous + "\n")
+    return previous
+
+
+@dataclass
+class LoadedModel:
+    """Everything one component needs to serve one model version."""
+
+    version: Text
+    model_dir: Text
+    tokenizer: Any
+    encoder: Any
+    backend: Any
+    executor: Any
+    cache: Any
+    annotations: Any
+    manifest: Optional[Dict[Text, Any]]
+    labels: Dict[Text, Dict[int, Text]] = field(default_factory=dict)
+
+    def verify(self, name: Text) -> None:
+        """Check weights and label maps against the manifest, when there is one."""
+        if self.manifest is None:
+            return
+        fingerprint = weights_fingerprint(self.model_dir)
+        if fingerprint != self.manifest.get("fingerprint"):
+            raise ValueError(
+                f"[{name}] Weights in {self.model_dir} don't match {MANIFEST_FILE} "
+                f"(fingerprint {fingerprint[:12]}, expected "
+                f"{str(self.manifest.get('fingerprint'))[:12]})."
+            )
+        for task, id2label in self.labels.items():
+            expected = (self.manifest.get("labels") or {}).get(task)
+            if expected is None:
+                continue
+            if {int(key): value for key, value in expected.items()} != id2label:
+                raise ValueError(
+                    f"[{name}] {task} labels of {self.model_dir} don't match "
+                    f"{MANIFEST_FILE}."
+                )
+
+    def close(self) -> None:
+        self.executor.close()
+        if self.annotations is not None:
+            self.annotations.close()
+
+
+def load_phobert(
+    name: Text, root: Text, version: Text, task: Text, config: Dict[Text, Any]
+) -> LoadedModel:
+    """Tokenizer, backend and executor of ``version``, warmed up."""
+    # Imported here so manage_models.py can use this module without Rasa.
+    from custom_components.phobert_tokenizer import load_tokenizer
+    from custom_components.subword_encoding import DEFAULT_MEMO_SIZE, shared_encoder
+
+    directory = version_dir(root, version)
+    model_dir = resolve_model_dir(directory, config)
+    print(f"[{name}] Loading model version {version} from: {model_dir}")
+    tokenizer = load_tokenizer(model_dir, config.get("fast_tokenizer"))
+    encoder = shared_encoder(
+        tokenizer, model_dir, config.get("subword_memo_size", DEFAULT_MEMO_SIZE)
+    )
+    backend = create_backend(model_dir, task, config)
+    executor = create_executor(backend, tokenizer.pad_token_id, config, name)
+    if config.get("warmup", True):
+        warmup_ms = executor.warm_up(
+            tokenizer.bos_token_id, tokenizer.eos_token_id, tokenizer.unk_token_id
+        )
+        print(f"[{name}] Warm-up done in {warmup_ms:.0f} ms.")
+    print(f"[{name}] Memory: {describe_memory(backend.weights_path)}")
+
+    return LoadedModel(
+        version=version,
+        model_dir=model_dir,
+        tokenizer=tokenizer,
+        encoder=encoder,
+        backend=backend,
+        executor=executor,
+        cache=create_cache(name, model_dir, config),
+        annotations=create_annotation_store(name, model_dir, config),
+        # An _int8 directory carries its own manifest, written alongside.
+        manifest=read_manifest(model_dir),
+    )
+
+
+class ModelSlot:
+    """The model version one component serves, swapped when ACTIVE changes."""
+
+    def __init__(
+        self,
+        name: Text,
+        root: Text,
+        config: Dict[Text, Any],
+        load: Callable[[Text], LoadedModel],
+    ) -> None:
+        self.name = name
+        self.root = root
+        self._load = load
+        self._lock = threading.Lock()
+        self._failed_version: Optional[Text] = None
+        self.model = self._load_verified(self.wanted_version())
+
+        self.interval = float(config.get("model_watch_interval") or 0)
+        self._thread: Optional[threading.Thread] = None
+        if self.interval > 0:
+            self._thread = threading.Thread(
+                target=self._watch, name=f"{name}-model-watcher", daemon=True
+            )
+            self._thread.start()
+
+    def wanted_version(self) -> Text:
+        return active_version(self.root) or UNVERSIONED
+
+    def check(self) -> bool:
+        """Load and swap in the active version if it changed; True when swapped."""
+        wanted = self.wanted_version()
+        if wanted in (self.model.version, self._failed_version):
+            return False
+
+        with self._lock:
+            current = self.model
+            if wanted == current.version:
+                return False
+            try:
+                loaded = self._load_verified(wanted)
+            except Exception as exc:
+                # Don't retry every poll; a new ACTIVE value clears this.
+                self._failed_version = wanted
+                print(
+                    f"[{self.name}] Keeping model version {current.version}: "
+                    f"loading {wanted} failed: {exc}"
+                )
+                return False
+            self._failed_version = None
+            # Requests that already took the old model finish on it.
+            self.model = loaded
+
+        print(f"[{self.name}] Now serving model version {wanted} (was {current.version}).")
+        current.close()
+        return True
+
+    def _load_verified(self, version: Text) -> LoadedModel:
+        model = self._load(version)
+        try:
+            model.verify(self.name)
+        except Exception:
+            model.close()
+            raise
+        return model
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as exc:
+                print(f"[{self.name}] Model watcher error: {exc}")
@@ -0,0 +1,299 @@
+"""
+Inference backends shared by the PhoBERT intent and NER components.
+
+Every backend takes padded ``input_ids`` / ``attention_mask`` numpy arrays and
+returns raw logits as a numpy array (a tuple of them for the joint model, in
+``OUTPUT_NAMES`` order), so the components never touch torch directly and the
+ONNX path can run without importing it.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Text
+
+import numpy as np
+
+from custom_components.model_memory import SAFETENSORS_FILE, load_mmap_model
+
+SEQUENCE_CLASSIFICATION = "sequence_classification"
+TOKEN_CLASSIFICATION = "token_classification"
+JOINT_CLASSIFICATION = "joint_classification"
+OUTPUT_NAMES = {
+    SEQUENCE_CLASSIFICATION: ("logits",),
+    TOKEN_CLASSIFICATION: ("logits",),
+    JOINT_CLASSIFICATION: ("intent_logits", "ner_logits"),
+}
+SUPPORTED_BACKENDS = ("torch", "onnx")
+SUPPORTED_QUANTIZATION = ("none", "int8")
+ONNX_FILE_NAME = "model.onnx"
+# Written by data/phobert/tools/quantize_models.py into ``<model_dir>_int8``.
+QUANTIZED_SUFFIX = "_int8"
+QUANTIZED_WEIGHTS_NAME = "quantized_model.pt"
+SUPPORTED_DEVICES = ("auto", "cpu", "cuda")
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def resolve_model_dir(model_dir: Text, config: Dict[Text, Any]) -> Text:
+    """Return the checkpoint directory selected by the ``quantize`` option."""
+    quantize = str(config.get("quantize") or "none").strip().lower()
+    if quantize not in SUPPORTED_QUANTIZATION:
+        raise ValueError(
+            f"Unsupported quantize value '{quantize}'. "
+            f"Expected one of: {', '.join(SUPPORTED_QUANTIZATION)}"
+        )
+    if quantize == "none":
+        return model_dir
+
+    quantized_dir = model_dir.rstrip("\\/") + QUANTIZED_SUFFIX
+    if not os.path.isdir(quantized_dir):
+        raise FileNotFoundError(
+            f"Missing quantized checkpoint: {quantized_dir}. "
+            "Run data/phobert/tools/quantize_models.py first."
+        )
+    return quantized_dir
+
+
+def parse_cpu_list(value: Any) -> List[int]:
+    """CPU ids from a list of ints or a string such as ``"0-3,8"``."""
+    if value is None or value == "":
+        return []
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return sorted({int(cpu) for cpu in value})
+    cpus = set()
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus: List[int]) -> Text:
+    """Inverse of ``parse_cpu_list``: ``[0, 1, 2, 3, 8]`` -> ``"0-3,8"``."""
+    ranges: List[List[int]] = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def apply_cpu_affinity(config: Dict[Text, Any]) -> Optional[List[int]]:
+    """Pin the calling thread to ``cpu_affinity``; the CPUs actually in use.
+
+    Threads started afterwards (the inference worker, torch's and onnxruntime's
+    pools) inherit the mask, so this runs before the backend is built. Returns
+    None where the platform has no ``sched_setaffinity``.
+    """
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = parse_cpu_list(config.get("cpu_affinity"))
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    return sorted(os.sched_getaffinity(0))
+
+
+def resolve_device(torch: Any, config: Dict[Text, Any]) -> Any:
+    device = str(config.get("device") or "auto").strip().lower()
+    if device not in SUPPORTED_DEVICES:
+        raise ValueError(
+            f"Unsupported device '{device}'. "
+            f"Expected one of: {', '.join(SUPPORTED_DEVICES)}"
+        )
+    if device == "auto":
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    elif device == "cuda" and not torch.cuda.is_available():
+        raise ValueError("device: cuda was requested but CUDA is not available.")
+    return torch.device(device)
+
+
+def configure_torch_threads(torch: Any, config: Dict[Text, Any]) -> None:
+    """Apply ``num_threads`` / ``interop_threads``; both are process-wide."""
+    num_threads = int(config.get("num_threads") or 0)
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+    interop_threads = int(config.get("interop_threads") or 0)
+    if interop_threads > 0 and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Only settable once, before any inter-op work in the process.
+            print(
+                f"[PhoBERT] interop_threads={interop_threads} ignored: already "
+                f"fixed at {torch.get_num_interop_threads()} for this process."
+            )
+
+
+def describe(backend: Any) -> Text:
+    """Effective runtime settings of ``backend`` for the startup log line."""
+    settings = {"backend": backend.name, "device": backend.device, **backend.settings}
+    if backend.cpu_affinity is not None:
+        settings["cpu_affinity"] = format_cpu_list(backend.cpu_affinity)
+    return ", ".join(f"{key}={value}" for key, value in settings.items())
+
+
+class TorchBackend:
+    """Eager-mode ``transformers`` model, optionally with int8 linear layers."""
+
+    name = "torch"
+
+    def __init__(self, model_dir: Text, task: Text, config: Dict[Text, Any]) -> None:
+        import torch
+        from transformers import (
+            AutoConfig,
+            AutoModelForSequenceClassification,
+            AutoModelForTokenClassification,
+        )
+
+        if task == JOINT_CLASSIFICATION:
+            from custom_components.joint_model import PhobertJointModel
+
+            model_cls = PhobertJointModel
+            from_config = PhobertJointModel._from_config
+        else:
+            model_cls = (
+                AutoModelForSequenceClassification
+                if task == SEQUENCE_CLASSIFICATION
+                else AutoModelForTokenClassification
+            )
+            from_config = model_cls.from_config
+
+        self._torch = torch
+        self._output_names = OUTPUT_NAMES[task]
+        # Set when the parameters are views into a shared safetensors mapping.
+        self.weights_path: Optional[Text] = None
+        configure_torch_threads(torch, config)
+        # inference_mode also skips version-counter bookkeeping no_grad keeps.
+        self._grad_context = (
+            torch.inference_mode
+            if config.get("inference_mode", True)
+            else torch.no_grad
+        )
+        quantized_weights = os.path.join(model_dir, QUANTIZED_WEIGHTS_NAME)
+        if os.path.exists(quantized_weights):
+            # Dynamic int8 kernels are CPU-only.
+            self.device = torch.device("cpu")
+            self.model = from_config(AutoConfig.from_pretrained(model_dir))
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            # Our own artifact; packed int8 params need the full unpickler.
+            state_dict = torch.load(
+                quantized_weights, map_location="cpu", weights_only=False
+            )
+            self.model.load_state_dict(state_dict)
+        else:
+            self.device = resolve_device(torch, config)
+            self.model = None
+            weights_path = os.path.join(model_dir, SAFETENSORS_FILE)
+            if (
+                config.get("mmap_weights", True)
+                and self.device.type == "cpu"
+                and os.path.isfile(weights_path)
+            ):
+                self.model = load_mmap_model(
+                    from_config, AutoConfig.from_pretrained(model_dir), weights_path
+                )
+                if self.model is not None:
+                    self.weights_path = weights_path
+            if self.model is None:
+                self.model = model_cls.from_pretrained(model_dir)
+        self.model.to(self.device)
+        self.model.eval()
+        self.config = self.model.config
+        self.cpu_affinity: Optional[List[int]] = None
+        self.settings = {
+            "intra_op_threads": torch.get_num_threads(),
+            "interop_threads": torch.get_num_interop_threads(),
+            "inference_mode": self._grad_context is torch.inference_mode,
+            "mmap_weights": self.weights_path is not None,
+        }
+
+    def run(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> Any:
+        torch = self._torch
+        with self._grad_context():
+            outputs = self.model(
+                input_ids=torch.as_tensor(input_ids, dtype=torch.long, device=self.device),
+                attention_mask=torch.as_tensor(
+                    attention_mask, dtype=torch.long, device=self.device
+                ),
+            )
+        logits = tuple(
+            outputs[name].float().cpu().numpy() for name in self._output_names
+        )
+        return logits if len(logits) > 1 else logits[0]
+
+
+class OnnxBackend:
+    """ONNX Runtime session over a graph written by ``tools/export_onnx.py``."""
+
+    name = "onnx"
+
+    def __init__(self, model_dir: Text, task: Text, config: Dict[Text, Any]) -> None:
+        import onnxruntime as ort
+        from transformers import AutoConfig
+
+        onnx_path = os.path.join(model_dir, ONNX_FILE_NAME)
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"Missing ONNX graph: {onnx_path}. "
+                "Run data/phobert/tools/export_onnx.py first."
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # One message batch at a time; parallelism lives inside the matmuls.
+        options.inter_op_num_threads = 1
+        num_threads = int(config.get("num_threads") or 0)
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+
+        self._output_names = list(OUTPUT_NAMES[task])
+        self.device = "cpu"
+        self.session = ort.InferenceSession(
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.config = AutoConfig.from_pretrained(model_dir)
+        self.weights_path: Optional[Text] = None
+        self.cpu_affinity: Optional[List[int]] = None
+        self.settings = {
+            "intra_op_threads": num_threads or "default",
+            "interop_threads": options.inter_op_num_threads,
+        }
+
+    def run(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> Any:
+        logits = self.session.run(
+            self._output_names,
+            {
+                "input_ids": np.asarray(input_ids, dtype=np.int64),
+                "attention_mask": np.asarray(attention_mask, dtype=np.int64),
+            },
+        )
+        return tuple(logits) if len(logits) > 1 else logits[0]
+
+
+def create_backend(model_dir: Text, task: Text, config: Dict[Text, Any]) -> Any:
+    """Instantiate the backend selected by the component ``backend`` option."""
+    backend = str(config.get("backend") or "torch").strip().lower()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(
+            f"Unsupported PhoBERT backend '{backend}'. "
+            f"Expected one of: {', '.join(SUPPORTED_BACKENDS)}"
+        )
+    cpu_affinity = apply_cpu_affinity(config)
+    if backend == "onnx":
+        instance: Any = OnnxBackend(model_dir, task, config)
+    else:
+        instance = TorchBackend(model_dir, task, config)
+    instance.cpu_affinity = cpu_affinity
+    return instance
@@ -2,9 +2,6 @@ import json
 import os
 from typing import Any, Dict, List, Text
 
-import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-
 from rasa.engine.graph import GraphComponent
 from rasa.engine.graph import ExecutionContext
 from rasa.engine.recipes.default_recipe import DefaultV1Recipe
@@ -14,6 +11,23 @@ from rasa.nlu.classifiers.classifier import IntentClassifier
 from rasa.shared.nlu.training_data.message import Message
 from rasa.shared.nlu.training_data.training_data import TrainingData
 
+from custom_components.annotation_cache import DEFAULT_ANNOTATION_CACHE
+from custom_components.inference_executor import DEFAULT_MAX_WAIT_MS
+from custom_components.metadata_intent_router import is_routed
+from custom_components.model_registry import (
+    DEFAULT_WATCH_INTERVAL,
+    LoadedModel,
+    ModelSlot,
+    load_phobert,
+)
+from custom_components.phobert_backend import (
+    SEQUENCE_CLASSIFICATION,
+    describe,
+    softmax,
+)
+from custom_components.phobert_tokenizer import load_tokenizer
+from custom_components.subword_encoding import DEFAULT_MEMO_SIZE, message_words, truncate
+
 # Path to fine-tuned intent model directory.
 _MODEL_DIR = os.path.join(
     os.path.dirname(__file__),
@@ -25,32 +39,119 @@ _MODEL_DIR = os.path.join(
 _MODEL_DIR = os.path.abspath(_MODEL_DIR)
 
 
+def set_intent(message: Message, probs: List[float], id2label: Dict[int, str]) -> None:
+    sorted_ids = sorted(range(len(probs)), key=probs.__getitem__, reverse=True)
+
+    top_id = sorted_ids[0]
+    intent_ranking = [
+        {"name": id2label[idx], "confidence": probs[idx]}
+        for idx in sorted_ids
+    ]
+
+    message.set(
+        "intent",
+        {"name": id2label[top_id], "confidence": probs[top_id]},
+        add_to_output=True,
+    )
+    message.set("intent_ranking", intent_ranking, add_to_output=True)
+
+
 @DefaultV1Recipe.register(
     [DefaultV1Recipe.ComponentType.INTENT_CLASSIFIER], is_trainable=False
 )
 class PhobertIntentClassifier(IntentClassifier, GraphComponent):
     """Custom Intent Classifier using fine-tuned PhoBERT."""
 
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            # Maximum number of messages per forward pass, coalesced across
+            # concurrent parses by the inference executor.
+            "batch_size": 32,
+            # How long the executor waits after a message for others to share
+            # its forward pass.
+            "max_wait_ms": DEFAULT_MAX_WAIT_MS,
+            # Run forwards on a dedicated worker thread; False runs them inline
+            # in length-sorted batches.
+            "inference_thread": True,
+            # "torch" (eager transformers) or "onnx" (onnxruntime, see
+            # data/phobert/tools/export_onnx.py).
+            "backend": "torch",
+            # "auto" (cuda when available), "cpu" or "cuda"; torch backend only.
+            "device": "auto",
+            # Intra-op threads (torch and onnx); 0 keeps the runtime default.
+            # torch's count is process-wide, shared by all PhoBERT components.
+            "num_threads": 0,
+            # torch inter-op threads; 0 keeps the default. Settable once per
+            # process, so the first component to load decides.
+            "interop_threads": 0,
+            # CPUs to pin inference to, e.g. "0-3" or [0, 1]; None leaves the
+            # process's affinity alone (Linux only).
+            "cpu_affinity": None,
+            # Run torch forwards under torch.inference_mode() instead of no_grad.
+            "inference_mode": True,
+            # Run fixed inputs through the model at startup so the first parse
+            # doesn't pay for lazy initialization.
+            "warmup": True,
+            # Map model.safetensors read-only instead of copying it, so worker
+            # processes serving the same file share its pages (torch, CPU).
+            "mmap_weights": True,
+            # Seconds between checks of <model_dir>/ACTIVE (data/phobert/tools/
+            # manage_models.py); a new version is loaded in the background and
+            # swapped in. 0 disables the watcher.
+            "model_watch_interval": DEFAULT_WATCH_INTERVAL,
+            # "none" or "int8" (loads <model_dir>_int8 written by
+            # data/phobert/tools/quantize_models.py).
+            "quantize": "none",
+            # Max cached predictions (LRU, keyed by normalized text + model
+            # fingerprint); 0 disables the cache.
+            "cache_size": 0,
+            # Seconds a cached prediction stays valid; 0 means no expiry.
+            "cache_ttl": 3600,
+            # Use <model_dir>/fast_tokenizer.json (data/phobert/tools/
+            # convert_tokenizer.py): None when present, True requires it.
+            "fast_tokenizer": None,
+            # Words whose subword ids are memoized (shared with the other
+            # PhoBERT components on the same vocabulary).
+            "subword_memo_size": DEFAULT_MEMO_SIZE,
+            # Run the model over the training examples during `rasa train`.
+            # Off by default: the component is not trainable and would
+            # overwrite the gold intents with its own predictions.
+            "annotate_training_data": False,
+            # SQLite file caching those annotations across `rasa train` runs,
+            # keyed by model fingerprint and example text; None disables it.
+            "annotation_cache": DEFAULT_ANNOTATION_CACHE,
+        }
+
     def __init__(self, config: Dict[Text, Any]) -> None:
         # IntentClassifier in this Rasa version has no __init__(config).
         self._config = config
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-        print(f"[PhobertIntentClassifier] Loading model from: {_MODEL_DIR}")
-        self.tokenizer = AutoTokenizer.from_pretrained(_MODEL_DIR)
-        self.model = AutoModelForSequenceClassification.from_pretrained(_MODEL_DIR)
-        self.model.to(self.device)
-        self.model.eval()
-
-        labels_path = os.path.join(_MODEL_DIR, "intent_labels.json")
+        self.slot = ModelSlot("PhobertIntentClassifier", _MODEL_DIR, config, self._load)
+
+    def _load(self, version: Text) -> LoadedModel:
+        model = load_phobert(
+            "PhobertIntentClassifier",
+            _MODEL_DIR,
+            version,
+            SEQUENCE_CLASSIFICATION,
+            self._config,
+        )
+        labels_path = os.path.join(model.model_dir, "intent_labels.json")
         with open(labels_path, "r", encoding="utf-8-sig") as f:
             raw_id2label: Dict[str, str] = json.load(f)
 
-        self.id2label = self._validate_and_normalize_id2label(raw_id2label)
-        print(f"[PhobertIntentClassifier] Loaded {len(self.id2label)} intents.")
+        model.labels["intent"] = self._validate_and_normalize_id2label(
+            raw_id2label, int(model.backend.config.num_labels)
+        )
+        print(
+            f"[PhobertIntentClassifier] Loaded {len(model.labels['intent'])} intents "
+            f"({describe(model.backend)}, "
+            f"fast_tokenizer={model.tokenizer.is_fast})."
+        )
+        return model
 
     def _validate_and_normalize_id2label(
-        self, raw_id2label: Dict[str, str]
+        self, raw_id2label: Dict[str, str], expected_num_labels: int
     ) -> Dict[int, str]:
         """Validate label mapping against model num_labels and enforce strict ids."""
         if not isinstance(raw_id2label, dict):
@@ -67,7 +168,6 @@ class PhobertIntentClassifier(IntentClassifier, GraphComponent):
                 )
             normalized[int(key)] = value
 
-        expected_num_labels = int(self.model.config.num_labels)
         expected_keys = list(range(expected_num_labels))
         actual_keys = sorted(normalized.keys())
 
@@ -97,49 +197,60 @@ class PhobertIntentClassifier(IntentClassifier, GraphComponent):
         return cls(config)
 
     def process(self, messages: List[Message]) -> List[Message]:
+        # One version for the whole call, even if a new one is swapped in.
+        model = self.slot.model
+        id2label = model.labels["intent"]
+        pending: List[Message] = []
+        cache_keys: List[Text] = []
         for message in messages:
             text = message.get("text")
-            if not text:
+            if not text or is_routed(message):
                 continue
-
-            inputs = self.tokenizer(
-                text,
-                return_tensors="pt",
-                max_length=256,
-                truncation=True,
-                padding=True,
-            )
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                probs = torch.softmax(outputs.logits, dim=-1)[0]
-
-            sorted_indices = torch.argsort(probs, descending=True)
-
-            top_id = sorted_indices[0].item()
-            top_name = self.id2label[top_id]
-            top_conf = probs[top_id].item()
-
-            intent_ranking = [
-                {
-                    "name": self.id2label[idx.item()],
-                    "confidence": probs[idx.item()].item(),
-                }
-                for idx in sorted_indices
-            ]
-
-            message.set(
-                "intent",
-                {"name": top_name, "confidence": top_conf},
-                add_to_output=True,
-            )
-            message.set("intent_ranking", intent_ranking, add_to_output=True)
+            if model.cache is not None:
+                key = model.cache.key([text])
+                cached = model.cache.get(key)
+                if cached is not None:
+                    set_intent(message, cached, id2label)
+                    continue
+                cache_keys.append(key)
+            pending.append(message)
+
+        if not pending:
+            return messages
+
+        for index, probs in enumerate(self._predict(model, pending)):
+            set_intent(pending[index], probs, id2label)
+            if model.cache is not None:
+                model.cache.put(cache_keys[index], probs)
 
         return messages
 
+    @staticmethod
+    def _predict(model: LoadedModel, messages: List[Message]) -> List[List[float]]:
+        """Intent probabilities for each message."""
+        # Segmented words, as in intent_train.json; the encoding is stored on
+        # the message for the NER component, which needs all of it.
+        encoded = [truncate(*model.encoder.encode(message)[1:])[0] for message in messages]
+        return [softmax(logits).tolist() for logits in model.executor.run(encoded)]
+
     def process_training_data(self, training_data: TrainingData) -> TrainingData:
-        self.process(training_data.training_examples)
+        model = self.slot.model
+        if model.annotations is None:
+            # The examples keep their gold intents.
+            return training_data
+
+        pending = [
+            message
+            for message in training_data.training_examples
+            if message.get("text") and not is_routed(message)
+        ]
+        if pending:
+            words = [message_words(message) for message in pending]
+            predictions = model.annotations.predict(
+                pending, words, lambda batch: self._predict(model, batch)
+            )
+            for message, probs in zip(pending, predictions):
+                set_intent(message, probs, model.labels["intent"])
         return training_data
 
 
@@ -148,10 +259,13 @@ if __name__ == "__main__":
     import io
     import sys
 
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
 
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    tokenizer = AutoTokenizer.from_pretrained(_MODEL_DIR)
+    tokenizer = load_tokenizer(_MODEL_DIR)
     model = AutoModelForSequenceClassification.from_pretrained(_MODEL_DIR)
     model.to(device)
     model.eval()
@@ -183,4 +297,4 @@ if __name__ == "__main__":
             probs = torch.softmax(model(**inputs).logits, dim=-1)[0]
 
         top_id = torch.argmax(probs).item()
-        print(f"  [{probs[top_id]:.2%}] '{sent}' => {id2label[top_id]}")
+        print(f"  [{probs[top_id]:.2%}] '{sent}' => {id2label[top_id]}")
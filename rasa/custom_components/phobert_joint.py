@@ -0,0 +1,257 @@
+import os
+from typing import Any, Dict, List, Text, Tuple
+
+from rasa.engine.graph import ExecutionContext, GraphComponent
+from rasa.engine.recipes.default_recipe import DefaultV1Recipe
+from rasa.engine.storage.resource import Resource
+from rasa.engine.storage.storage import ModelStorage
+from rasa.nlu.classifiers.classifier import IntentClassifier
+from rasa.nlu.extractors.extractor import EntityExtractorMixin
+from rasa.shared.nlu.training_data.message import Message
+from rasa.shared.nlu.training_data.training_data import TrainingData
+
+from custom_components.annotation_cache import DEFAULT_ANNOTATION_CACHE
+from custom_components.bio_decoding import DECODERS, GREEDY
+from custom_components.inference_executor import DEFAULT_MAX_WAIT_MS
+from custom_components.metadata_intent_router import is_routed
+from custom_components.model_registry import (
+    DEFAULT_WATCH_INTERVAL,
+    LoadedModel,
+    ModelSlot,
+    load_phobert,
+)
+from custom_components.phobert_backend import (
+    JOINT_CLASSIFICATION,
+    describe,
+    softmax,
+)
+from custom_components.phobert_intent import set_intent
+from custom_components.phobert_ner import (
+    align_predictions,
+    build_entities,
+    has_gemini_entities,
+    run_windows,
+    window_stride,
+)
+from custom_components.subword_encoding import (
+    DEFAULT_MEMO_SIZE,
+    DEFAULT_WINDOW_STRIDE,
+    merge_windows,
+    message_words,
+)
+
+# Written by data/phobert/tools/train_joint.py.
+_MODEL_DIR = os.path.join(
+    os.path.dirname(__file__),
+    "..", "data", "model", "joint_model",
+)
+_MODEL_DIR = os.path.abspath(_MODEL_DIR)
+
+
+@DefaultV1Recipe.register(
+    [
+        DefaultV1Recipe.ComponentType.INTENT_CLASSIFIER,
+        DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR,
+    ],
+    is_trainable=False,
+)
+class PhobertJointClassifier(IntentClassifier, EntityExtractorMixin, GraphComponent):
+    """Intent classifier and entity extractor sharing one PhoBERT encoder pass.
+
+    Replaces PhobertIntentClassifier + PhobertEntityExtractor in the pipeline.
+    """
+
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            # Maximum number of messages per forward pass, coalesced across
+            # concurrent parses by the inference executor.
+            "batch_size": 32,
+            # How long the executor waits after a message for others to share
+            # its forward pass.
+            "max_wait_ms": DEFAULT_MAX_WAIT_MS,
+            # Run forwards on a dedicated worker thread; False runs them inline
+            # in length-sorted batches.
+            "inference_thread": True,
+            # "torch" (eager transformers) or "onnx" (onnxruntime, see
+            # data/phobert/tools/export_onnx.py).
+            "backend": "torch",
+            # "auto" (cuda when available), "cpu" or "cuda"; torch backend only.
+            "device": "auto",
+            # Intra-op threads (torch and onnx); 0 keeps the runtime default.
+            # torch's count is process-wide, shared by all PhoBERT components.
+            "num_threads": 0,
+            # torch inter-op threads; 0 keeps the default. Settable once per
+            # process, so the first component to load decides.
+            "interop_threads": 0,
+            # CPUs to pin inference to, e.g. "0-3" or [0, 1]; None leaves the
+            # process's affinity alone (Linux only).
+            "cpu_affinity": None,
+            # Run torch forwards under torch.inference_mode() instead of no_grad.
+            "inference_mode": True,
+            # Run fixed inputs through the model at startup so the first parse
+            # doesn't pay for lazy initialization.
+            "warmup": True,
+            # Map model.safetensors read-only instead of copying it, so worker
+            # processes serving the same file share its pages (torch, CPU).
+            "mmap_weights": True,
+            # Seconds between checks of <model_dir>/ACTIVE (data/phobert/tools/
+            # manage_models.py); a new version is loaded in the background and
+            # swapped in. 0 disables the watcher.
+            "model_watch_interval": DEFAULT_WATCH_INTERVAL,
+            # "none" or "int8" (loads <model_dir>_int8).
+            "quantize": "none",
+            # Max cached predictions (LRU, keyed by normalized segmented text +
+            # model fingerprint); 0 disables the cache.
+            "cache_size": 0,
+            # Seconds a cached prediction stays valid; 0 means no expiry.
+            "cache_ttl": 3600,
+            # Split messages longer than 256 subwords into overlapping windows
+            # for the entities; the intent still comes from the first window.
+            "sliding_window": True,
+            # Subwords shared by consecutive windows.
+            "window_stride": DEFAULT_WINDOW_STRIDE,
+            # "greedy" (best label per word) or "viterbi" (best label sequence
+            # in which I-x only follows B-x/I-x).
+            "bio_decoder": GREEDY,
+            # Use <model_dir>/fast_tokenizer.json (data/phobert/tools/
+            # convert_tokenizer.py): None when present, True requires it.
+            "fast_tokenizer": None,
+            # Words whose subword ids are memoized (shared with the other
+            # PhoBERT components on the same vocabulary).
+            "subword_memo_size": DEFAULT_MEMO_SIZE,
+            # Run the model over the training examples during `rasa train`.
+            # Off by default: the component is not trainable and would
+            # overwrite the gold intents and entities with its own predictions.
+            "annotate_training_data": False,
+            # SQLite file caching those annotations across `rasa train` runs,
+            # keyed by model fingerprint and example text; None disables it.
+            "annotation_cache": DEFAULT_ANNOTATION_CACHE,
+        }
+
+    def __init__(self, config: Dict[Text, Any]) -> None:
+        self._config = config
+        if config.get("bio_decoder", GREEDY) not in DECODERS:
+            raise ValueError(
+                f"[PhobertJointClassifier] Unknown bio_decoder '{config.get('bio_decoder')}'. "
+                f"Use one of {DECODERS}."
+            )
+        self.slot = ModelSlot("PhobertJointClassifier", _MODEL_DIR, config, self._load)
+
+    def _load(self, version: Text) -> LoadedModel:
+        model = load_phobert(
+            "PhobertJointClassifier", _MODEL_DIR, version, JOINT_CLASSIFICATION, self._config
+        )
+        model_config = model.backend.config
+        model.labels["intent"] = {
+            int(key): value for key, value in model_config.intent_id2label.items()
+        }
+        model.labels["ner"] = {
+            int(key): value for key, value in model_config.ner_id2label.items()
+        }
+        print(
+            f"[PhobertJointClassifier] Loaded {len(model.labels['intent'])} intents, "
+            f"{len(model.labels['ner'])} entity labels "
+            f"({describe(model.backend)}, "
+            f"fast_tokenizer={model.tokenizer.is_fast})."
+        )
+        return model
+
+    @classmethod
+    def create(
+        cls,
+        config: Dict[Text, Any],
+        model_storage: ModelStorage,
+        resource: Resource,
+        execution_context: ExecutionContext,
+    ) -> "PhobertJointClassifier":
+        return cls(config)
+
+    def _predict(
+        self, model: LoadedModel, messages: List[Message]
+    ) -> List[Tuple[List[float], List[Dict[str, Any]]]]:
+        """(intent probs, word-aligned BIO predictions) for each message."""
+        encoded = [model.encoder.encode(message) for message in messages]
+        predictions: List[Tuple[List[float], List[Dict[str, Any]]]] = []
+        windowed = run_windows(
+            model.executor,
+            [(input_ids, word_ids) for _, input_ids, word_ids in encoded],
+            window_stride(self._config),
+        )
+        for (words, _, _), (rows, starts, word_ids) in zip(encoded, windowed):
+            # The intent comes from the first window, as with truncation.
+            intent_logits = rows[0][0]
+            token_probs = softmax(
+                merge_windows([ner_logits for _, ner_logits in rows], starts, len(word_ids))
+            )
+            aligned = align_predictions(
+                words,
+                word_ids,
+                token_probs,
+                model.labels["ner"],
+                self._config.get("bio_decoder", GREEDY),
+            )
+            predictions.append((softmax(intent_logits).tolist(), aligned))
+
+        return predictions
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        pending = [
+            message
+            for message in messages
+            if message.get("text") and not is_routed(message)
+        ]
+        if not pending:
+            return messages
+
+        # One version for the whole call, even if a new one is swapped in.
+        model = self.slot.model
+        words = [message_words(message) for message in pending]
+        predictions: List[Any] = [None] * len(pending)
+        cache_keys: List[Text] = []
+        if model.cache is not None:
+            cache_keys = [model.cache.key(item) for item in words]
+            predictions = [model.cache.get(key) for key in cache_keys]
+
+        missing = [index for index, prediction in enumerate(predictions) if prediction is None]
+        if missing:
+            computed = self._predict(model, [pending[index] for index in missing])
+            for index, prediction in zip(missing, computed):
+                predictions[index] = prediction
+                if model.cache is not None:
+                    model.cache.put(cache_keys[index], prediction)
+
+        self._apply(model, pending, predictions)
+        return messages
+
+    @staticmethod
+    def _apply(model: LoadedModel, messages: List[Message], predictions: List[Any]) -> None:
+        for message, (intent_probs, aligned) in zip(messages, predictions):
+            set_intent(message, intent_probs, model.labels["intent"])
+            if has_gemini_entities(message):
+                continue
+
+            # Offsets always come from this message's own text.
+            entities = build_entities(aligned, message, "PhobertJointClassifier")
+            existing = list(message.get("entities") or [])
+            existing.extend(entities)
+            message.set("entities", existing, add_to_output=True)
+
+    def process_training_data(self, training_data: TrainingData) -> TrainingData:
+        model = self.slot.model
+        if model.annotations is None:
+            # The examples keep their gold intents and entities.
+            return training_data
+
+        pending = [
+            message
+            for message in training_data.training_examples
+            if message.get("text") and not is_routed(message)
+        ]
+        if pending:
+            words = [message_words(message) for message in pending]
+            predictions = model.annotations.predict(
+                pending, words, lambda batch: self._predict(model, batch)
+            )
+            self._apply(model, pending, predictions)
+        return training_data
@@ -1,17 +1,53 @@
 import os
-from typing import Any, Dict, List, Optional, Text
-
-import torch
-from transformers import AutoModelForTokenClassification, AutoTokenizer
+from typing import Any, Dict, List, Optional, Text, Tuple
 
+import numpy as np
 from rasa.engine.graph import ExecutionContext, GraphComponent
 from rasa.engine.recipes.default_recipe import DefaultV1Recipe
 from rasa.engine.storage.resource import Resource
 from rasa.engine.storage.storage import ModelStorage
+from rasa.nlu.constants import TOKENS_NAMES
 from rasa.nlu.extractors.extractor import EntityExtractorMixin
+from rasa.shared.nlu.constants import TEXT
 from rasa.shared.nlu.training_data.message import Message
 from rasa.shared.nlu.training_data.training_data import TrainingData
 
+from custom_components.annotation_cache import DEFAULT_ANNOTATION_CACHE
+from custom_components.bio_decoding import (
+    DECODERS,
+    GREEDY,
+    decode,
+    entity_spans,
+    first_subwords,
+)
+from custom_components.extraction_gate import (
+    DEFAULT_GATE_MIN_CONFIDENCE,
+    DEFAULT_INTENT_EXTRACTORS,
+    intent_allows,
+)
+from custom_components.inference_executor import DEFAULT_MAX_WAIT_MS
+from custom_components.metadata_intent_router import is_routed
+from custom_components.model_registry import (
+    DEFAULT_WATCH_INTERVAL,
+    LoadedModel,
+    ModelSlot,
+    load_phobert,
+)
+from custom_components.phobert_backend import (
+    TOKEN_CLASSIFICATION,
+    describe,
+    softmax,
+)
+from custom_components.phobert_tokenizer import load_tokenizer
+from custom_components.subword_encoding import (
+    DEFAULT_MEMO_SIZE,
+    DEFAULT_WINDOW_STRIDE,
+    merge_windows,
+    message_words,
+    split_windows,
+    truncate,
+)
+
 _MODEL_DIR = os.path.join(
     os.path.dirname(__file__),
     "..", "data", "model", "ner_model",
@@ -20,29 +56,244 @@ _MODEL_DIR = os.path.abspath(_MODEL_DIR)
 _GEMINI_EXTRACTOR = "GeminiMetadataEntityExtractor"
 
 
+def align_predictions(
+    words: List[str],
+    word_ids: List[Optional[int]],
+    token_probs: np.ndarray,
+    id2label: Dict[int, str],
+    decoder: Text = GREEDY,
+) -> List[Dict[str, Any]]:
+    """Decode subword probabilities into one BIO label per original word."""
+    first = first_subwords(word_ids)
+    labels = [id2label.get(index, "O") for index in range(token_probs.shape[-1])]
+    label_ids, probs = decode(token_probs[first], labels, decoder)
+    return [
+        {"word": words[word_ids[position]], "label": labels[label_id], "prob": prob}
+        for position, label_id, prob in zip(first.tolist(), label_ids.tolist(), probs.tolist())
+    ]
+
+
+def window_stride(config: Dict[Text, Any]) -> Optional[int]:
+    """Overlap of the windows long messages are split into; None truncates."""
+    if not config.get("sliding_window", True):
+        return None
+    return int(config.get("window_stride", DEFAULT_WINDOW_STRIDE))
+
+
+def _cut(output: Any, length: int) -> Any:
+    """Drop the executor's padding from token-level (2-D) outputs."""
+    if isinstance(output, tuple):
+        return tuple(_cut(item, length) for item in output)
+    return output[:length] if output.ndim == 2 else output
+
+
+def run_windows(
+    executor: Any, encoded: List[Tuple[List[int], List[Optional[int]]]], stride: Optional[int]
+) -> List[Tuple[List[Any], List[int], List[Optional[int]]]]:
+    """Executor rows of every message's windows, from one batched run.
+
+    Returns, per message, the rows of its windows (cut to their length), the
+    windows' offsets for ``merge_windows`` and the word ids the rows cover.
+    With ``stride`` None a long message is truncated to its first window.
+    """
+    batch: List[List[int]] = []
+    spans: List[Tuple[int, List[int], List[Optional[int]]]] = []
+    for input_ids, word_ids in encoded:
+        if stride is None:
+            input_ids, word_ids = truncate(input_ids, word_ids)
+        windows, starts = split_windows(input_ids, word_ids, stride or 0)
+        spans.append((len(batch), starts, word_ids))
+        batch.extend(windows)
+
+    rows = executor.run(batch)
+    return [
+        (
+            [_cut(rows[index], len(batch[index])) for index in range(first, first + len(starts))],
+            starts,
+            word_ids,
+        )
+        for first, starts, word_ids in spans
+    ]
+
+
+def word_offsets(message: Message, words: List[str]) -> List[Tuple[int, int]]:
+    """Character span of each word in the message text.
+
+    Taken from the tokenizer's tokens when they are the words; otherwise the
+    words are searched left to right, so each span is the word's own
+    occurrence rather than the first one in the text.
+    """
+    tokens = message.get(TOKENS_NAMES[TEXT]) or message.get("tokens") or []
+    if len(tokens) >= len(words) and all(
+        token.text == word for token, word in zip(tokens, words)
+    ):
+        return [(token.start, token.end) for token in tokens[: len(words)]]
+
+    text = message.get(TEXT)
+    offsets: List[Tuple[int, int]] = []
+    cursor = 0
+    for word in words:
+        plain_word = word.replace("_", " ")
+        start = text.find(plain_word, cursor)
+        if start == -1:
+            start = cursor
+        cursor = min(len(text), start + len(plain_word))
+        offsets.append((start, cursor))
+    return offsets
+
+
+def build_entities(
+    aligned: List[Dict[str, Any]], message: Message, extractor: Text
+) -> List[Dict[Text, Any]]:
+    """Merge BIO tags into entities.
+
+    Values join the span's words as before; start/end index the message's own
+    text so extractors downstream see the right character span.
+    """
+    spans = entity_spans([item["label"] for item in aligned])
+    if not spans:
+        return []
+
+    offsets = word_offsets(message, [item["word"] for item in aligned])
+    probs = [item["prob"] for item in aligned]
+    entities: List[Dict[Text, Any]] = []
+    for first, last, entity_type in spans:
+        start, end = offsets[first][0], offsets[last][1]
+        value = " ".join(
+            item["word"].replace("_", " ") for item in aligned[first : last + 1]
+        )
+        entities.append(
+            {
+                "entity": entity_type,
+                "value": value,
+                "start": start,
+                "end": end,
+                "confidence": float(sum(probs[first : last + 1]) / (last - first + 1)),
+                "extractor": extractor,
+            }
+        )
+    return entities
+
+
+def has_gemini_entities(message: Message) -> bool:
+    existing_entities = message.get("entities") or []
+    if any(entity.get("extractor") == _GEMINI_EXTRACTOR for entity in existing_entities):
+        return True
+
+    metadata = message.get("metadata")
+    if not isinstance(metadata, dict):
+        metadata = getattr(message, "data", {}).get("metadata") or {}
+
+    extracted = metadata.get("geminiEntityExtraction") if isinstance(metadata, dict) else None
+    entities = extracted.get("entities") if isinstance(extracted, dict) else None
+    return isinstance(entities, list) and len(entities) > 0
+
+
 @DefaultV1Recipe.register(
     [DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR], is_trainable=False
 )
 class PhobertEntityExtractor(EntityExtractorMixin, GraphComponent):
     """Custom entity extractor backed by a fine-tuned PhoBERT NER model."""
 
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            # Maximum number of messages per forward pass, coalesced across
+            # concurrent parses by the inference executor.
+            "batch_size": 32,
+            # How long the executor waits after a message for others to share
+            # its forward pass.
+            "max_wait_ms": DEFAULT_MAX_WAIT_MS,
+            # Run forwards on a dedicated worker thread; False runs them inline
+            # in length-sorted batches.
+            "inference_thread": True,
+            # "torch" (eager transformers) or "onnx" (onnxruntime, see
+            # data/phobert/tools/export_onnx.py).
+            "backend": "torch",
+            # "auto" (cuda when available), "cpu" or "cuda"; torch backend only.
+            "device": "auto",
+            # Intra-op threads (torch and onnx); 0 keeps the runtime default.
+            # torch's count is process-wide, shared by all PhoBERT components.
+            "num_threads": 0,
+            # torch inter-op threads; 0 keeps the default. Settable once per
+            # process, so the first component to load decides.
+            "interop_threads": 0,
+            # CPUs to pin inference to, e.g. "0-3" or [0, 1]; None leaves the
+            # process's affinity alone (Linux only).
+            "cpu_affinity": None,
+            # Run torch forwards under torch.inference_mode() instead of no_grad.
+            "inference_mode": True,
+            # Run fixed inputs through the model at startup so the first parse
+            # doesn't pay for lazy initialization.
+            "warmup": True,
+            # Map model.safetensors read-only instead of copying it, so worker
+            # processes serving the same file share its pages (torch, CPU).
+            "mmap_weights": True,
+            # Seconds between checks of <model_dir>/ACTIVE (data/phobert/tools/
+            # manage_models.py); a new version is loaded in the background and
+            # swapped in. 0 disables the watcher.
+            "model_watch_interval": DEFAULT_WATCH_INTERVAL,
+            # "none" or "int8" (loads <model_dir>_int8 written by
+            # data/phobert/tools/quantize_models.py).
+            "quantize": "none",
+            # Max cached predictions (LRU, keyed by normalized segmented text +
+            # model fingerprint); 0 disables the cache.
+            "cache_size": 0,
+            # Seconds a cached prediction stays valid; 0 means no expiry.
+            "cache_ttl": 3600,
+            # Split messages longer than the model's 256 subwords into
+            # overlapping windows (run in the same batch) instead of dropping
+            # everything after the first 256.
+            "sliding_window": True,
+            # Subwords shared by consecutive windows.
+            "window_stride": DEFAULT_WINDOW_STRIDE,
+            # "greedy" (best label per word) or "viterbi" (best label sequence
+            # in which I-x only follows B-x/I-x).
+            "bio_decoder": GREEDY,
+            # intent -> extractor names allowed to run; intents not listed run
+            # all extractors. Skips the forward pass for e.g. greet/affirm.
+            "intent_extractors": dict(DEFAULT_INTENT_EXTRACTORS),
+            # Below this intent confidence the map above is ignored.
+            "gate_min_confidence": DEFAULT_GATE_MIN_CONFIDENCE,
+            # Use <model_dir>/fast_tokenizer.json (data/phobert/tools/
+            # convert_tokenizer.py): None when present, True requires it.
+            "fast_tokenizer": None,
+            # Words whose subword ids are memoized (shared with the other
+            # PhoBERT components on the same vocabulary).
+            "subword_memo_size": DEFAULT_MEMO_SIZE,
+            # Run the model over the training examples during `rasa train`.
+            # Off by default: the component is not trainable and would
+            # overwrite the gold entities with its own predictions.
+            "annotate_training_data": False,
+            # SQLite file caching those annotations across `rasa train` runs,
+            # keyed by model fingerprint and example text; None disables it.
+            "annotation_cache": DEFAULT_ANNOTATION_CACHE,
+        }
+
     def __init__(self, config: Dict[Text, Any]) -> None:
         self._config = config
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-        print(f"[PhobertEntityExtractor] Loading model from: {_MODEL_DIR}")
-        self.tokenizer = AutoTokenizer.from_pretrained(_MODEL_DIR)
-        self.model = AutoModelForTokenClassification.from_pretrained(_MODEL_DIR)
-        self.model.to(self.device)
-        self.model.eval()
+        if config.get("bio_decoder", GREEDY) not in DECODERS:
+            raise ValueError(
+                f"[PhobertEntityExtractor] Unknown bio_decoder '{config.get('bio_decoder')}'. "
+                f"Use one of {DECODERS}."
+            )
+        self.slot = ModelSlot("PhobertEntityExtractor", _MODEL_DIR, config, self._load)
 
-        self.id2label: Dict[int, str] = {
-            int(key): value for key, value in self.model.config.id2label.items()
+    def _load(self, version: Text) -> LoadedModel:
+        model = load_phobert(
+            "PhobertEntityExtractor", _MODEL_DIR, version, TOKEN_CLASSIFICATION, self._config
+        )
+        model.labels["ner"] = {
+            int(key): value for key, value in model.backend.config.id2label.items()
         }
+        id2label = model.labels["ner"]
         print(
             "[PhobertEntityExtractor] Loaded "
-            f"{len(self.id2label)} labels: {list(self.id2label.values())}"
+            f"{len(id2label)} labels: {list(id2label.values())} "
+            f"({describe(model.backend)}, "
+            f"fast_tokenizer={model.tokenizer.is_fast})"
         )
+        return model
 
     @classmethod
     def create(
@@ -54,186 +305,107 @@ class PhobertEntityExtractor(EntityExtractorMixin, GraphComponent):
     ) -> "PhobertEntityExtractor":
         return cls(config)
 
-    def _tokenize_words(self, words: List[str]) -> tuple[List[int], List[Optional[int]]]:
-        """Build manual word alignment because PhoBERT tokenizer has no word_ids()."""
-        word_ids_manual: List[Optional[int]] = [None]
-        all_token_ids = [self.tokenizer.bos_token_id]
-
-        for word_index, word in enumerate(words):
-            token_ids = self.tokenizer.encode(word, add_special_tokens=False)
-            for token_id in token_ids:
-                all_token_ids.append(token_id)
-                word_ids_manual.append(word_index)
-
-        all_token_ids.append(self.tokenizer.eos_token_id)
-        word_ids_manual.append(None)
-
-        max_len = 256
-        if len(all_token_ids) > max_len:
-            all_token_ids = all_token_ids[: max_len - 1] + [self.tokenizer.eos_token_id]
-            word_ids_manual = word_ids_manual[: max_len - 1] + [None]
-
-        return all_token_ids, word_ids_manual
-
-    def _align_predictions(
-        self,
-        words: List[str],
-        word_ids: List[Optional[int]],
-        label_ids: List[int],
-        probs: List[float],
-    ) -> List[Dict[str, Any]]:
-        """Collapse subword predictions back to the original word sequence."""
-        result: List[Dict[str, Any]] = []
-        seen_word_ids = set()
-
-        for index, word_id in enumerate(word_ids):
-            if word_id is None or word_id in seen_word_ids:
-                continue
-
-            seen_word_ids.add(word_id)
-            label = self.id2label.get(label_ids[index], "O")
-            result.append(
-                {
-                    "word": words[word_id],
-                    "label": label,
-                    "prob": probs[index],
-                }
-            )
-
-        return result
-
-    def _build_entities(
-        self, aligned: List[Dict[str, Any]], original_text: str
-    ) -> List[Dict[Text, Any]]:
-        """Merge BIO tags into full entity spans."""
-        entities: List[Dict[Text, Any]] = []
-        current_entity_type: Optional[str] = None
-        current_tokens: List[str] = []
-        current_probs: List[float] = []
-
-        for item in aligned:
-            label = item["label"]
-            word = item["word"].replace("_", " ")
-
-            if label.startswith("B-"):
-                if current_entity_type and current_tokens:
-                    entities.append(
-                        self._make_entity(
-                            current_entity_type,
-                            current_tokens,
-                            current_probs,
-                            original_text,
-                        )
-                    )
-                current_entity_type = label[2:]
-                current_tokens = [word]
-                current_probs = [item["prob"]]
-            elif label.startswith("I-") and current_entity_type == label[2:]:
-                current_tokens.append(word)
-                current_probs.append(item["prob"])
-            else:
-                if current_entity_type and current_tokens:
-                    entities.append(
-                        self._make_entity(
-                            current_entity_type,
-                            current_tokens,
-                            current_probs,
-                            original_text,
-                        )
-                    )
-                current_entity_type = None
-                current_tokens = []
-                current_probs = []
-
-        if current_entity_type and current_tokens:
-            entities.append(
-                self._make_entity(
-                    current_entity_type,
-                    current_tokens,
-                    current_probs,
-                    original_text,
+    def _predict(
+        self, model: LoadedModel, messages: List[Message]
+    ) -> List[List[Dict[str, Any]]]:
+        """Word-aligned BIO predictions for each message."""
+        encoded = [model.encoder.encode(message) for message in messages]
+        predictions: List[List[Dict[str, Any]]] = []
+        windowed = run_windows(
+            model.executor,
+            [(input_ids, word_ids) for _, input_ids, word_ids in encoded],
+            window_stride(self._config),
+        )
+        for (words, _, _), (rows, starts, word_ids) in zip(encoded, windowed):
+            probs = softmax(merge_windows(rows, starts, len(word_ids)))
+            predictions.append(
+                align_predictions(
+                    words,
+                    word_ids,
+                    probs,
+                    model.labels["ner"],
+                    self._config.get("bio_decoder", GREEDY),
                 )
             )
+        return predictions
 
-        return entities
-
-    def _make_entity(
-        self,
-        entity_type: str,
-        tokens: List[str],
-        probs: List[float],
-        original_text: str,
-    ) -> Dict[Text, Any]:
-        value = " ".join(tokens)
-        confidence = sum(probs) / len(probs)
-
-        start = original_text.lower().find(value.lower())
-        end = start + len(value) if start != -1 else len(value)
-
-        return {
-            "entity": entity_type,
-            "value": value,
-            "start": max(0, start),
-            "end": end,
-            "confidence": float(confidence),
-            "extractor": "PhobertEntityExtractor",
-        }
-
-    def process(self, messages: List[Message]) -> List[Message]:
+    def _pending(self, messages: List[Message]) -> List[Message]:
+        pending: List[Message] = []
         for message in messages:
             text = message.get("text")
-            if not text or self._has_gemini_entities(message):
+            if not text or is_routed(message) or has_gemini_entities(message):
                 continue
+            if not intent_allows(message, "PhobertEntityExtractor", self._config):
+                continue
+            pending.append(message)
+        return pending
 
-            rasa_tokens = message.get("tokens")
-            words = [token.text for token in rasa_tokens] if rasa_tokens else text.split()
-
-            input_ids, word_ids = self._tokenize_words(words)
-            input_tensor = torch.tensor([input_ids]).to(self.device)
-
-            with torch.no_grad():
-                outputs = self.model(input_ids=input_tensor)
-                logits = outputs.logits[0]
-                probs_tensor = torch.softmax(logits, dim=-1)
-                label_ids = torch.argmax(probs_tensor, dim=-1).tolist()
-                top_probs = probs_tensor.max(dim=-1).values.tolist()
-
-            aligned = self._align_predictions(words, word_ids, label_ids, top_probs)
-            entities = self._build_entities(aligned, text)
+    @staticmethod
+    def _add_entities(
+        messages: List[Message], predictions: List[List[Dict[str, Any]]]
+    ) -> None:
+        for message, aligned in zip(messages, predictions):
+            # Offsets always come from this message's own text.
+            entities = build_entities(aligned, message, "PhobertEntityExtractor")
 
             existing = list(message.get("entities") or [])
             existing.extend(entities)
             message.set("entities", existing, add_to_output=True)
 
+    def process(self, messages: List[Message]) -> List[Message]:
+        pending = self._pending(messages)
+        if not pending:
+            return messages
+
+        # One version for the whole call, even if a new one is swapped in.
+        model = self.slot.model
+        predictions: List[Any] = [None] * len(pending)
+        cache_keys: List[Text] = []
+        if model.cache is not None:
+            cache_keys = [model.cache.key(message_words(message)) for message in pending]
+            predictions = [model.cache.get(key) for key in cache_keys]
+
+        # One executor call for every uncached message, so they share forwards.
+        missing = [index for index, prediction in enumerate(predictions) if prediction is None]
+        if missing:
+            computed = self._predict(model, [pending[index] for index in missing])
+            for index, aligned in zip(missing, computed):
+                predictions[index] = aligned
+                if model.cache is not None:
+                    model.cache.put(cache_keys[index], aligned)
+
+        self._add_entities(pending, predictions)
         return messages
 
     def process_training_data(self, training_data: TrainingData) -> TrainingData:
-        self.process(training_data.training_examples)
+        model = self.slot.model
+        if model.annotations is None:
+            # The examples keep their gold entities, without duplicates of ours.
+            return training_data
+
+        pending = self._pending(training_data.training_examples)
+        if pending:
+            words = [message_words(message) for message in pending]
+            self._add_entities(
+                pending,
+                model.annotations.predict(
+                    pending, words, lambda batch: self._predict(model, batch)
+                ),
+            )
         return training_data
 
-    @staticmethod
-    def _has_gemini_entities(message: Message) -> bool:
-        existing_entities = message.get("entities") or []
-        if any(entity.get("extractor") == _GEMINI_EXTRACTOR for entity in existing_entities):
-            return True
-
-        metadata = message.get("metadata")
-        if not isinstance(metadata, dict):
-            metadata = getattr(message, "data", {}).get("metadata") or {}
-
-        extracted = metadata.get("geminiEntityExtraction") if isinstance(metadata, dict) else None
-        entities = extracted.get("entities") if isinstance(extracted, dict) else None
-        return isinstance(entities, list) and len(entities) > 0
-
 
 if __name__ == "__main__":
     import io
     import sys
 
+    import torch
+    from transformers import AutoModelForTokenClassification
+
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
 
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    tokenizer = AutoTokenizer.from_pretrained(_MODEL_DIR)
+    tokenizer = load_tokenizer(_MODEL_DIR)
     model = AutoModelForTokenClassification.from_pretrained(_MODEL_DIR)
     model.to(device)
     model.eval()
@@ -0,0 +1,127 @@
+"""
+Fast (Rust ``tokenizers``) replacement for PhoBERT's slow BPE tokenizer.
+
+PhoBERT only ships ``vocab.txt``/``bpe.codes`` for the pure-Python
+PhobertTokenizer. ``convert_slow_tokenizer`` turns them into an equivalent
+``tokenizers`` BPE model, saved as ``fast_tokenizer.json`` next to the
+checkpoint by data/phobert/tools/convert_tokenizer.py. ``load_tokenizer``
+prefers that file and falls back to AutoTokenizer.
+
+The fast model spells pieces fastBPE-style ("ab</w>" ends a word, "ab" is
+"ab@@"). Merges can build pieces the PhoBERT vocab lacks, which the slow
+tokenizer maps to <unk>; they get ids after <mask> and are mapped back to
+<unk> after encoding.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Text
+
+from tokenizers import Regex, Tokenizer, decoders, models, pre_tokenizers, processors
+from transformers import AutoTokenizer, PreTrainedTokenizerFast
+
+FAST_TOKENIZER_FILE = "fast_tokenizer.json"
+_END_OF_WORD = "</w>"
+_CONTINUATION = "@@"
+_SPECIAL_TOKENS = {
+    "bos_token": "<s>",
+    "eos_token": "</s>",
+    "sep_token": "</s>",
+    "cls_token": "<s>",
+    "unk_token": "<unk>",
+    "pad_token": "<pad>",
+    "mask_token": "<mask>",
+}
+
+
+def _fast_piece(token: Text) -> Text:
+    if token.endswith(_CONTINUATION):
+        return token[: -len(_CONTINUATION)]
+    return token + _END_OF_WORD
+
+
+def convert_slow_tokenizer(slow: Any) -> Tokenizer:
+    """Build the ``tokenizers`` equivalent of a slow PhobertTokenizer."""
+    special = {token: slow.convert_tokens_to_ids(token) for token in set(_SPECIAL_TOKENS.values())}
+    vocab: Dict[Text, int] = {}
+    for token, index in slow.get_vocab().items():
+        vocab[token if token in special else _fast_piece(token)] = index
+
+    merges = sorted(slow.bpe_ranks, key=slow.bpe_ranks.get)
+    next_id = max(vocab.values()) + 1
+    for first, second in merges:
+        for piece in (first, second, first + second):
+            if piece not in vocab:
+                vocab[piece] = next_id
+                next_id += 1
+
+    tokenizer = Tokenizer(
+        models.BPE(
+            vocab=vocab,
+            merges=merges,
+            unk_token=slow.unk_token,
+            end_of_word_suffix=_END_OF_WORD,
+        )
+    )
+    # Same words as the slow tokenizer's re.findall(r"\S+\n?", text).
+    tokenizer.pre_tokenizer = pre_tokenizers.Sequence(
+        [
+            pre_tokenizers.Split(Regex(r"\S+\n?"), behavior="isolated"),
+            pre_tokenizers.Split(Regex(r"^\s+$"), behavior="removed"),
+        ]
+    )
+    tokenizer.decoder = decoders.BPEDecoder(suffix=_END_OF_WORD)
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single=f"{slow.cls_token} $A {slow.sep_token}",
+        pair=f"{slow.cls_token} $A {slow.sep_token} {slow.sep_token} $B {slow.sep_token}",
+        special_tokens=[
+            (slow.cls_token, slow.cls_token_id),
+            (slow.sep_token, slow.sep_token_id),
+        ],
+    )
+    tokenizer.add_special_tokens(sorted(special, key=special.get))
+    return tokenizer
+
+
+class PhobertTokenizerFast(PreTrainedTokenizerFast):
+    """PreTrainedTokenizerFast mapping ids past ``<mask>`` back to ``<unk>``."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **{**_SPECIAL_TOKENS, **kwargs})
+        self._unk_from = self.mask_token_id + 1
+
+    def _convert_encoding(self, encoding: Any, *args: Any, **kwargs: Any) -> Any:
+        encoding_dict, encodings = super()._convert_encoding(encoding, *args, **kwargs)
+        encoding_dict["input_ids"] = [
+            self._known_ids(ids) for ids in encoding_dict["input_ids"]
+        ]
+        return encoding_dict, encodings
+
+    def _known_ids(self, ids: List[int]) -> List[int]:
+        if not ids or max(ids) < self._unk_from:
+            return ids
+        unk_id = self.unk_token_id
+        return [unk_id if index >= self._unk_from else index for index in ids]
+
+
+def load_tokenizer(model_dir: Text, fast: Optional[bool] = None) -> Any:
+    """Tokenizer of ``model_dir``: the fast one when converted, else AutoTokenizer.
+
+    ``fast=True`` requires the converted file, ``False`` forces the slow one.
+    """
+    path = os.path.join(model_dir, FAST_TOKENIZER_FILE)
+    if fast is False or (fast is None and not os.path.isfile(path)):
+        return AutoTokenizer.from_pretrained(model_dir)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(
+            f"{path} not found; run data/phobert/tools/convert_tokenizer.py first."
+        )
+
+    options: Dict[Text, Any] = {}
+    config_path = os.path.join(model_dir, "tokenizer_config.json")
+    if os.path.isfile(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            max_length = json.load(f).get("model_max_length")
+        if isinstance(max_length, int):
+            options["model_max_length"] = max_length
+    return PhobertTokenizerFast(tokenizer_object=Tokenizer.from_file(path), **options)
@@ -0,0 +1,122 @@
+"""
+Bounded LRU + TTL cache for per-message model predictions.
+
+Keys combine a model fingerprint with NFC-normalized input text, so a model
+swap on disk or a different backend/quantization never serves stale results.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Text
+
+# Print hit/miss counters every this many lookups.
+_STATS_EVERY = 1000
+
+
+def normalize_text(words: Iterable[Text]) -> Text:
+    """NFC-normalize and collapse whitespace; case is kept (the models are cased)."""
+    return unicodedata.normalize("NFC", " ".join(" ".join(words).split()))
+
+
+def model_fingerprint(model_dir: Text, config: Dict[Text, Any]) -> Text:
+    """Hash of the checkpoint files (name, size, mtime) plus options changing outputs."""
+    digest = hashlib.sha1(os.path.abspath(model_dir).encode("utf-8"))
+    for name in sorted(os.listdir(model_dir)):
+        path = os.path.join(model_dir, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    for option in ("backend", "quantize", "sliding_window", "window_stride", "bio_decoder"):
+        digest.update(f"{option}={config.get(option)}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class PredictionCache:
+    def __init__(
+        self,
+        name: Text,
+        fingerprint: Text,
+        max_size: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.fingerprint = fingerprint
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self._clock = clock
+        self._entries: "OrderedDict[Text, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, words: Iterable[Text]) -> Text:
+        return f"{self.fingerprint}|{normalize_text(words)}"
+
+    def get(self, key: Text) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                value = None
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = entry[1]
+            lookups = self.hits + self.misses
+
+        if lookups % _STATS_EVERY == 0:
+            print(f"[{self.name}] Prediction cache: {self.stats()}")
+        return value
+
+    def put(self, key: Text, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store ``value``; ``ttl_seconds`` overrides the cache-wide TTL for this entry."""
+        ttl = self.ttl_seconds if ttl_seconds is None else float(ttl_seconds)
+        # A non-positive TTL never expires; entries store +inf for that.
+        expires_at = self._clock() + ttl if ttl > 0 else float("inf")
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[Text, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def create_cache(
+    name: Text, model_dir: Text, config: Dict[Text, Any]
+) -> Optional[PredictionCache]:
+    """Build the cache configured by ``cache_size`` / ``cache_ttl``; None when off."""
+    max_size = int(config.get("cache_size") or 0)
+    if max_size <= 0:
+        return None
+    return PredictionCache(
+        name,
+        model_fingerprint(model_dir, config),
+        max_size,
+        float(config.get("cache_ttl") or 0),
+    )
@@ -0,0 +1,162 @@
+"""
+Pool of VnCoreNLP word segmenters shared by concurrent parses.
+
+A segmenter is a ``vncorenlp.VnCoreNLP`` client: either its own JVM started
+from ``jar_path`` (segmenter ``i`` listens on ``port + i``), or a client of one
+running VnCoreNLP server at ``server_address``. Texts are segmented in batches:
+joined into one request and split back by aligning characters. With
+``segmenter: python`` every slot shares one in-process WordSegmenter instead.
+"""
+
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Text
+
+try:
+    from vncorenlp import VnCoreNLP
+except ImportError:
+    VnCoreNLP = None
+
+from custom_components.word_segmenter import WordSegmenter
+
+DEFAULT_JAR_PATH = r"C:\Users\HPPC~1\VnCoreNLP\VnCoreNLP-1.2.jar"
+# A lone "." between batched texts so VnCoreNLP ends the sentence there.
+_BATCH_SEPARATOR = "\n.\n"
+
+
+def _flatten(sentences: List[List[Text]]) -> List[Text]:
+    return [word for sentence in sentences for word in sentence]
+
+
+def _split_batch(words: List[Text], texts: Sequence[Text]) -> Optional[List[List[Text]]]:
+    """Assign the words of a batched request back to their texts.
+
+    Returns None when the words don't spell the input (VnCoreNLP rewrote some
+    characters); a word straddling two texts is cut at the boundary.
+    """
+    stream: List[Text] = []
+    owners: List[int] = []
+    for index, text in enumerate(texts):
+        if index:
+            stream.append(".")
+            owners.append(-1)
+        for char in text:
+            if not char.isspace():
+                stream.append(char)
+                owners.append(index)
+
+    result: List[List[Text]] = [[] for _ in texts]
+    position = 0
+    for word in words:
+        pieces: Dict[int, List[Text]] = {}
+        owner = -1
+        for char in word:
+            if position < len(stream) and stream[position] == char:
+                owner = owners[position]
+                position += 1
+                if owner >= 0:
+                    pieces.setdefault(owner, []).append(char)
+            elif char == "_" and owner >= 0:
+                # Syllable joiner inserted by the segmenter, not input text.
+                pieces[owner].append(char)
+            elif char != "_":
+                return None
+        for piece_owner, chars in pieces.items():
+            piece = "".join(chars).strip("_")
+            if piece:
+                result[piece_owner].append(piece)
+
+    return result if position == len(stream) else None
+
+
+def segment_batch(segmenter: Any, texts: Sequence[Text]) -> List[List[Text]]:
+    """Segment ``texts`` with one request; per-text requests if alignment fails."""
+    if isinstance(segmenter, WordSegmenter):
+        # In-process: there is no request overhead to amortize.
+        return [segmenter.segment(text) for text in texts]
+    if len(texts) == 1:
+        return [_flatten(segmenter.tokenize(texts[0]))]
+
+    words = _flatten(segmenter.tokenize(_BATCH_SEPARATOR.join(texts)))
+    aligned = _split_batch(words, texts)
+    if aligned is None:
+        return [_flatten(segmenter.tokenize(text)) for text in texts]
+    return aligned
+
+
+class SegmenterPool:
+    def __init__(self, factory: Callable[[int], Any], size: int) -> None:
+        self.size = max(1, int(size))
+        self._segmenters = [factory(index) for index in range(self.size)]
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        for segmenter in self._segmenters:
+            self._idle.put(segmenter)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        segmenter = self._idle.get(timeout=timeout)
+        try:
+            yield segmenter
+        finally:
+            self._idle.put(segmenter)
+
+    def segment(self, texts: Sequence[Text], batch_size: int = 32) -> List[List[Text]]:
+        """Segment ``texts`` in batches of ``batch_size``, batches spread over the pool."""
+        batch_size = max(1, int(batch_size))
+        batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        if len(batches) <= 1 or self.size == 1:
+            results = [self._segment_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.size, len(batches))) as executor:
+                results = list(executor.map(self._segment_batch, batches))
+        return [words for batch in results for words in batch]
+
+    def _segment_batch(self, texts: Sequence[Text]) -> List[List[Text]]:
+        with self.acquire() as segmenter:
+            return segment_batch(segmenter, texts)
+
+
+def create_segmenter_pool(config: Dict[Text, Any]) -> Optional[SegmenterPool]:
+    """Build the pool described by the tokenizer config; None without vncorenlp."""
+    if config.get("segmenter") == "python":
+        segmenter = WordSegmenter.from_file(config.get("dictionary_path"))
+        pool = SegmenterPool(lambda index: segmenter, config.get("pool_size") or 1)
+        print(
+            f"[VnCoreNLPTokenizer] Segmenter pool: {pool.size} x in-process "
+            f"Python segmenter ({segmenter.size} words)"
+        )
+        print(
+            "[VnCoreNLPTokenizer] WARNING: the Python segmenter is experimental and "
+            "differs from VnCoreNLP on words outside its list; models are trained on "
+            "VnCoreNLP output."
+        )
+        return pool
+    if VnCoreNLP is None:
+        return None
+
+    port = int(config.get("port") or 9000)
+    timeout = int(config.get("timeout") or 30)
+    address = config.get("server_address")
+    if address:
+        def factory(index: int) -> Any:
+            return VnCoreNLP(address=address, port=port, timeout=timeout)
+    else:
+        jar_path = config.get("jar_path") or os.environ.get("VNCORENLP_JAR") or DEFAULT_JAR_PATH
+
+        def factory(index: int) -> Any:
+            return VnCoreNLP(
+                jar_path,
+                port=port + index,
+                timeout=timeout,
+                annotators="wseg",
+                max_heap_size=config.get("max_heap_size") or "-Xmx500m",
+            )
+
+    pool = SegmenterPool(factory, config.get("pool_size") or 1)
+    print(
+        f"[VnCoreNLPTokenizer] Segmenter pool: {pool.size} x "
+        f"{address or 'local JVM'} (port {port})"
+    )
+    return pool
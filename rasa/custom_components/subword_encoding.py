@@ -0,0 +1,221 @@
+"""
+PhoBERT subword encoding computed once per message and shared by components.
+
+The first PhoBERT component to need a message's encoding builds it from the
+segmented words and stores it on the message (``SUBWORDS_ATTRIBUTE``); later
+components with the same vocabulary reuse it. Word -> subword ids come from a
+bounded LRU memo shared by every encoder of that vocabulary, so the few
+hundred command words users repeat are BPE-encoded once per process.
+
+The stored encoding is not truncated. ``truncate`` cuts it to the model's
+``MAX_LENGTH`` as before; ``split_windows`` instead covers a long message
+with overlapping windows of at most ``MAX_LENGTH`` tokens, and
+``merge_windows`` puts their token-level outputs back together.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+import numpy as np
+from rasa.nlu.constants import TOKENS_NAMES
+from rasa.shared.nlu.constants import TEXT
+from rasa.shared.nlu.training_data.message import Message
+
+SUBWORDS_ATTRIBUTE = "phobert_subwords"
+DEFAULT_MEMO_SIZE = 20000
+MAX_LENGTH = 256
+# Subwords shared by consecutive windows of a long message.
+DEFAULT_WINDOW_STRIDE = 64
+
+_ENCODERS: Dict[Text, "SubwordEncoder"] = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+def message_words(message: Message) -> List[str]:
+    """Segmented words from the tokenizer, or whitespace split as a fallback."""
+    rasa_tokens = message.get(TOKENS_NAMES[TEXT]) or message.get("tokens")
+    if rasa_tokens:
+        return [token.text for token in rasa_tokens]
+    return message.get(TEXT).split()
+
+
+def vocab_fingerprint(model_dir: Text) -> Text:
+    """Hash of the BPE vocabulary files; models sharing them share encodings."""
+    digest = hashlib.sha1()
+    found = False
+    for name in ("vocab.txt", "bpe.codes"):
+        path = os.path.join(model_dir, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+            found = True
+    if not found:
+        digest.update(os.path.abspath(model_dir).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class SubwordEncoder:
+    def __init__(self, tokenizer: Any, fingerprint: Text, memo_size: int) -> None:
+        self.tokenizer = tokenizer
+        self.fingerprint = fingerprint
+        self.memo_size = max(0, int(memo_size))
+        self._memo: "OrderedDict[Text, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def word_ids(self, words: List[str]) -> List[List[int]]:
+        """Subword ids of each word, from the memo where possible."""
+        result: List[Optional[List[int]]] = [None] * len(words)
+        missing: Dict[Text, List[int]] = {}
+        with self._lock:
+            for index, word in enumerate(words):
+                ids = self._memo.get(word)
+                if ids is None:
+                    missing.setdefault(word, []).append(index)
+                    self.misses += 1
+                else:
+                    self._memo.move_to_end(word)
+                    result[index] = ids
+                    self.hits += 1
+
+        if missing:
+            new_words = list(missing)
+            if self.tokenizer.is_fast:
+                # Words hold no whitespace, so each encodes as one pre-token.
+                encoded = self.tokenizer(new_words, add_special_tokens=False)["input_ids"]
+            else:
+                encoded = [
+                    self.tokenizer.encode(word, add_special_tokens=False) for word in new_words
+                ]
+            with self._lock:
+                for word, ids in zip(new_words, encoded):
+                    for index in missing[word]:
+                        result[index] = ids
+                    if self.memo_size:
+                        self._memo[word] = ids
+                        self._memo.move_to_end(word)
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+
+        return result  # type: ignore[return-value]
+
+    def encode_words(self, words: List[str]) -> Tuple[List[int], List[Optional[int]]]:
+        """Token ids with <s>/</s> and the word index of each (None for specials).
+
+        Not truncated; see ``truncate`` and ``split_windows``.
+        """
+        input_ids = [self.tokenizer.bos_token_id]
+        word_ids: List[Optional[int]] = [None]
+        for word_index, ids in enumerate(self.word_ids(words)):
+            input_ids.extend(ids)
+            word_ids.extend([word_index] * len(ids))
+        input_ids.append(self.tokenizer.eos_token_id)
+        word_ids.append(None)
+        return input_ids, word_ids
+
+    def encode(self, message: Message) -> Tuple[List[str], List[int], List[Optional[int]]]:
+        """(words, input_ids, word_ids) of ``message``, reusing a stored encoding."""
+        words = message_words(message)
+        stored = message.get(SUBWORDS_ATTRIBUTE)
+        if (
+            isinstance(stored, dict)
+            and stored.get("vocab") == self.fingerprint
+            and stored.get("words") == words
+        ):
+            return words, stored["input_ids"], stored["word_ids"]
+
+        input_ids, word_ids = self.encode_words(words)
+        message.set(
+            SUBWORDS_ATTRIBUTE,
+            {
+                "vocab": self.fingerprint,
+                "words": words,
+                "input_ids": input_ids,
+                "word_ids": word_ids,
+            },
+        )
+        return words, input_ids, word_ids
+
+    def stats(self) -> Dict[Text, Any]:
+        with self._lock:
+            return {"size": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+
+def truncate(
+    input_ids: List[int], word_ids: List[Optional[int]], max_length: int = MAX_LENGTH
+) -> Tuple[List[int], List[Optional[int]]]:
+    """The first ``max_length`` tokens, still ending with </s>."""
+    if len(input_ids) <= max_length:
+        return input_ids, word_ids
+    return input_ids[: max_length - 1] + input_ids[-1:], word_ids[: max_length - 1] + [None]
+
+
+def window_starts(length: int, size: int, stride: int) -> List[int]:
+    """Offsets of windows of ``size`` covering ``length`` items, overlapping by ``stride``."""
+    if length <= size:
+        return [0]
+    step = size - min(max(0, int(stride)), size - 1)
+    starts = list(range(0, length - size, step))
+    starts.append(length - size)
+    return starts
+
+
+def split_windows(
+    input_ids: List[int],
+    word_ids: List[Optional[int]],
+    stride: int = DEFAULT_WINDOW_STRIDE,
+    max_length: int = MAX_LENGTH,
+) -> Tuple[List[List[int]], List[int]]:
+    """Windows of at most ``max_length`` tokens, each wrapped in <s>/</s>.
+
+    Returns the windows' input ids and the offset of each window's first
+    subword in the message (without <s>). A message that fits is one window.
+    """
+    bos, content, eos = input_ids[:1], input_ids[1:-1], input_ids[-1:]
+    starts = window_starts(len(content), max_length - 2, stride)
+    windows = [bos + content[start : start + max_length - 2] + eos for start in starts]
+    return windows, starts
+
+
+def merge_windows(rows: List[np.ndarray], starts: List[int], length: int) -> np.ndarray:
+    """Token-level outputs of the windows as one (length, ...) array.
+
+    ``rows`` are the windows' outputs, cut to each window's length (so they
+    include <s>/</s>), and ``length`` is the full message's token count. Where windows overlap, each position keeps the
+    output of the window in which it is furthest from an edge, i.e. the one
+    with the most context on both sides.
+    """
+    if len(rows) == 1:
+        return rows[0][:length]
+
+    merged = np.zeros((length,) + rows[0].shape[1:], dtype=rows[0].dtype)
+    best = np.full(length, -1)
+    for row, start in zip(rows, starts):
+        size = len(row) - 2
+        positions = np.arange(size)
+        context = np.minimum(positions, size - 1 - positions)
+        # +1: position 0 of the window is message token start + 1 (after <s>).
+        target = np.arange(start + 1, start + 1 + size)
+        better = context > best[target]
+        merged[target[better]] = row[1:-1][better]
+        best[target[better]] = context[better]
+    merged[0] = rows[0][0]
+    merged[-1] = rows[-1][-1]
+    return merged
+
+
+def shared_encoder(tokenizer: Any, model_dir: Text, memo_size: int) -> SubwordEncoder:
+    """One encoder (and memo) per vocabulary, shared by the components using it."""
+    fingerprint = vocab_fingerprint(model_dir)
+    with _ENCODERS_LOCK:
+        encoder = _ENCODERS.get(fingerprint)
+        if encoder is None:
+            encoder = SubwordEncoder(tokenizer, fingerprint, memo_size)
+            _ENCODERS[fingerprint] = encoder
+        else:
+            encoder.memo_size = max(encoder.memo_size, int(memo_size))
+        return encoder
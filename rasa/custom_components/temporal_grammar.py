@@ -0,0 +1,950 @@
+"""
+custom_components/temporal_grammar.py — Ngữ pháp thời gian dạng bảng (tiếng
+Việt + Anh), thay Duckling cho các cụm ngày giờ phổ biến.
+
+Dùng chung cho ``TemporalGrammarExtractor`` (NLU pipeline) và ``date_utils``
+(action server). Chỉ phụ thuộc thư viện chuẩn, và nằm ngoài package
+``actions`` để NLU server không phải nạp action server (rasa_sdk, aiohttp).
+
+Từ vựng được viết có dấu; các luật được biên dịch trên văn bản đã bỏ dấu nên
+"hom nay" và "hôm nay" đều khớp, còn từ gõ sai dấu ("thứ tự", "tôi nay") bị loại.
+"""
+
+import calendar
+import re
+import unicodedata
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+# ---------------------------------------------------------------------------
+# Lexicon
+# ---------------------------------------------------------------------------
+
+DAY_OFFSETS: Dict[str, int] = {
+    "hôm nay": 0,
+    "bữa nay": 0,
+    "today": 0,
+    "ngày mai": 1,
+    "tomorrow": 1,
+    "ngày kia": 2,
+    "ngày mốt": 2,
+    "day after tomorrow": 2,
+    "hôm qua": -1,
+    "yesterday": -1,
+    "hôm kia": -2,
+}
+
+# Day words allowed after a part of day ("chiều nay", "sáng ngày mai").
+PART_OF_DAY_DAYS: Dict[str, int] = {
+    "nay": 0,
+    "hôm nay": 0,
+    "mai": 1,
+    "ngày mai": 1,
+    "qua": -1,
+    "hôm qua": -1,
+}
+
+# word -> (kind, default hour when no clock time is given)
+PARTS_OF_DAY: Dict[str, Tuple[str, int]] = {
+    "sáng": ("morning", 9),
+    "trưa": ("noon", 12),
+    "chiều": ("afternoon", 14),
+    "tối": ("evening", 19),
+    "đêm": ("night", 22),
+    "morning": ("morning", 9),
+    "noon": ("noon", 12),
+    "afternoon": ("afternoon", 14),
+    "evening": ("evening", 19),
+    "night": ("evening", 19),
+}
+
+WEEKDAYS: Dict[str, int] = {
+    "thứ hai": 0, "thứ 2": 0, "t2": 0, "monday": 0,
+    "thứ ba": 1, "thứ 3": 1, "t3": 1, "tuesday": 1,
+    "thứ tư": 2, "thứ 4": 2, "t4": 2, "wednesday": 2,
+    "thứ năm": 3, "thứ 5": 3, "t5": 3, "thursday": 3,
+    "thứ sáu": 4, "thứ 6": 4, "t6": 4, "friday": 4,
+    "thứ bảy": 5, "thứ 7": 5, "t7": 5, "saturday": 5,
+    "chủ nhật": 6, "cn": 6, "sunday": 6,
+}
+# Short forms that also occur as ordinary tokens (codes, initials): only a
+# weekday after a date word ("vào t6", "từ t2 đến t4") or on their own.
+WEEKDAY_ABBREVIATIONS = ("t2", "t3", "t4", "t5", "t6", "t7", "cn")
+
+# "tuần này", "tháng sau", "năm ngoái" / "this week", "next month", ...
+PERIOD_UNITS: Dict[str, str] = {
+    "tuần": "week",
+    "tháng": "month",
+    "năm": "year",
+    "week": "week",
+    "month": "month",
+    "year": "year",
+}
+PERIOD_SHIFTS: Dict[str, int] = {
+    "này": 0,
+    "nay": 0,
+    "sau": 1,
+    "tới": 1,
+    "trước": -1,
+    "ngoái": -1,
+    # "tuần sau nữa": the week after next.
+    "sau nữa": 2,
+    "tới nữa": 2,
+    "trước nữa": -2,
+    "this": 0,
+    "next": 1,
+    "last": -1,
+}
+
+# unit -> (timedelta field or "months", amount per unit, grain)
+DURATION_UNITS: Dict[str, Tuple[str, int, str]] = {
+    "phút": ("minutes", 1, "minute"),
+    "p": ("minutes", 1, "minute"),
+    "tiếng": ("hours", 1, "minute"),
+    "giờ": ("hours", 1, "minute"),
+    "h": ("hours", 1, "minute"),
+    "ngày": ("days", 1, "day"),
+    "tuần": ("days", 7, "day"),
+    "tháng": ("months", 1, "day"),
+    "năm": ("months", 12, "day"),
+    "minute": ("minutes", 1, "minute"),
+    "minutes": ("minutes", 1, "minute"),
+    "hour": ("hours", 1, "minute"),
+    "hours": ("hours", 1, "minute"),
+    "day": ("days", 1, "day"),
+    "days": ("days", 1, "day"),
+    "week": ("days", 7, "day"),
+    "weeks": ("days", 7, "day"),
+    "month": ("months", 1, "day"),
+    "months": ("months", 1, "day"),
+    "year": ("months", 12, "day"),
+    "years": ("months", 12, "day"),
+}
+
+# Connector and filler words that may appear inside a match.
+GLUE_WORDS = (
+    "ngày", "tháng", "năm", "tuần", "lúc", "vào", "giờ", "phút", "rưỡi", "kém",
+    "tiếng", "nữa", "sau", "từ", "đến", "tới", "cuối", "hôm", "này", "trước",
+)
+
+_GRAIN_STEPS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
+# ---------------------------------------------------------------------------
+# Folding
+# ---------------------------------------------------------------------------
+
+
+def _fold_char(char: str) -> str:
+    if char == "_":
+        return " "
+    lowered = char.lower()
+    if len(lowered) != 1:
+        return char
+    if lowered == "đ":
+        return "d"
+    base = unicodedata.normalize("NFD", lowered)[0]
+    return base if base.isascii() else lowered
+
+
+def fold(text: str) -> Tuple[str, List[int]]:
+    """ASCII-fold ``text`` and return it with a folded->original offset map.
+
+    Combining marks (NFD input) are dropped; the map has one extra entry for
+    the end of the text so ``offsets[end]`` is a valid exclusive end.
+    """
+    chars: List[str] = []
+    offsets: List[int] = []
+    for index, char in enumerate(text):
+        if unicodedata.combining(char):
+            continue
+        chars.append(_fold_char(char))
+        offsets.append(index)
+    offsets.append(len(text))
+    return "".join(chars), offsets
+
+
+def _fold_key(phrase: str) -> str:
+    return fold(phrase)[0]
+
+
+def _alternation(phrases: Iterable[str]) -> str:
+    folded = sorted({_fold_key(phrase) for phrase in phrases}, key=len, reverse=True)
+    return "(?:" + "|".join(re.escape(item).replace(r"\ ", r"\s+") for item in folded) + ")"
+
+
+def _folded_table(table: Dict[str, Any]) -> Dict[str, Any]:
+    return {_fold_key(key): value for key, value in table.items()}
+
+
+def _build_vocabulary() -> Dict[str, set]:
+    vocabulary: Dict[str, set] = {}
+    tables: Tuple[Iterable[str], ...] = (
+        DAY_OFFSETS, PART_OF_DAY_DAYS, PARTS_OF_DAY, WEEKDAYS,
+        PERIOD_UNITS, PERIOD_SHIFTS, DURATION_UNITS, GLUE_WORDS,
+    )
+    for table in tables:
+        for phrase in table:
+            for word in phrase.split():
+                vocabulary.setdefault(_fold_key(word), set()).add(word)
+    return vocabulary
+
+
+_VOCABULARY = _build_vocabulary()
+_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+def _spelled_as_lexicon(original: str) -> bool:
+    """Reject spans whose accented words are not the lexicon's spelling.
+
+    Unaccented words are accepted as typed; an accented word must be one of
+    the spellings behind its folded form ("tối"/"tới" for "toi", not "tôi").
+    """
+    for word in _WORD_PATTERN.findall(unicodedata.normalize("NFC", original.lower())):
+        if word.isascii():
+            continue
+        spellings = _VOCABULARY.get(_fold_key(word))
+        if spellings is not None and word not in spellings:
+            return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Matches
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class TemporalMatch:
+    """A resolved temporal expression; offsets index the original text."""
+
+    start: int
+    end: int
+    text: str
+    # Point reading of the phrase. Periods keep the legacy date_utils
+    # meaning ("tuần sau" = now + 7 days) while ``interval`` spans the week.
+    anchor: datetime
+    grain: str
+    # Clock time given explicitly or implied by a part of day.
+    time: Optional[Tuple[int, int]] = None
+    # [from, to) for periods and "từ ... đến ..." ranges.
+    interval: Optional[Tuple[datetime, datetime]] = None
+    # One end of a "từ ... đến ..." range whose ends could not be joined.
+    unjoined_range: bool = False
+    # False when the phrase only gives a clock time ("lúc 9h", "2 tiếng nữa").
+    dated: bool = True
+
+
+@dataclass
+class _Atom:
+    start: int
+    end: int
+    day: Optional[datetime] = None
+    time: Optional[Tuple[int, int]] = None
+    # Part-of-day kind; adjusts a bare clock hour merged into this atom.
+    pod: Optional[str] = None
+    explicit_time: bool = False
+    anchor: Optional[datetime] = None
+    span: Optional[Tuple[datetime, datetime]] = None
+    grain: str = "day"
+    # Recognised but refused (a future weekday in finance): keeps its span
+    # out of the other rules and is then dropped.
+    void: bool = False
+    # False for a clock time or hour offset that names no day ("lúc 9h").
+    dated: bool = True
+    # Weekday atoms: the weekday, and whether its week was named ("tuần sau",
+    # "next") rather than picked by rolling.
+    weekday: Optional[int] = None
+    week_named: bool = False
+    unjoined_range: bool = False
+
+    @property
+    def date_like(self) -> bool:
+        return self.day is not None and not self.explicit_time and self.span is None
+
+    @property
+    def clock_like(self) -> bool:
+        return self.day is None and self.explicit_time
+
+
+@dataclass(frozen=True)
+class _Context:
+    now: datetime
+    today: datetime
+    roll_future: bool
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def _make_day(ctx: _Context, day: int, month: Optional[int], year: Optional[int]) -> Optional[datetime]:
+    try:
+        if year is not None:
+            return ctx.today.replace(year=year, month=month or ctx.today.month, day=day)
+        if month is not None:
+            resolved = ctx.today.replace(month=month, day=day)
+            if ctx.roll_future and resolved < ctx.today:
+                resolved = resolved.replace(year=resolved.year + 1)
+            return resolved
+        resolved = ctx.today.replace(day=day)
+        if ctx.roll_future and resolved < ctx.today:
+            resolved = _add_months(resolved.replace(day=1), 1).replace(day=day)
+        return resolved
+    except ValueError:
+        return None
+
+
+def _apply_part_of_day(hour: int, kind: Optional[str]) -> Optional[int]:
+    if kind is None:
+        return hour
+    if kind == "morning":
+        return hour if hour <= 11 else None
+    if kind == "noon":
+        return hour if hour >= 11 else hour + 12
+    if kind == "night":
+        return hour + 12 if 6 <= hour < 12 else hour
+    return hour + 12 if hour < 12 else hour
+
+
+# ---------------------------------------------------------------------------
+# Rules
+# ---------------------------------------------------------------------------
+
+_FOLDED_DAY_OFFSETS = _folded_table(DAY_OFFSETS)
+_FOLDED_POD_DAYS = _folded_table(PART_OF_DAY_DAYS)
+_FOLDED_PARTS_OF_DAY = _folded_table(PARTS_OF_DAY)
+_FOLDED_WEEKDAYS = _folded_table(WEEKDAYS)
+_FOLDED_PERIOD_UNITS = _folded_table(PERIOD_UNITS)
+_FOLDED_PERIOD_SHIFTS = _folded_table(PERIOD_SHIFTS)
+_FOLDED_DURATION_UNITS = _folded_table(DURATION_UNITS)
+
+_POD = _alternation(PARTS_OF_DAY)
+_POD_DAY = _alternation(PART_OF_DAY_DAYS)
+_SHIFT_VI = r"(?:(?:sau|toi|truoc)\s+nua|nay|sau|toi|truoc|ngoai)"
+_WEEKDAY = _alternation(WEEKDAYS)
+_ABBREVIATION_CONTEXT = re.compile(r"\b(?:thu|ngay|hom|vao|tu|den|toi)\s+$")
+# "thứ 6 tuần sau", or "thứ 6 này" for the current week.
+_WEEKDAY_WEEK = rf"(?:\s+tuan\s+(?P<wk>{_SHIFT_VI})|\s+(?P<wk_this>nay))?"
+_CLOCK_PREFIX = r"(?:\b(?:vao\s+luc|luc|vao|at)\s+)?(?<![\w/:.,])"
+_CLOCK_SUFFIX = rf"(?:\s?(?P<ampm>am|pm)\b|\s+(?P<pod>{_POD})(?:\s+(?P<day>{_POD_DAY}))?\b)?"
+_MINUTES = r"(?:\s?(?P<m>\d{1,2})(?:\s?(?:phut|p))?|\s(?P<half>ruoi)|\s+kem\s+(?P<kem>\d{1,2})(?:\s?(?:phut|p))?)"
+
+
+def _group(match: "re.Match[str]", name: str) -> Optional[str]:
+    return match.groupdict().get(name)
+
+
+def _shift(word: str) -> int:
+    return _FOLDED_PERIOD_SHIFTS[re.sub(r"\s+", " ", word)]
+
+
+def _resolve_clock(match: "re.Match[str]", ctx: _Context) -> Optional[_Atom]:
+    hour = int(match.group("h"))
+    minute = int(_group(match, "m") or 0)
+    if _group(match, "half"):
+        minute = 30
+    if _group(match, "kem"):
+        hour, minute = hour - 1, 60 - int(match.group("kem"))
+
+    ampm = _group(match, "ampm")
+    pod_word = _group(match, "pod")
+    pod = _FOLDED_PARTS_OF_DAY[pod_word][0] if pod_word else None
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if ampm == "pm" else 0)
+    else:
+        hour = _apply_part_of_day(hour, pod)
+    if hour is None or not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return None
+
+    day = None
+    if _group(match, "day"):
+        offset = _FOLDED_POD_DAYS[re.sub(r"\s+", " ", match.group("day"))]
+        day = ctx.today + timedelta(days=offset)
+    return _Atom(
+        match.start(),
+        match.end(),
+        day=day,
+        time=(hour, minute),
+        # "am"/"pm" marks an hour that a merged part of day must not shift.
+        pod=pod or ampm,
+        explicit_time=True,
+        grain="minute" if minute else "hour",
+        dated=day is not None,
+    )
+
+
+def _resolve_date(match: "re.Match[str]", ctx: _Context) -> Optional[_Atom]:
+    raw_year = _group(match, "y")
+    year = None
+    if raw_year:
+        year = int(raw_year) + (2000 if len(raw_year) == 2 else 0)
+    raw_month = _group(match, "mo")
+    day = _make_day(ctx, int(match.group("d")), int(raw_month) if raw_month else None, year)
+    if day is None:
+        return None
+    return _Atom(match.start(), match.end(), day=day)
+
+
+def _resolve_day_offset(match: "re.Match[str]", ctx: _Context) -> Optional[_Atom]:
+    offset = _FOLDED_DAY_OFFSETS[re.sub(r"\s+", " ", match.group("word"))]
+    return _Atom(match.start(), match.end(), day=ctx.today + timedelta(days=offset))
+
+
+def _resolve_part_of_day(match: "re.Match[str]", ctx: _Context) -> Optional[_Atom]:
+    kind, hour = _FOLDED_PARTS_OF_DAY[match.group("pod")]
+    day_word = _group(match, "day")
+    if day_word is not None:
+        day_word = re.sub(r"\s+", " ", day_word)
+    if day_word is None:
+        offset = 0
+    elif day_word in _FOLDED_POD_DAYS:
+        offset = _FOLDED_POD_DAYS[day_word]
+    else:
+        offset = {"this": 0, "tomorrow": 1, "yesterday": -1}[day_word]
+    return _Atom(
+        match.start(),
+        match.end(),
+        day=ctx.today + timedelta(days=offset),
+        time=(hour, 0),
+        pod=kind,
+        grain="hour",
+    )
+
+
+def _resolve_weekday(match: "re.Match[str]", ctx: _Context) -> Optional[_Atom]:
+    if match.group("wd") in WEEKDAY_ABBREVIATIONS and not (
+        _group(match, "pod")
+        or _ABBREVIATION_CONTEXT.search(match.string, 0, match.start("wd"))
+        or match.string.strip() == match.group(0)
+    ):
+        return None
+    weekday = _FOLDED_WEEKDAYS[re.sub(r"\s+", " ", match.group("wd"))]
+    week_shift = _group(match, "wk") or _group(match, "wk_this")
+    english = _group(match, "en")
+    if week_shift is not None:
+        monday = ctx.today - timedelta(days=ctx.today.weekday())
+        shift = _shift(week_shift)
+        day = monday + timedelta(days=7 * shift + weekday)
+    elif not ctx.roll_future and english != "next":
+        # Finance records what was spent: the latest such day, today included
+        # ("last" skips today).
+        days_back = (ctx.today.weekday() - weekday) % 7
+        if english == "last" and days_back == 0:
+            days_back = 7
+        day = ctx.today - timedelta(days=days_back)
+    else:
+        days_ahead = weekday - ctx.today.weekday()
+        if days_ahead <= 0:
+            days_ahead += 7
+        day = ctx.today + timedelta(days=days_ahead)
+        if english == "last":
+            day -= timedelta(days=7)
+    if not ctx.roll_future and day > ctx.today:
+        return _Atom(match.start(), match.end(), void=True)
+    atom = _Atom(
+        match.start(),
+        match.end(),
+        day=day,
+        weekday=weekday,
+        week_named=week_shift is not None or english is not None,
+    )
+    pod_word = _group(match, "pod")
+    if pod_word:
+        # "sáng thứ 2": the part of day's default hour on that day.
+        kind, hour = _FOLDED_PARTS_OF_DAY[pod_word]
+        atom.time, atom.pod, atom.grain = (hour, 0), kind, "hour"
+    return atom
+
+
+def _resolve_period(match: "re.Match[str]", ctx: _Context) -> Optional[_Atom]:
+    unit = _FOLDED_PERIOD_UNITS[match.group("unit")]
+    shift = _shift(match.group("shift"))
+    if unit == "week":
+        start = ctx.today - timedelta(days=ctx.today.weekday()) + timedelta(days=7 * shift)
+        end = start + timedelta(days=7)
+        anchor = ctx.today + timedelta(days=7 * shift)
+    elif unit == "month":
+        start = _add_months(ctx.today.replace(day=1), shift)
+        end = _add_months(start, 1)
+        anchor = ctx.today + timedelta(days=30 * shift)
+    else:
+        start = ctx.today.replace(year=ctx.today.year + shift, month=1, day=1)
+        end = start.replace(year=start.year + 1)
+        anchor = _add_months(ctx.today, 12 * shift)
+    return _Atom(match.start(), match.end(), anchor=anchor, span=(start, end), grain=unit)
+
+
+def _resolve_weekend(match: "re.Match[str]", ctx: _Context) -> Optional[_Atom]:
+    shift_word = _group(match, "shift")
+    shift = _shift(shift_word) if shift_word else 0
+    saturday = ctx.today + timedelta(days=5 - ctx.today.weekday() + 7 * shift)
+    return _Atom(
+        match.start(),
+        match.end(),
+        anchor=saturday,
+        span=(saturday, saturday + timedelta(days=2)),
+        grain="day",
+    )
+
+
+def _resolve_duration(match: "re.Match[str]", ctx: _Context) -> Optional[_Atom]:
+    amount = int(match.group("n"))
+    field, size, grain = _FOLDED_DURATION_UNITS[match.group("unit")]
+    if field == "months":
+        anchor = _add_months(ctx.now, amount * size)
+    else:
+        anchor = ctx.now + timedelta(**{field: amount * size})
+    if grain == "day":
+        anchor = anchor.replace(hour=0, minute=0, second=0, microsecond=0)
+        return _Atom(match.start(), match.end(), day=anchor)
+    anchor = anchor.replace(second=0, microsecond=0)
+    return _Atom(
+        match.start(),
+        match.end(),
+        day=anchor.replace(hour=0, minute=0),
+        time=(anchor.hour, anchor.minute),
+        explicit_time=True,
+        grain=grain,
+        dated=False,
+    )
+
+
+@dataclass(frozen=True)
+class _Rule:
+    name: str
+    pattern: Pattern[str]
+    resolve: Callable[["re.Match[str]", _Context], Optional[_Atom]]
+
+
+_DURATION_UNIT = _alternation(DURATION_UNITS)
+
+_CLOCK_RULES: Tuple[_Rule, ...] = (
+    _Rule(
+        "clock",
+        re.compile(_CLOCK_PREFIX + rf"(?P<h>\d{{1,2}})\s?(?:h|gio|g){_MINUTES}?\b" + _CLOCK_SUFFIX),
+        _resolve_clock,
+    ),
+    _Rule(
+        "clock_after_part_of_day",
+        re.compile(
+            rf"\b(?P<pod>{_POD})\s+(?:(?P<day>{_POD_DAY})\s+)?(?:luc\s+)?"
+            rf"(?P<h>\d{{1,2}})\s?(?:h|gio|g){_MINUTES}?\b"
+        ),
+        _resolve_clock,
+    ),
+    _Rule(
+        "clock_colon",
+        re.compile(_CLOCK_PREFIX + r"(?P<h>\d{1,2}):(?P<m>\d{2})\b" + _CLOCK_SUFFIX),
+        _resolve_clock,
+    ),
+    _Rule(
+        "clock_ampm",
+        re.compile(_CLOCK_PREFIX + r"(?P<h>\d{1,2})\s?(?P<ampm>am|pm)\b"),
+        _resolve_clock,
+    ),
+    _Rule(
+        "clock_bare_hour",
+        re.compile(r"\b(?:vao\s+luc|luc|at)\s+(?P<h>\d{1,2})(?![\w/:.,])" + _CLOCK_SUFFIX),
+        _resolve_clock,
+    ),
+)
+
+_RULES: Tuple[_Rule, ...] = _CLOCK_RULES + (
+    _Rule(
+        "date_iso",
+        re.compile(r"(?<![\d/])(?P<y>\d{4})-(?P<mo>\d{1,2})-(?P<d>\d{1,2})(?![\d/])"),
+        _resolve_date,
+    ),
+    _Rule(
+        "date_slash",
+        re.compile(
+            r"(?:\bngay\s+)?(?<![\d/.,])(?P<d>\d{1,2})/(?P<mo>\d{1,2})(?:/(?P<y>\d{4}|\d{2}))?(?![\d/])"
+        ),
+        _resolve_date,
+    ),
+    _Rule(
+        "date_words",
+        re.compile(
+            r"(?:\bngay\s+)?\b(?P<d>\d{1,2})\s+thang\s+(?P<mo>\d{1,2})(?:\s+nam\s+(?P<y>\d{4}))?\b"
+        ),
+        _resolve_date,
+    ),
+    _Rule(
+        "date_day",
+        re.compile(r"\bngay\s+(?P<d>\d{1,2})\b(?![/:.,]\d)"),
+        _resolve_date,
+    ),
+    _Rule(
+        "day_offset",
+        re.compile(rf"\b(?P<word>{_alternation(DAY_OFFSETS)})\b"),
+        _resolve_day_offset,
+    ),
+    _Rule(
+        "part_of_day",
+        re.compile(rf"\b(?P<pod>{_POD})\s+(?P<day>{_POD_DAY})\b"),
+        _resolve_part_of_day,
+    ),
+    _Rule(
+        "part_of_day_en",
+        re.compile(r"\b(?P<day>this|tomorrow|yesterday)\s+(?P<pod>morning|afternoon|evening|night)\b"),
+        _resolve_part_of_day,
+    ),
+    _Rule(
+        "tonight",
+        re.compile(r"\bto(?P<pod>night)\b"),
+        _resolve_part_of_day,
+    ),
+    _Rule(
+        "weekday",
+        re.compile(
+            rf"\b(?:(?P<en>next|this|last)\s+)?(?P<wd>{_WEEKDAY}){_WEEKDAY_WEEK}\b"
+        ),
+        _resolve_weekday,
+    ),
+    _Rule(
+        "weekday_part_of_day",
+        re.compile(
+            rf"\b(?P<pod>{_POD})\s+(?P<wd>{_WEEKDAY}){_WEEKDAY_WEEK}\b"
+        ),
+        _resolve_weekday,
+    ),
+    _Rule(
+        "period",
+        re.compile(rf"\b(?P<unit>tuan|thang|nam)\s+(?P<shift>{_SHIFT_VI})\b"),
+        _resolve_period,
+    ),
+    _Rule(
+        "period_en",
+        re.compile(r"\b(?P<shift>this|next|last)\s+(?P<unit>week|month|year)\b"),
+        _resolve_period,
+    ),
+    _Rule(
+        "weekend",
+        re.compile(rf"\bcuoi\s+tuan(?:\s+(?:tuan\s+)?(?P<shift>{_SHIFT_VI}))?\b"),
+        _resolve_weekend,
+    ),
+    _Rule(
+        "weekend_en",
+        re.compile(r"\b(?:(?P<shift>this|next|last)\s+)?weekend\b"),
+        _resolve_weekend,
+    ),
+    _Rule(
+        "duration",
+        re.compile(rf"\b(?P<n>\d{{1,3}})\s?(?P<unit>{_DURATION_UNIT})\s+(?:nua|sau|later)\b"),
+        _resolve_duration,
+    ),
+    _Rule(
+        "duration_prefix",
+        re.compile(rf"\b(?:sau|in)\s+(?P<n>\d{{1,3}})\s?(?P<unit>{_DURATION_UNIT})\b"),
+        _resolve_duration,
+    ),
+)
+
+# Finance only: a lone "15" is a day of the month, unless it is an amount.
+_BARE_DAY_RULE = _Rule(
+    "bare_day",
+    re.compile(
+        r"(?<![\w/.,:])(?P<d>\d{1,2})\b(?![/.,:]\d)"
+        r"(?!\s*(?:k|nghin|ngan|tr|trieu|cu|d|dong|vnd|%|₫)(?!\w))"
+    ),
+    _resolve_date,
+)
+
+
+_POD_WORD_PATTERN = re.compile(rf"\b{_POD}\b")
+_DATE_CLOCK_GAP = re.compile(r"[\s,]*(?:(?:vao|on)\s+)?")
+_RANGE_PREFIX = re.compile(r"\b(?:tu|from)\s+$")
+_RANGE_GAP = re.compile(r"\s*(?:\b(?:den|toi|to)\b|-)\s*")
+_RANGE_GAP_BARE = re.compile(r"\s+den\s+")
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+
+def _scan(
+    folded: str, original: str, offsets: List[int], ctx: _Context, bare_day: bool
+) -> List[_Atom]:
+    rules = _RULES + ((_BARE_DAY_RULE,) if bare_day else ())
+    candidates: List[_Atom] = []
+    for rule in rules:
+        for match in rule.pattern.finditer(folded):
+            if match.end() == match.start():
+                continue
+            if not _spelled_as_lexicon(original[offsets[match.start()]:offsets[match.end()]]):
+                continue
+            atom = rule.resolve(match, ctx)
+            if atom is not None:
+                candidates.append(atom)
+
+    # Leftmost-longest, non-overlapping.
+    candidates.sort(key=lambda atom: (atom.start, atom.start - atom.end))
+    selected: List[_Atom] = []
+    for atom in candidates:
+        if selected and atom.start < selected[-1].end:
+            continue
+        selected.append(atom)
+    return selected
+
+
+def _clock_on_day(clock: _Atom, day: datetime, pod: Optional[str]) -> Optional[_Atom]:
+    hour, minute = clock.time or (0, 0)
+    if clock.pod is None and pod is not None:
+        hour = _apply_part_of_day(hour, pod)
+    if hour is None or hour > 23:
+        return None
+    return _Atom(
+        clock.start,
+        clock.end,
+        day=day,
+        time=(hour, minute),
+        pod=clock.pod or pod,
+        explicit_time=True,
+        grain=clock.grain,
+    )
+
+
+def _merge_date_and_clock(folded: str, atoms: List[_Atom]) -> List[_Atom]:
+    merged: List[_Atom] = []
+    for atom in atoms:
+        previous = merged[-1] if merged else None
+        if previous is not None and _DATE_CLOCK_GAP.fullmatch(folded[previous.end:atom.start]):
+            date_atom, clock_atom = (
+                (previous, atom) if previous.date_like and atom.clock_like
+                else (atom, previous) if previous.clock_like and atom.date_like
+                else (None, None)
+            )
+            combined = (
+                _clock_on_day(clock_atom, date_atom.day, date_atom.pod)
+                if date_atom is not None and clock_atom is not None
+                else None
+            )
+            if combined is not None:
+                combined.start, combined.end = previous.start, atom.end
+                merged[-1] = combined
+                continue
+        merged.append(atom)
+    return merged
+
+
+def _finish(atom: _Atom, ctx: _Context) -> Tuple[datetime, datetime]:
+    """Resolve an atom to its [start, end) span."""
+    if atom.span is not None:
+        return atom.span
+    day = atom.day
+    hour, minute = atom.time or (0, 0)
+    if day is None:
+        day = ctx.today
+        if ctx.roll_future and day.replace(hour=hour, minute=minute) < ctx.now:
+            day += timedelta(days=1)
+    start = day.replace(hour=hour, minute=minute) if atom.time else day
+    return start, start + _GRAIN_STEPS[atom.grain]
+
+
+def _same_week(first: _Atom, second: _Atom, ctx: _Context) -> Tuple[_Atom, _Atom]:
+    """"từ thứ 2 đến thứ 6": one week for both ends, rolled as a pair."""
+    span = timedelta(days=(second.weekday - first.weekday) % 7)
+    if first.week_named and second.week_named:
+        return first, second
+    if first.week_named:
+        return first, replace(second, day=first.day + span)
+    if second.week_named:
+        return replace(first, day=second.day - span), second
+    start = ctx.today + timedelta(days=first.weekday - ctx.today.weekday())
+    if ctx.roll_future and start + span < ctx.today:
+        start += timedelta(days=7)
+    elif not ctx.roll_future and start > ctx.today:
+        start -= timedelta(days=7)
+    return replace(first, day=start), replace(second, day=start + span)
+
+
+def _range_bounds(
+    first: _Atom, second: _Atom, ctx: _Context
+) -> Optional[Tuple[datetime, datetime]]:
+    if first.weekday is not None and second.weekday is not None:
+        first, second = _same_week(first, second, ctx)
+    # "từ 2h đến 4h chiều mai": the start takes the end's day and part of day.
+    if first.clock_like and second.day is not None and second.span is None:
+        first = _clock_on_day(first, second.day, second.pod) or first
+    start, _ = _finish(first, ctx)
+    # "từ 9h đến 11h": the end shares the start's day.
+    if second.clock_like:
+        second = _clock_on_day(second, start.replace(hour=0, minute=0), None) or second
+    _, end = _finish(second, ctx)
+    return (start, end) if end > start else None
+
+
+def _join_ranges(
+    folded: str, original: str, offsets: List[int], atoms: List[_Atom], ctx: _Context
+) -> List[_Atom]:
+    joined: List[_Atom] = []
+    index = 0
+    while index < len(atoms):
+        first = atoms[index]
+        second = atoms[index + 1] if index + 1 < len(atoms) else None
+        if second is not None:
+            gap = folded[first.end:second.start]
+            prefix = _RANGE_PREFIX.search(folded[:first.start])
+            connected = (prefix and _RANGE_GAP.fullmatch(gap)) or _RANGE_GAP_BARE.fullmatch(gap)
+            checked_from = prefix.start() if prefix else first.end
+            connected = connected and _spelled_as_lexicon(
+                original[offsets[checked_from]:offsets[second.start]]
+            )
+            bounds = _range_bounds(first, second, ctx) if connected else None
+            if bounds is not None:
+                joined.append(
+                    _Atom(
+                        prefix.start() if prefix else first.start,
+                        second.end,
+                        anchor=bounds[0],
+                        span=bounds,
+                        grain=first.grain,
+                        dated=first.dated or second.dated,
+                    )
+                )
+                index += 2
+                continue
+            if connected and prefix:
+                # "từ X đến Y" that does not resolve: not two separate times.
+                first = replace(first, unjoined_range=True)
+                atoms[index + 1] = replace(second, unjoined_range=True)
+        joined.append(first)
+        index += 1
+    return joined
+
+
+def find_all(
+    text: Optional[str],
+    now: datetime,
+    *,
+    roll_future: bool = True,
+    bare_day: bool = False,
+) -> List[TemporalMatch]:
+    """Find every temporal expression in ``text``, resolved against ``now``.
+
+    ``roll_future`` moves year-less dates and clock times that already passed
+    to their next occurrence (Duckling's behaviour); finance keeps them.
+    ``bare_day`` also reads a lone "15" as a day of the current month.
+    """
+    if not text:
+        return []
+
+    folded, offsets = fold(text)
+    ctx = _Context(now, now.replace(hour=0, minute=0, second=0, microsecond=0), roll_future)
+    atoms = [atom for atom in _scan(folded, text, offsets, ctx, bare_day) if not atom.void]
+    atoms = _join_ranges(folded, text, offsets, _merge_date_and_clock(folded, atoms), ctx)
+
+    matches: List[TemporalMatch] = []
+    for atom in atoms:
+        start, end = _finish(atom, ctx)
+        original_start, original_end = offsets[atom.start], offsets[atom.end]
+        matches.append(
+            TemporalMatch(
+                start=original_start,
+                end=original_end,
+                text=text[original_start:original_end],
+                anchor=atom.anchor or start,
+                grain=atom.grain,
+                time=atom.time if atom.span is None else None,
+                interval=atom.span,
+                unjoined_range=atom.unjoined_range,
+                dated=atom.dated,
+            )
+        )
+    return matches
+
+
+def find_first(
+    text: Optional[str],
+    now: datetime,
+    *,
+    roll_future: bool = True,
+    bare_day: bool = False,
+) -> Optional[TemporalMatch]:
+    matches = find_all(text, now, roll_future=roll_future, bare_day=bare_day)
+    return matches[0] if matches else None
+
+
+def parse_clock(text: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Clock time of a time slot value ("9h30", "3 giờ chiều", "tối", "sáng 10").
+
+    A part-of-day word anywhere in the value shifts a bare hour ("chiều 3h"
+    is 15:00); a part of day alone gives its default hour.
+    """
+    if not text:
+        return None
+    folded, offsets = fold(text.strip())
+    pod_kind = None
+    for match in _POD_WORD_PATTERN.finditer(folded):
+        if _spelled_as_lexicon(text.strip()[offsets[match.start()]:offsets[match.end()]]):
+            pod_kind, default_hour = _FOLDED_PARTS_OF_DAY[match.group(0)]
+            break
+
+    now = datetime.now()
+    ctx = _Context(now, now, roll_future=False)
+    for rule in _CLOCK_RULES:
+        match = rule.pattern.search(folded)
+        atom = rule.resolve(match, ctx) if match else None
+        if atom is None or atom.time is None:
+            continue
+        hour, minute = atom.time
+        if atom.pod is None and pod_kind is not None:
+            adjusted = _apply_part_of_day(hour, pod_kind)
+            return (adjusted, minute) if adjusted is not None and adjusted <= 23 else None
+        return atom.time
+
+    if pod_kind is None:
+        return None
+    digits = re.search(r"\d{1,2}", folded)
+    if not digits:
+        return (default_hour, 0)
+    hour = _apply_part_of_day(int(digits.group(0)), pod_kind)
+    return (hour, 0) if hour is not None and hour <= 23 else None
+
+
+# ---------------------------------------------------------------------------
+# Duckling format
+# ---------------------------------------------------------------------------
+
+
+def _duckling_timestamp(value: datetime) -> str:
+    return value.isoformat(timespec="milliseconds")
+
+
+def to_duckling(match: TemporalMatch) -> Dict[str, Any]:
+    """Render a match the way Duckling's /parse endpoint returns a ``time``."""
+    if match.interval is not None:
+        start, end = match.interval
+        value: Dict[str, Any] = {
+            "type": "interval",
+            "from": {"value": _duckling_timestamp(start), "grain": match.grain},
+            "to": {"value": _duckling_timestamp(end), "grain": match.grain},
+        }
+    else:
+        value = {
+            "type": "value",
+            "value": _duckling_timestamp(match.anchor),
+            "grain": match.grain,
+        }
+    value["values"] = [dict(value)]
+    return {
+        "body": match.text,
+        "start": match.start,
+        "end": match.end,
+        "dim": "time",
+        "latent": False,
+        "value": value,
+    }
@@ -0,0 +1,97 @@
+import time
+from typing import Any, Dict, List, Text
+
+from rasa.engine.graph import ExecutionContext, GraphComponent
+from rasa.engine.recipes.default_recipe import DefaultV1Recipe
+from rasa.engine.storage.resource import Resource
+from rasa.engine.storage.storage import ModelStorage
+from rasa.nlu.extractors.duckling_entity_extractor import convert_duckling_format_to_rasa
+from rasa.nlu.extractors.extractor import EntityExtractorMixin
+from rasa.shared.nlu.constants import ENTITIES, TEXT
+from rasa.shared.nlu.training_data.message import Message
+from rasa.shared.nlu.training_data.training_data import TrainingData
+
+from custom_components.duckling_extractor import reference_datetime
+from custom_components.extraction_gate import (
+    DEFAULT_GATE_MIN_CONFIDENCE,
+    DEFAULT_INTENT_EXTRACTORS,
+    GRAMMAR_COVERED_ATTRIBUTE,
+    has_time_cue,
+    intent_allows,
+)
+from custom_components.metadata_intent_router import is_routed
+from custom_components.temporal_grammar import TemporalMatch, find_all, to_duckling
+
+
+def _uncovered_text(text: Text, matches: List[TemporalMatch]) -> Text:
+    pieces: List[Text] = []
+    cursor = 0
+    for match in matches:
+        pieces.append(text[cursor:match.start])
+        cursor = match.end
+    pieces.append(text[cursor:])
+    return " ".join(pieces)
+
+
+@DefaultV1Recipe.register(
+    [DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR], is_trainable=False
+)
+class TemporalGrammarExtractor(EntityExtractorMixin, GraphComponent):
+    """Duckling-compatible ``time`` entities from the in-process temporal grammar.
+
+    Only fills a message when the grammar explains every time cue in it, and
+    then marks it so GatedDucklingEntityExtractor skips the HTTP call. Anything
+    else is left untouched for Duckling. Must run before the Duckling extractor.
+    """
+
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            # IANA zone the phrases are resolved in; None uses the host's.
+            "timezone": None,
+            # Same intent gate as the other extractors.
+            "intent_extractors": dict(DEFAULT_INTENT_EXTRACTORS),
+            "gate_min_confidence": DEFAULT_GATE_MIN_CONFIDENCE,
+        }
+
+    def __init__(self, config: Dict[Text, Any]) -> None:
+        self._config = config
+
+    @classmethod
+    def create(
+        cls,
+        config: Dict[Text, Any],
+        model_storage: ModelStorage,
+        resource: Resource,
+        execution_context: ExecutionContext,
+    ) -> "TemporalGrammarExtractor":
+        return cls(config)
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        for message in messages:
+            text = message.get(TEXT) or ""
+            if not text or is_routed(message) or not has_time_cue(text):
+                continue
+            if not intent_allows(message, "TemporalGrammarExtractor", self._config):
+                continue
+
+            reference_time = message.time if message.time is not None else time.time()
+            now = reference_datetime(float(reference_time) * 1000, self._config.get("timezone"))
+            matches = find_all(text, now)
+            if not matches or has_time_cue(_uncovered_text(text, matches)):
+                continue
+            if any(match.unjoined_range for match in matches):
+                continue
+
+            entities = convert_duckling_format_to_rasa([to_duckling(match) for match in matches])
+            message.set(
+                ENTITIES,
+                message.get(ENTITIES, []) + self.add_extractor_name(entities),
+                add_to_output=True,
+            )
+            message.set(GRAMMAR_COVERED_ATTRIBUTE, True)
+
+        return messages
+
+    def process_training_data(self, training_data: TrainingData) -> TrainingData:
+        return training_data
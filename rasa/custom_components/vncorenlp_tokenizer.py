@@ -1,16 +1,19 @@
-﻿from typing import Any, Dict, List, Text
+﻿import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Text
 
 from rasa.engine.graph import ExecutionContext
 from rasa.engine.recipes.default_recipe import DefaultV1Recipe
 from rasa.engine.storage.resource import Resource
 from rasa.engine.storage.storage import ModelStorage
 from rasa.nlu.tokenizers.tokenizer import Token, Tokenizer
+from rasa.shared.nlu.constants import TEXT
 from rasa.shared.nlu.training_data.message import Message
+from rasa.shared.nlu.training_data.training_data import TrainingData
 
-try:
-    from vncorenlp import VnCoreNLP
-except ImportError:
-    VnCoreNLP = None
+from custom_components.metadata_intent_router import is_routed
+from custom_components.segmenter_pool import create_segmenter_pool
+from custom_components.word_segmenter import normalize_tones
 
 
 @DefaultV1Recipe.register(
@@ -25,20 +28,39 @@ class VnCoreNLPTokenizer(Tokenizer):
             "intent_tokenization_flag": False,
             "intent_split_symbol": "_",
             "token_pattern": None,
+            # "vncorenlp" (JVM segmenters configured below) or "python"
+            # (in-process WordSegmenter; no JVM, jar/server options ignored).
+            # "python" is EXPERIMENTAL: its word list only has the training
+            # corpora's compounds ("thời gian", "điện thoại" stay split), so
+            # it matches VnCoreNLP on only ~83% of held-out intent sentences
+            # and ~63% of NER ones. Keep "vncorenlp" for serving and training.
+            "segmenter": "vncorenlp",
+            # Word list of the Python segmenter; defaults to
+            # data/phobert/train/segmenter_words.txt.
+            "dictionary_path": None,
+            # VnCoreNLP jar; falls back to $VNCORENLP_JAR, then the old default path.
+            "jar_path": None,
+            "max_heap_size": "-Xmx500m",
+            # Segmenters (one JVM each) parses can use concurrently.
+            "pool_size": 1,
+            # Connect to one running VnCoreNLP server (e.g. "http://127.0.0.1")
+            # instead of starting JVMs. ``port`` is that server's port, or the
+            # first port of the started JVMs (segmenter i uses port + i).
+            "server_address": None,
+            "port": 9000,
+            "timeout": 30,
+            # Texts joined into a single segmentation request.
+            "batch_size": 32,
         }
 
     def __init__(self, config: Dict[Text, Any]) -> None:
         super().__init__(config)
-        if VnCoreNLP is not None:
-            jar_path = r"C:\Users\HPPC~1\VnCoreNLP\VnCoreNLP-1.2.jar"
-            self.rdrsegmenter = VnCoreNLP(
-                jar_path,
-                annotators="wseg",
-                max_heap_size="-Xmx500m",
-            )
-        else:
-            self.rdrsegmenter = None
+        self.batch_size = int(config.get("batch_size") or 1)
+        self.segmenters = create_segmenter_pool(config)
+        if self.segmenters is None:
             print("WARNING: vncorenlp not installed. Falling back to whitespace split.")
+        # Words of the texts segmented for the process() call on this thread.
+        self._presegmented = threading.local()
 
     @classmethod
     def create(
@@ -50,28 +72,54 @@ class VnCoreNLPTokenizer(Tokenizer):
     ) -> "VnCoreNLPTokenizer":
         return cls(config)
 
+    def process(self, messages: List[Message]) -> List[Message]:
+        texts = (message.get(TEXT) for message in messages if not is_routed(message))
+        with self._segmented_in_batches(texts):
+            return super().process(messages)
+
+    def process_training_data(self, training_data: TrainingData) -> TrainingData:
+        texts = (example.get(TEXT) for example in training_data.training_examples)
+        with self._segmented_in_batches(texts):
+            return super().process_training_data(training_data)
+
+    @contextmanager
+    def _segmented_in_batches(self, texts: Iterable[Any]) -> Iterator[None]:
+        words: Dict[Text, List[Text]] = {}
+        if self.segmenters is not None:
+            unique = list(dict.fromkeys(text for text in texts if isinstance(text, str) and text))
+            words = dict(zip(unique, self.segmenters.segment(unique, self.batch_size)))
+        self._presegmented.words = words
+        try:
+            yield
+        finally:
+            self._presegmented.words = {}
+
     def tokenize(self, message: Message, attribute: Text) -> List[Token]:
         text = message.get(attribute)
         if not text:
             return []
 
-        if not self.rdrsegmenter:
+        # Routed button clicks never reach a model that needs real segmentation.
+        if self.segmenters is None or is_routed(message):
             return self._words_to_tokens(text.split(), text)
 
-        sentences = self.rdrsegmenter.tokenize(text)
-        words: List[str] = []
-        for sentence in sentences:
-            words.extend(sentence)
-
+        words = getattr(self._presegmented, "words", {}).get(text)
+        if words is None:
+            words = self.segmenters.segment([text])[0]
         return self._words_to_tokens(words, text)
 
     def _words_to_tokens(self, words: List[Text], text: Text) -> List[Token]:
+        # Segmenters move tones ("xóa" -> "xoá"); search the same spelling.
+        # Normalization keeps the length of NFC text, so offsets still apply.
+        search_text = normalize_tones(text)
+        if len(search_text) != len(text):
+            search_text = text
         tokens = []
         offset = 0
         for word in words:
             plain_word = word.replace("_", " ")
             word_len = len(plain_word)
-            start = text.find(plain_word, offset)
+            start = search_text.find(plain_word, offset)
             if start == -1:
                 start = offset
             end = start + word_len
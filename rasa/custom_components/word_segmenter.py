@@ -0,0 +1,116 @@
+"""
+In-process Vietnamese word segmenter producing VnCoreNLP ``wseg`` output.
+
+Longest-match over a syllable trie built from a word list (one word per line,
+syllables joined by ``_`` or spaces; see data/phobert/tools/build_segmenter_dict.py).
+Like VnCoreNLP it moves tones onto the second vowel of "oa"/"oe"/"uy" ("xóa" ->
+"xoá"), splits punctuation off words and joins the syllables of a word with
+``_``. Exposes both ``tokenize`` (vncorenlp) and ``word_segment`` (py_vncorenlp)
+so it drops in wherever either client is used.
+
+Experimental: the default list only holds the compounds of our training
+corpora, so unseen words stay split where VnCoreNLP would join them (see the
+measured parity in rasa/README.md). VnCoreNLP remains the reference.
+"""
+
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Text
+
+DEFAULT_DICTIONARY_PATH = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        "..", "data", "phobert", "train", "segmenter_words.txt",
+    )
+)
+
+# A decimal number before a unit ("1.5" of "1.5tr"), a word possibly with inner
+# punctuation ("to-do", "n.y", "9:30", "1.000"), or a run of punctuation.
+_TOKEN_PATTERN = re.compile(
+    r"\d+(?:[.,]\d+)+(?=[^\W\d_])|\w+(?:[-.+/:,'&@]\w+)*|[^\w\s]+"
+)
+# Trie node key marking the end of a dictionary word; never a syllable.
+_END = ""
+
+
+def _tone_moves() -> Dict[Text, Text]:
+    moves: Dict[Text, Text] = {}
+    for first, second in (("o", "a"), ("o", "e"), ("u", "y")):
+        for tone in ("̀", "́", "̉", "̃", "̣"):
+            for head in (first, first.upper()):
+                for tail in (second, second.upper()):
+                    old = unicodedata.normalize("NFC", head + tone + tail)
+                    moves[old] = unicodedata.normalize("NFC", head + tail + tone)
+    return moves
+
+
+_TONE_MOVES = _tone_moves()
+_TONE_PATTERN = re.compile("|".join(sorted(_TONE_MOVES)))
+
+
+def normalize_tones(text: Text) -> Text:
+    """NFC text with VnCoreNLP's tone placement; keeps the length of NFC input."""
+    text = unicodedata.normalize("NFC", text)
+    return _TONE_PATTERN.sub(lambda match: _TONE_MOVES[match.group(0)], text)
+
+
+def read_dictionary(path: Text) -> List[Text]:
+    words = []
+    with open(path, "r", encoding="utf-8") as file_obj:
+        for line in file_obj:
+            word = line.strip()
+            if word and not word.startswith("#"):
+                words.append(word)
+    return words
+
+
+class WordSegmenter:
+    def __init__(self, words: Iterable[Text]) -> None:
+        self._trie: Dict[Text, dict] = {}
+        self.size = 0
+        for word in words:
+            syllables = normalize_tones(word).lower().replace("_", " ").split()
+            if len(syllables) < 2:
+                continue
+            node = self._trie
+            for syllable in syllables:
+                node = node.setdefault(syllable, {})
+            if _END not in node:
+                node[_END] = {}
+                self.size += 1
+
+    @classmethod
+    def from_file(cls, path: Optional[Text] = None) -> "WordSegmenter":
+        return cls(read_dictionary(path or DEFAULT_DICTIONARY_PATH))
+
+    def segment(self, text: Text) -> List[Text]:
+        """Words of ``text``, multi-syllable words joined with ``_``."""
+        tokens = _TOKEN_PATTERN.findall(normalize_tones(text))
+        keys = [token.lower() for token in tokens]
+        words: List[Text] = []
+        start = 0
+        while start < len(tokens):
+            length = 1
+            node = self._trie
+            end = start
+            while end < len(tokens):
+                node = node.get(keys[end])
+                if node is None:
+                    break
+                end += 1
+                if _END in node:
+                    length = end - start
+            words.append("_".join(tokens[start:start + length]))
+            start += length
+        return words
+
+    def tokenize(self, text: Text) -> List[List[Text]]:
+        """vncorenlp-style result: a list of sentences, each a list of words."""
+        words = self.segment(text)
+        return [words] if words else []
+
+    def word_segment(self, text: Text) -> List[Text]:
+        """py_vncorenlp-style result: a list of segmented sentence strings."""
+        words = self.segment(text)
+        return [" ".join(words)] if words else []
@@ -9,13 +9,20 @@ from typing import Any
 
 IMPORT_ERROR: ModuleNotFoundError | None = None
 
+RASA_DIR = Path(__file__).resolve().parents[3]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
 try:
     import torch
     from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    from custom_components.phobert_tokenizer import load_tokenizer
 except ModuleNotFoundError as exc:
     torch = None  # type: ignore[assignment]
     AutoModelForSequenceClassification = Any  # type: ignore[assignment]
     AutoTokenizer = Any  # type: ignore[assignment]
+    load_tokenizer = None  # type: ignore[assignment]
     IMPORT_ERROR = exc
 
 
@@ -279,7 +286,7 @@ def main() -> int:
 
     model_dir, examples_dir, intent_map_file = resolve_paths()
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    tokenizer = load_tokenizer(str(model_dir))
     model = AutoModelForSequenceClassification.from_pretrained(model_dir)
     model.to(device)
     model.eval()
@@ -310,6 +317,7 @@ def main() -> int:
     print(f"Model dir : {model_dir}")
     print(f"Mode      : {args.mode}")
     print(f"Device    : {device}")
+    print(f"Tokenizer : {'fast' if tokenizer.is_fast else 'slow'}")
     print(f"Intents   : {len(expected_intents)}")
     print(f"Samples   : {len(cases)}")
 
@@ -1,9 +1,20 @@
+import argparse
 import json
 import os
 import sys
 # Để sử dụng VnCoreNLP, bạn cần cài đặt thư viện py_vncorenlp:
 # pip install py_vncorenlp
-import py_vncorenlp
+# Hoặc chạy với --segmenter python để dùng bộ tách từ Python (không cần Java).
+try:
+    import py_vncorenlp
+except ImportError:
+    py_vncorenlp = None
+
+RASA_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+if RASA_DIR not in sys.path:
+    sys.path.insert(0, RASA_DIR)
+
+from custom_components.word_segmenter import WordSegmenter  # noqa: E402
 
 
 def cau_hinh_console_utf8():
@@ -14,18 +25,18 @@ def cau_hinh_console_utf8():
             except Exception:
                 pass
 
-def tong_hop_intent():
-    """
-    Tổng hợp các tệp intent từ thư mục intent_phan_loai vào một tệp intent_train.json duy nhất,
-    sử dụng VnCoreNLP để tách từ.
-    """
-    # Khởi tạo VnCoreNLP
+def khoi_tao_vncorenlp():
+    """Khởi tạo VnCoreNLP (cần Java); trả về None nếu không thành công."""
+    if py_vncorenlp is None:
+        print("Vui lòng cài thư viện: pip install py_vncorenlp (hoặc dùng --segmenter python)")
+        return None
+
     # Thay đổi đường dẫn này nếu thư mục VnCoreNLP của bạn ở vị trí khác
     vncorenlp_path = r"C:\VnCoreNLP"
     if not os.path.exists(vncorenlp_path):
         print(f"Lỗi: Không tìm thấy thư mục VnCoreNLP tại '{vncorenlp_path}'")
         print("Vui lòng tải và giải nén VnCoreNLP vào đường dẫn trên hoặc cập nhật lại biến 'vncorenlp_path'.")
-        return
+        return None
         
     try:
         # Sử dụng RDRSegmenter để có kết quả tách từ tốt nhất
@@ -33,6 +44,21 @@ def tong_hop_intent():
     except Exception as e:
         print(f"Lỗi khi khởi tạo VnCoreNLP: {e}")
         print("Hãy chắc chắn rằng bạn đã cài đặt Java và cấu hình VnCoreNLP đúng cách.")
+        return None
+    return vncorenlp
+
+
+def tong_hop_intent(bo_tach_tu="vncorenlp"):
+    """
+    Tổng hợp các tệp intent từ thư mục intent_phan_loai vào một tệp intent_train.json duy nhất,
+    sử dụng VnCoreNLP (hoặc bộ tách từ Python khi bo_tach_tu="python") để tách từ.
+    """
+    if bo_tach_tu == "python":
+        # Cùng định dạng wseg với VnCoreNLP, chạy ngay trong tiến trình
+        vncorenlp = WordSegmenter.from_file()
+    else:
+        vncorenlp = khoi_tao_vncorenlp()
+    if vncorenlp is None:
         return
 
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -84,4 +110,7 @@ def tong_hop_intent():
 
 if __name__ == '__main__':
     cau_hinh_console_utf8()
-    tong_hop_intent()
+    parser = argparse.ArgumentParser(description="Tổng hợp intent_examples thành train/intent_train.json")
+    parser.add_argument("--segmenter", choices=("vncorenlp", "python"), default="vncorenlp",
+                        help="Bộ tách từ: vncorenlp (JVM, mặc định) hoặc python (thử nghiệm, trong tiến trình)")
+    tong_hop_intent(parser.parse_args().segmenter)
@@ -15,8 +15,13 @@ import yaml
 try:
     from vncorenlp import VnCoreNLP
 except ImportError:
-    print("Vui lòng cài thư viện: pip install vncorenlp")
-    sys.exit(1)
+    VnCoreNLP = None
+
+RASA_DIR = Path(__file__).resolve().parents[2]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.word_segmenter import WordSegmenter  # noqa: E402
 
 
 DEFAULT_JAR_PATH = Path(r"C:\Users\HPPC~1\VnCoreNLP\VnCoreNLP-1.2.jar")
@@ -69,6 +74,23 @@ def parse_args() -> argparse.Namespace:
         default=str(DEFAULT_JAR_PATH),
         help="Path to VnCoreNLP jar.",
     )
+    parser.add_argument(
+        "--segmenter",
+        choices=("vncorenlp", "python"),
+        default="vncorenlp",
+        help=(
+            "Word segmenter: VnCoreNLP (starts a JVM) or the experimental in-process "
+            "Python segmenter. Default: vncorenlp"
+        ),
+    )
+    parser.add_argument(
+        "--dictionary",
+        default=None,
+        help=(
+            "Word list of the Python segmenter (relative to this script by default). "
+            "Default: train/segmenter_words.txt"
+        ),
+    )
     return parser.parse_args()
 
 
@@ -274,15 +296,27 @@ def main():
     for file_path in input_files:
         print(f"  - {file_path}")
 
-    jar_path = resolve_path(current_dir, args.jar_path)
-    if not jar_path.exists():
-        print(f"Missing VnCoreNLP jar: {jar_path}")
-        sys.exit(1)
-
-    print(f"Initializing VnCoreNLP from {jar_path} ...")
-    rdrsegmenter = VnCoreNLP(
-        str(jar_path), annotators="wseg", max_heap_size="-Xmx2g", quiet=False
-    )
+    if args.segmenter == "python":
+        dictionary = resolve_path(current_dir, args.dictionary) if args.dictionary else None
+        if dictionary is not None and not dictionary.exists():
+            print(f"Missing segmenter dictionary: {dictionary}")
+            sys.exit(1)
+        rdrsegmenter = WordSegmenter.from_file(str(dictionary) if dictionary else None)
+        print(f"Using the Python segmenter ({rdrsegmenter.size} words).")
+    else:
+        if VnCoreNLP is None:
+            print("Vui lòng cài thư viện: pip install vncorenlp (hoặc dùng --segmenter python)")
+            sys.exit(1)
+
+        jar_path = resolve_path(current_dir, args.jar_path)
+        if not jar_path.exists():
+            print(f"Missing VnCoreNLP jar: {jar_path}")
+            sys.exit(1)
+
+        print(f"Initializing VnCoreNLP from {jar_path} ...")
+        rdrsegmenter = VnCoreNLP(
+            str(jar_path), annotators="wseg", max_heap_size="-Xmx2g", quiet=False
+        )
 
     intent_data, ner_data = process_nlu_sources(input_files, rdrsegmenter)
     intent_data, removed_duplicates = dedupe_intent_rows(intent_data)
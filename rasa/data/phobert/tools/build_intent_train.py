@@ -6,15 +6,25 @@ import json
 import os
 import sys
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Protocol
 
-import py_vncorenlp
+try:
+    import py_vncorenlp
+except ImportError:
+    py_vncorenlp = None
+
+RASA_DIR = Path(__file__).resolve().parents[3]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.word_segmenter import WordSegmenter  # noqa: E402
 
 
 DEFAULT_INPUT_DIR = Path("../intent/intent_examples")
 DEFAULT_OUTPUT_FILE = Path("../train/intent_train.json")
 DEFAULT_VNCORENLP_DIR = Path("./vncorenlp")
 DEFAULT_JAR_NAME = "VnCoreNLP-1.2.jar"
+SEGMENTERS = ("vncorenlp", "python")
 DEFAULT_DESCRIPTION = (
     "Build PhoBERT intent training data from split intent JSON files "
     "using VnCoreNLP word segmentation."
@@ -52,9 +62,36 @@ def parse_args(
             "If provided, its parent directory is used as the VnCoreNLP resource directory."
         ),
     )
+    add_segmenter_args(parser)
     return parser.parse_args()
 
 
+class Segmenter(Protocol):
+    """py_vncorenlp.VnCoreNLP or the in-process WordSegmenter."""
+
+    def word_segment(self, text: str) -> list[str]: ...
+
+
+def add_segmenter_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--segmenter",
+        choices=SEGMENTERS,
+        default="vncorenlp",
+        help=(
+            "Word segmenter: VnCoreNLP (starts a JVM) or the experimental in-process "
+            "Python segmenter. Default: vncorenlp"
+        ),
+    )
+    parser.add_argument(
+        "--dictionary",
+        default=None,
+        help=(
+            "Word list of the Python segmenter relative to this script. "
+            "Default: ../train/segmenter_words.txt"
+        ),
+    )
+
+
 def configure_console_utf8() -> None:
     for stream_name in ("stdout", "stderr"):
         stream = getattr(sys, stream_name, None)
@@ -137,6 +174,26 @@ def get_segmenter_save_dir(vncorenlp_dir: Path) -> str:
     return output_buffer.value
 
 
+def create_segmenter(base_dir: Path, args: argparse.Namespace) -> Segmenter:
+    if args.segmenter == "python":
+        dictionary = resolve_path(base_dir, args.dictionary) if args.dictionary else None
+        if dictionary is not None and not dictionary.is_file():
+            raise FileNotFoundError(f"Segmenter dictionary does not exist: {dictionary}")
+        return WordSegmenter.from_file(str(dictionary) if dictionary else None)
+
+    if py_vncorenlp is None:
+        raise ImportError(
+            "py_vncorenlp is not installed (pip install py_vncorenlp); "
+            "or use --segmenter python"
+        )
+    vncorenlp_dir = resolve_vncorenlp_dir(base_dir, args.vncorenlp_dir, args.jar_path)
+    validate_vncorenlp_dir(vncorenlp_dir)
+    return py_vncorenlp.VnCoreNLP(
+        save_dir=get_segmenter_save_dir(vncorenlp_dir),
+        annotators=["wseg"],
+    )
+
+
 def load_intent_examples(file_path: Path) -> tuple[str | None, list[str]]:
     with file_path.open("r", encoding="utf-8-sig") as file_obj:
         payload = json.load(file_obj)
@@ -157,7 +214,7 @@ def load_intent_examples(file_path: Path) -> tuple[str | None, list[str]]:
     return intent_name.strip(), cleaned_sentences
 
 
-def segment_text(segmenter: py_vncorenlp.VnCoreNLP, text: str) -> str:
+def segment_text(segmenter: Segmenter, text: str) -> str:
     segmented_sentences = segmenter.word_segment(text)
     return " ".join(part.strip() for part in segmented_sentences if part.strip())
 
@@ -177,7 +234,7 @@ def dedupe_rows(rows: Iterable[dict[str, str]]) -> list[dict[str, str]]:
 
 
 def build_intent_rows(
-    json_files: Iterable[Path], segmenter: py_vncorenlp.VnCoreNLP
+    json_files: Iterable[Path], segmenter: Segmenter
 ) -> tuple[list[dict[str, str]], int, int]:
     rows: list[dict[str, str]] = []
     files_read = 0
@@ -228,17 +285,9 @@ def run(
     try:
         input_dir = resolve_path(base_dir, args.input_dir)
         output_file = resolve_path(base_dir, args.output_file)
-        vncorenlp_dir = resolve_vncorenlp_dir(
-            base_dir, args.vncorenlp_dir, args.jar_path
-        )
 
         json_files = validate_input_dir(input_dir)
-        validate_vncorenlp_dir(vncorenlp_dir)
-
-        segmenter = py_vncorenlp.VnCoreNLP(
-            save_dir=get_segmenter_save_dir(vncorenlp_dir),
-            annotators=["wseg"],
-        )
+        segmenter = create_segmenter(base_dir, args)
         rows, files_read, sentences_processed = build_intent_rows(
             json_files, segmenter
         )
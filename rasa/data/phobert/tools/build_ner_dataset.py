@@ -8,15 +8,13 @@ from collections import Counter
 from pathlib import Path
 from typing import Iterable
 
-import py_vncorenlp
-
 from build_intent_train import (
     DEFAULT_VNCORENLP_DIR,
+    Segmenter,
+    add_segmenter_args,
     configure_console_utf8,
-    get_segmenter_save_dir,
+    create_segmenter,
     resolve_path,
-    resolve_vncorenlp_dir,
-    validate_vncorenlp_dir,
 )
 
 
@@ -60,6 +58,7 @@ def parse_args() -> argparse.Namespace:
             "If provided, its parent directory is used as the VnCoreNLP resource directory."
         ),
     )
+    add_segmenter_args(parser)
     return parser.parse_args()
 
 
@@ -154,7 +153,7 @@ def extract_entities(
 
 
 def segment_text(
-    segmenter: py_vncorenlp.VnCoreNLP, clean_text: str
+    segmenter: Segmenter, clean_text: str
 ) -> list[str]:
     segmented_sentences = segmenter.word_segment(clean_text)
     words: list[str] = []
@@ -217,7 +216,7 @@ def write_output(rows: list[tuple[list[str], list[str]]], output_file: Path) ->
 def build_split(
     input_dir: Path,
     output_file: Path,
-    segmenter: py_vncorenlp.VnCoreNLP,
+    segmenter: Segmenter,
 ) -> tuple[int, Counter[str], int]:
     json_files = validate_input_dir(input_dir)
     rows: list[tuple[list[str], list[str]]] = []
@@ -252,7 +251,7 @@ def build_split(
 def run_build(
     input_dir: Path,
     output_file: Path,
-    segmenter: py_vncorenlp.VnCoreNLP,
+    segmenter: Segmenter,
     label: str,
 ) -> None:
     row_count, counts, duplicate_count = build_split(input_dir, output_file, segmenter)
@@ -270,14 +269,7 @@ def main() -> int:
     base_dir = Path(__file__).resolve().parent
 
     try:
-        vncorenlp_dir = resolve_vncorenlp_dir(
-            base_dir, args.vncorenlp_dir, args.jar_path
-        )
-        validate_vncorenlp_dir(vncorenlp_dir)
-        segmenter = py_vncorenlp.VnCoreNLP(
-            save_dir=get_segmenter_save_dir(vncorenlp_dir),
-            annotators=["wseg"],
-        )
+        segmenter = create_segmenter(base_dir, args)
 
         if bool(args.input_dir) != bool(args.output_file):
             raise ValueError(
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+from build_intent_train import configure_console_utf8, resolve_path
+
+RASA_DIR = Path(__file__).resolve().parents[3]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.word_segmenter import (  # noqa: E402
+    normalize_tones,
+    read_dictionary,
+)
+
+
+# Train splits only: the validate splits stay held out to measure how the
+# list covers text it was not built from (see tests/test_word_segmenter.py).
+DEFAULT_CORPORA = [
+    Path("../train/intent_train.json"),
+    Path("../train/ner_train.txt"),
+]
+DEFAULT_OUTPUT_FILE = Path("../train/segmenter_words.txt")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Build the word list of the in-process segmenter from VnCoreNLP-segmented "
+            "corpora (intent JSON and BIO files) plus optional extra vocabularies."
+        )
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        default=None,
+        help=(
+            "Segmented intent JSON or BIO file relative to this script. Can be repeated. "
+            "Default: the intent and NER train files under ../train"
+        ),
+    )
+    parser.add_argument(
+        "--vocab-file",
+        action="append",
+        default=[],
+        help="Extra word list (one word per line) added as-is. Can be repeated.",
+    )
+    parser.add_argument(
+        "--output-file",
+        default=str(DEFAULT_OUTPUT_FILE),
+        help=f"Output word list relative to this script. Default: {DEFAULT_OUTPUT_FILE}",
+    )
+    return parser.parse_args()
+
+
+def read_corpus(path: Path) -> list[list[str]]:
+    """Segmented sentences of ``path`` as lists of words."""
+    if path.suffix == ".json":
+        with path.open("r", encoding="utf-8-sig") as file_obj:
+            rows = json.load(file_obj)
+        return [row["text"].split() for row in rows if isinstance(row.get("text"), str)]
+
+    sentences: list[list[str]] = []
+    words: list[str] = []
+    with path.open("r", encoding="utf-8") as file_obj:
+        for line in file_obj:
+            parts = line.split()
+            if parts:
+                words.append(parts[0])
+            elif words:
+                sentences.append(words)
+                words = []
+    if words:
+        sentences.append(words)
+    return sentences
+
+
+def count_words(
+    sentences: Iterable[list[str]],
+) -> tuple[Counter[tuple[str, ...]], Counter[tuple[str, ...]]]:
+    """Times each multi-syllable word was joined, and times its syllables were not."""
+    sentences = [
+        [normalize_tones(word).lower().split("_") for word in words]
+        for words in sentences
+    ]
+    joined: Counter[tuple[str, ...]] = Counter()
+    for words in sentences:
+        joined.update(tuple(word) for word in words if len(word) > 1)
+
+    longest = max((len(word) for word in joined), default=0)
+    split: Counter[tuple[str, ...]] = Counter()
+    for words in sentences:
+        syllables = [syllable for word in words for syllable in word]
+        boundaries = {0}
+        position = 0
+        for word in words:
+            position += len(word)
+            boundaries.add(position)
+        for start in range(len(syllables)):
+            for end in range(start + 2, min(len(syllables), start + longest) + 1):
+                span = tuple(syllables[start:end])
+                if span not in joined:
+                    continue
+                # Counted unless this exact span is one segmented word.
+                inner = any(index in boundaries for index in range(start + 1, end))
+                if inner or start not in boundaries or end not in boundaries:
+                    split[span] += 1
+    return joined, split
+
+
+def build_words(corpora: list[Path], vocab_files: list[Path]) -> list[str]:
+    sentences = [words for path in corpora for words in read_corpus(path)]
+    joined, split = count_words(sentences)
+    words = {"_".join(word) for word, count in joined.items() if count >= split[word]}
+    for path in vocab_files:
+        words.update(
+            "_".join(normalize_tones(word).lower().replace("_", " ").split())
+            for word in read_dictionary(str(path))
+        )
+    return sorted(word for word in words if "_" in word)
+
+
+def write_output(words: list[str], output_file: Path) -> None:
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with output_file.open("w", encoding="utf-8") as file_obj:
+        file_obj.write("# Generated by tools/build_segmenter_dict.py; one word per line.\n")
+        for word in words:
+            file_obj.write(f"{word}\n")
+
+
+def main() -> int:
+    configure_console_utf8()
+    args = parse_args()
+    base_dir = Path(__file__).resolve().parent
+
+    try:
+        corpora = [
+            resolve_path(base_dir, raw_path)
+            for raw_path in (args.corpus or [str(path) for path in DEFAULT_CORPORA])
+        ]
+        vocab_files = [resolve_path(base_dir, raw_path) for raw_path in args.vocab_file]
+        for path in corpora + vocab_files:
+            if not path.is_file():
+                raise FileNotFoundError(f"Input file does not exist: {path}")
+        output_file = resolve_path(base_dir, args.output_file)
+
+        words = build_words(corpora, vocab_files)
+        write_output(words, output_file)
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    print(f"Corpora read: {len(corpora)}")
+    print(f"Words written: {len(words)}")
+    print(f"Output file: {output_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+from safetensors.torch import save_file
+
+RASA_DIR = Path(__file__).resolve().parents[3]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.model_memory import SAFETENSORS_FILE  # noqa: E402
+from custom_components.phobert_backend import (  # noqa: E402
+    JOINT_CLASSIFICATION,
+    SEQUENCE_CLASSIFICATION,
+    TOKEN_CLASSIFICATION,
+    TorchBackend,
+)
+
+
+DEFAULT_MODEL_ROOT = Path("../../model")
+MODEL_SPECS = {
+    "intent": ("intent_model", SEQUENCE_CLASSIFICATION),
+    "ner": ("ner_model", TOKEN_CLASSIFICATION),
+    "joint": ("joint_model", JOINT_CLASSIFICATION),
+}
+DEFAULT_MODELS = ["intent", "ner"]
+PYTORCH_WEIGHTS = "pytorch_model.bin"
+# <s> a few unknown-word ids </s>: only the logits matter, not the text.
+CHECK_INPUT = [[0, 3, 3, 3, 3, 2]]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            f"Store each PhoBERT model as {SAFETENSORS_FILE} so the components can "
+            "memory-map it and Rasa workers share one copy of the weights. Converts "
+            f"{PYTORCH_WEIGHTS} when needed, then checks the mapped model gives the "
+            "same logits as a regular load."
+        )
+    )
+    parser.add_argument(
+        "--model-root",
+        default=str(DEFAULT_MODEL_ROOT),
+        help=f"Directory holding intent_model/ and ner_model/. Default: {DEFAULT_MODEL_ROOT}",
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        choices=sorted(MODEL_SPECS),
+        default=DEFAULT_MODELS,
+        help="Which models to convert. Default: intent ner.",
+    )
+    parser.add_argument(
+        "--remove-bin",
+        action="store_true",
+        help=f"Delete {PYTORCH_WEIGHTS} once the converted file has been checked.",
+    )
+    return parser.parse_args()
+
+
+def resolve_path(base_dir: Path, raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path.resolve()
+    return (base_dir / path).resolve()
+
+
+def write_safetensors(model_dir: Path) -> None:
+    state_dict = torch.load(model_dir / PYTORCH_WEIGHTS, map_location="cpu", weights_only=True)
+    # safetensors refuses aliased tensors; every entry gets its own buffer.
+    tensors = {name: tensor.detach().clone().contiguous() for name, tensor in state_dict.items()}
+    save_file(tensors, str(model_dir / SAFETENSORS_FILE), metadata={"format": "pt"})
+
+
+def _logits(backend: TorchBackend) -> list[np.ndarray]:
+    input_ids = np.asarray(CHECK_INPUT, dtype=np.int64)
+    outputs = backend.run(input_ids, np.ones_like(input_ids))
+    return list(outputs) if isinstance(outputs, tuple) else [outputs]
+
+
+def convert_model(model_dir: Path, task: str, remove_bin: bool) -> dict:
+    weights = model_dir / SAFETENSORS_FILE
+    converted = False
+    if not weights.is_file():
+        if not (model_dir / PYTORCH_WEIGHTS).is_file():
+            raise FileNotFoundError(f"No {SAFETENSORS_FILE} or {PYTORCH_WEIGHTS} in {model_dir}")
+        write_safetensors(model_dir)
+        converted = True
+
+    config = {"device": "cpu", "warmup": False}
+    mapped = TorchBackend(str(model_dir), task, {**config, "mmap_weights": True})
+    if mapped.weights_path is None:
+        raise ValueError(
+            f"{weights} does not match the model's parameter names, so it cannot be "
+            "memory-mapped. Re-save the model with save_pretrained."
+        )
+    copied = TorchBackend(str(model_dir), task, {**config, "mmap_weights": False})
+    max_diff = max(
+        float(np.abs(a - b).max()) for a, b in zip(_logits(mapped), _logits(copied))
+    )
+    if max_diff > 1e-5:
+        raise ValueError(f"Mapped and regular loads of {model_dir} differ by {max_diff}")
+
+    removed = False
+    if remove_bin and (model_dir / PYTORCH_WEIGHTS).is_file():
+        (model_dir / PYTORCH_WEIGHTS).unlink()
+        removed = True
+    return {
+        "model_dir": str(model_dir),
+        "converted": converted,
+        "size_mb": round(weights.stat().st_size / 2**20, 1),
+        "max_logit_diff": max_diff,
+        "removed_bin": removed,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    base_dir = Path(__file__).resolve().parent
+    model_root = resolve_path(base_dir, args.model_root)
+
+    try:
+        for name in args.models:
+            dir_name, task = MODEL_SPECS[name]
+            model_dir = model_root / dir_name
+            if not model_dir.is_dir():
+                raise FileNotFoundError(f"Model directory does not exist: {model_dir}")
+            result = convert_model(model_dir, task, args.remove_bin)
+            print(json.dumps({"model": name, **result}))
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from transformers import AutoTokenizer
+
+from build_segmenter_dict import read_corpus
+
+RASA_DIR = Path(__file__).resolve().parents[3]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.phobert_tokenizer import (  # noqa: E402
+    FAST_TOKENIZER_FILE,
+    PhobertTokenizerFast,
+    convert_slow_tokenizer,
+)
+
+
+DEFAULT_MODEL_ROOT = Path("../../model")
+MODEL_DIRS = {
+    "intent": "intent_model",
+    "ner": "ner_model",
+    "joint": "joint_model",
+}
+DEFAULT_MODELS = ["intent", "ner"]
+DEFAULT_CORPORA = [
+    Path("../train/intent_train.json"),
+    Path("../train/intent_validate.json"),
+    Path("../train/ner_train.txt"),
+    Path("../train/ner_validate.txt"),
+]
+MAX_LENGTH = 256
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Convert the slow PhoBERT BPE tokenizer (vocab.txt + bpe.codes) of each model "
+            f"to a Rust tokenizers file ({FAST_TOKENIZER_FILE}), after checking both give "
+            "identical ids on the training corpora. <model>_int8 directories are "
+            "converted too when present."
+        )
+    )
+    parser.add_argument(
+        "--model-root",
+        default=str(DEFAULT_MODEL_ROOT),
+        help=f"Directory holding intent_model/ and ner_model/. Default: {DEFAULT_MODEL_ROOT}",
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        choices=sorted(MODEL_DIRS),
+        default=DEFAULT_MODELS,
+        help="Which models to convert. Default: intent ner.",
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        default=None,
+        help=(
+            "Segmented intent JSON or BIO file used for the parity check, relative to "
+            "this script. Can be repeated. Default: the intent and NER train/validate files"
+        ),
+    )
+    return parser.parse_args()
+
+
+def resolve_path(base_dir: Path, raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path.resolve()
+    return (base_dir / path).resolve()
+
+
+def parity_mismatches(slow, fast, sentences: list[list[str]]) -> list[str]:
+    """Sentences whose ids differ between the tokenizers, as the components encode them."""
+    mismatches = []
+    texts = [" ".join(words) for words in sentences]
+    slow_ids = [slow(text, max_length=MAX_LENGTH, truncation=True)["input_ids"] for text in texts]
+    fast_ids = fast(texts, max_length=MAX_LENGTH, truncation=True)["input_ids"]
+    for text, words, want, got in zip(texts, sentences, slow_ids, fast_ids):
+        if want != got:
+            mismatches.append(text)
+            continue
+        # Word-aligned encoding used by the NER and joint components.
+        want_words = [slow.encode(word, add_special_tokens=False) for word in words]
+        encoding = fast(words, is_split_into_words=True, add_special_tokens=False)
+        got_words: list[list[int]] = [[] for _ in words]
+        for token_id, word_id in zip(encoding["input_ids"], encoding.word_ids()):
+            got_words[word_id].append(token_id)
+        if want_words != got_words:
+            mismatches.append(text)
+    return mismatches
+
+
+def convert_model(model_dir: Path, sentences: list[list[str]]) -> dict:
+    slow = AutoTokenizer.from_pretrained(str(model_dir), use_fast=False)
+    converted = convert_slow_tokenizer(slow)
+    serialized = converted.to_str()
+    fast = PhobertTokenizerFast(tokenizer_object=converted)
+    mismatches = parity_mismatches(slow, fast, sentences)
+    if mismatches:
+        raise ValueError(
+            f"Fast tokenizer of {model_dir} differs on {len(mismatches)} sentences, "
+            f"e.g. {mismatches[:3]}"
+        )
+
+    texts = [" ".join(words) for words in sentences]
+    start = time.perf_counter()
+    for text in texts:
+        slow(text)
+    slow_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    fast(texts)
+    fast_seconds = time.perf_counter() - start
+
+    output_file = model_dir / FAST_TOKENIZER_FILE
+    output_file.write_text(serialized, encoding="utf-8")
+    return {
+        "output": str(output_file),
+        "sentences_checked": len(sentences),
+        "slow_ms": round(slow_seconds * 1000, 1),
+        "fast_ms": round(fast_seconds * 1000, 1),
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    base_dir = Path(__file__).resolve().parent
+    model_root = resolve_path(base_dir, args.model_root)
+
+    try:
+        corpora = [
+            resolve_path(base_dir, raw_path)
+            for raw_path in (args.corpus or [str(path) for path in DEFAULT_CORPORA])
+        ]
+        sentences = [words for path in corpora for words in read_corpus(path)]
+        for name in args.models:
+            model_dir = model_root / MODEL_DIRS[name]
+            if not model_dir.is_dir():
+                raise FileNotFoundError(f"Model directory does not exist: {model_dir}")
+
+            for target in (model_dir, model_dir.with_name(model_dir.name + "_int8")):
+                if target.is_dir():
+                    result = convert_model(target, sentences)
+                    print(json.dumps({"model": name, **result}))
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import argparse
+import inspect
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+from transformers import (
+    AutoModelForSequenceClassification,
+    AutoModelForTokenClassification,
+    AutoTokenizer,
+)
+
+RASA_DIR = Path(__file__).resolve().parents[3]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.joint_model import PhobertJointModel  # noqa: E402
+
+
+DEFAULT_MODEL_ROOT = Path("../../model")
+ONNX_FILE_NAME = "model.onnx"
+SEQUENCE_AXES = {0: "batch"}
+TOKEN_AXES = {0: "batch", 1: "sequence"}
+# name -> (directory, model class, {output name: dynamic axes})
+MODEL_SPECS = {
+    "intent": ("intent_model", AutoModelForSequenceClassification, {"logits": SEQUENCE_AXES}),
+    "ner": ("ner_model", AutoModelForTokenClassification, {"logits": TOKEN_AXES}),
+    "joint": (
+        "joint_model",
+        PhobertJointModel,
+        {"intent_logits": SEQUENCE_AXES, "ner_logits": TOKEN_AXES},
+    ),
+}
+DEFAULT_MODELS = ["intent", "ner"]
+SAMPLE_TEXTS = [
+    "xin chào",
+    "tạo task họp team ngày_mai 9h",
+    "chi 50k ăn trưa hôm_nay",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Export the fine-tuned PhoBERT intent, NER (and joint) models to ONNX graphs "
+            "with dynamic batch and sequence axes (writes model.onnx into each "
+            "model directory)."
+        )
+    )
+    parser.add_argument(
+        "--model-root",
+        default=str(DEFAULT_MODEL_ROOT),
+        help=f"Directory holding intent_model/ and ner_model/. Default: {DEFAULT_MODEL_ROOT}",
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        choices=sorted(MODEL_SPECS),
+        default=DEFAULT_MODELS,
+        help="Which models to export. Default: intent ner.",
+    )
+    parser.add_argument(
+        "--opset",
+        type=int,
+        default=17,
+        help="ONNX opset version. Default: 17",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1e-3,
+        help="Maximum absolute logit difference accepted when verifying the export.",
+    )
+    return parser.parse_args()
+
+
+def configure_console_utf8() -> None:
+    for stream_name in ("stdout", "stderr"):
+        stream = getattr(sys, stream_name, None)
+        if hasattr(stream, "reconfigure"):
+            try:
+                stream.reconfigure(encoding="utf-8")
+            except Exception:
+                pass
+
+
+def resolve_path(base_dir: Path, raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path.resolve()
+    return (base_dir / path).resolve()
+
+
+def export_model(
+    model_dir: Path, model_cls, output_axes: dict[str, dict[int, str]], opset: int
+) -> Path:
+    model = model_cls.from_pretrained(model_dir)
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    sample = tokenizer(SAMPLE_TEXTS, padding=True, return_tensors="pt")
+
+    output_path = model_dir / ONNX_FILE_NAME
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "sequence"},
+        "attention_mask": {0: "batch", 1: "sequence"},
+        **output_axes,
+    }
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # Newer torch defaults to the dynamo exporter; dynamic_axes belongs to
+        # the TorchScript one.
+        export_kwargs["dynamo"] = False
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            str(output_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=list(output_axes),
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **export_kwargs,
+        )
+    return output_path
+
+
+def verify_export(
+    model_dir: Path, model_cls, output_names: list[str], onnx_path: Path
+) -> float:
+    import onnxruntime as ort
+
+    model = model_cls.from_pretrained(model_dir)
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    session = ort.InferenceSession(str(onnx_path), providers=["CPUExecutionProvider"])
+
+    # Use a different batch size than the export sample to exercise dynamic axes.
+    sample = tokenizer(SAMPLE_TEXTS[:2], padding=True, return_tensors="pt")
+    with torch.no_grad():
+        outputs = model(
+            input_ids=sample["input_ids"], attention_mask=sample["attention_mask"]
+        )
+    expected = [outputs[name].numpy() for name in output_names]
+    actual = session.run(
+        output_names,
+        {
+            "input_ids": sample["input_ids"].numpy().astype(np.int64),
+            "attention_mask": sample["attention_mask"].numpy().astype(np.int64),
+        },
+    )
+    return max(float(np.abs(want - got).max()) for want, got in zip(expected, actual))
+
+
+def main() -> int:
+    configure_console_utf8()
+    args = parse_args()
+    base_dir = Path(__file__).resolve().parent
+    model_root = resolve_path(base_dir, args.model_root)
+
+    try:
+        for name in args.models:
+            dir_name, model_cls, output_axes = MODEL_SPECS[name]
+            model_dir = model_root / dir_name
+            if not model_dir.is_dir():
+                raise FileNotFoundError(f"Model directory does not exist: {model_dir}")
+
+            onnx_path = export_model(model_dir, model_cls, output_axes, args.opset)
+            max_diff = verify_export(model_dir, model_cls, list(output_axes), onnx_path)
+            print(json.dumps({"model": name, "output": str(onnx_path), "max_abs_diff": max_diff}))
+            if max_diff > args.tolerance:
+                raise ValueError(
+                    f"ONNX export for {name} differs from torch by {max_diff:.2e} "
+                    f"(tolerance {args.tolerance:.0e})."
+                )
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+from pathlib import Path
+
+RASA_DIR = Path(__file__).resolve().parents[3]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.model_registry import (  # noqa: E402
+    MANIFEST_FILE,
+    VERSIONS_DIR,
+    activate,
+    active_version,
+    list_versions,
+    read_history,
+    read_manifest,
+    rollback,
+    version_dir,
+    write_manifest,
+)
+from custom_components.phobert_backend import QUANTIZED_SUFFIX  # noqa: E402
+
+
+DEFAULT_MODEL_ROOT = Path("../../model")
+MODEL_DIRS = {
+    "intent": "intent_model",
+    "ner": "ner_model",
+    "joint": "joint_model",
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Publish, activate and roll back versions of a PhoBERT model. Running "
+            "components load the version named in <model>/ACTIVE in the background "
+            "and swap it in (see model_watch_interval in config.yml)."
+        )
+    )
+    parser.add_argument(
+        "--model-root",
+        default=str(DEFAULT_MODEL_ROOT),
+        help=f"Directory holding intent_model/, ner_model/, joint_model/. Default: {DEFAULT_MODEL_ROOT}",
+    )
+    parser.add_argument(
+        "--model",
+        choices=sorted(MODEL_DIRS),
+        default="intent",
+        help="Which model to manage. Default: intent.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish = commands.add_parser(
+        "publish",
+        help=f"Copy a trained model into {VERSIONS_DIR}/<version> and write its {MANIFEST_FILE}.",
+    )
+    publish.add_argument("source", help="Trained model directory (a <source>_int8 copy is published too).")
+    publish.add_argument("version", help="Version name, e.g. 2024-06-01 or v3.")
+    publish.add_argument(
+        "--metrics",
+        default=None,
+        help="JSON file with evaluation metrics to record in the manifest.",
+    )
+    publish.add_argument(
+        "--activate",
+        action="store_true",
+        help="Activate the version once it is published.",
+    )
+
+    activate_cmd = commands.add_parser("activate", help="Serve a published version.")
+    activate_cmd.add_argument("version")
+    commands.add_parser("rollback", help="Serve the previously active version again.")
+    commands.add_parser("list", help="Show published versions and the active one.")
+    return parser.parse_args()
+
+
+def resolve_path(base_dir: Path, raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path.resolve()
+    return (base_dir / path).resolve()
+
+
+def read_labels(model_dir: Path) -> dict[str, dict[int, str]]:
+    """Label maps the model was trained with, keyed by task."""
+    labels: dict[str, dict[int, str]] = {}
+    intent_labels = model_dir / "intent_labels.json"
+    if intent_labels.is_file():
+        with intent_labels.open("r", encoding="utf-8-sig") as f:
+            labels["intent"] = {int(key): value for key, value in json.load(f).items()}
+
+    with (model_dir / "config.json").open("r", encoding="utf-8") as f:
+        config = json.load(f)
+    if "intent_id2label" in config:
+        labels["intent"] = {int(key): value for key, value in config["intent_id2label"].items()}
+        labels["ner"] = {int(key): value for key, value in config["ner_id2label"].items()}
+    elif "intent" not in labels and "id2label" in config:
+        labels["ner"] = {int(key): value for key, value in config["id2label"].items()}
+    return labels
+
+
+def publish_version(
+    root: Path, source: Path, version: str, metrics: dict | None
+) -> list[dict]:
+    if not (source / "config.json").is_file():
+        raise FileNotFoundError(f"Not a model directory (no config.json): {source}")
+    if version.endswith(QUANTIZED_SUFFIX):
+        raise ValueError(f"Version names cannot end with {QUANTIZED_SUFFIX}")
+
+    published = []
+    copies = [(source, version)]
+    quantized = source.with_name(source.name + QUANTIZED_SUFFIX)
+    if quantized.is_dir():
+        copies.append((quantized, version + QUANTIZED_SUFFIX))
+    for src, name in copies:
+        target = Path(version_dir(str(root), name))
+        if target.exists():
+            raise FileExistsError(f"Version already published: {target}")
+        # Copy under a temporary name so a watcher never sees half a version.
+        staging = target.with_name(f".{name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(src, staging)
+        manifest = write_manifest(
+            str(staging), name, read_labels(staging), metrics, source=str(src)
+        )
+        staging.rename(target)
+        published.append(
+            {
+                "version": name,
+                "path": str(target),
+                "fingerprint": manifest["fingerprint"],
+                "labels": {task: len(id2label) for task, id2label in manifest["labels"].items()},
+            }
+        )
+    return published
+
+
+def describe_versions(root: Path) -> dict:
+    versions = []
+    for name in list_versions(str(root)):
+        manifest = read_manifest(version_dir(str(root), name)) or {}
+        versions.append(
+            {
+                "version": name,
+                "created_at": manifest.get("created_at"),
+                "fingerprint": str(manifest.get("fingerprint"))[:12],
+                "metrics": manifest.get("metrics", {}),
+            }
+        )
+    return {
+        "active": active_version(str(root)),
+        "history": read_history(str(root)),
+        "versions": versions,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    base_dir = Path(__file__).resolve().parent
+    root = resolve_path(base_dir, args.model_root) / MODEL_DIRS[args.model]
+
+    try:
+        if args.command == "publish":
+            metrics = None
+            if args.metrics:
+                with resolve_path(Path.cwd(), args.metrics).open("r", encoding="utf-8") as f:
+                    metrics = json.load(f)
+            source = resolve_path(Path.cwd(), args.source)
+            root.mkdir(parents=True, exist_ok=True)
+            for result in publish_version(root, source, args.version, metrics):
+                print(json.dumps({"model": args.model, "published": result}))
+            if args.activate:
+                activate(str(root), args.version)
+                print(json.dumps({"model": args.model, "active": args.version}))
+        elif args.command == "activate":
+            activate(str(root), args.version)
+            print(json.dumps({"model": args.model, "active": args.version}))
+        elif args.command == "rollback":
+            print(json.dumps({"model": args.model, "active": rollback(str(root))}))
+        else:
+            print(json.dumps({"model": args.model, **describe_versions(root)}, indent=2))
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
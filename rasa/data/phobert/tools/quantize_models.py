@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import torch
+from transformers import (
+    AutoModelForSequenceClassification,
+    AutoModelForTokenClassification,
+    AutoTokenizer,
+)
+
+TOOLS_DIR = Path(__file__).resolve().parent
+PHOBERT_DIR = TOOLS_DIR.parent
+RASA_DIR = PHOBERT_DIR.parent.parent
+for import_dir in (RASA_DIR, PHOBERT_DIR / "intent"):
+    if str(import_dir) not in sys.path:
+        sys.path.insert(0, str(import_dir))
+
+import test_intent  # noqa: E402
+from custom_components.phobert_backend import (  # noqa: E402
+    ONNX_FILE_NAME,
+    QUANTIZED_SUFFIX,
+    QUANTIZED_WEIGHTS_NAME,
+    SEQUENCE_CLASSIFICATION,
+    TOKEN_CLASSIFICATION,
+    OnnxBackend,
+    TorchBackend,
+)
+
+
+DEFAULT_MODEL_ROOT = Path("../../model")
+DEFAULT_NER_VALIDATE = Path("../train/ner_validate.txt")
+REPORT_FILE_NAME = "quantization_report.json"
+# Full-precision weights are replaced by quantized_model.pt / the int8 graph.
+WEIGHT_FILE_SUFFIXES = (".safetensors", ".bin", ".pt", ".onnx")
+MODEL_SPECS = {
+    "intent": ("intent_model", AutoModelForSequenceClassification, SEQUENCE_CLASSIFICATION),
+    "ner": ("ner_model", AutoModelForTokenClassification, TOKEN_CLASSIFICATION),
+}
+BATCH_SIZE = 32
+MAX_LENGTH = 256
+
+RunFn = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Quantize the PhoBERT intent and NER models to int8 (dynamic "
+            "quantization of the linear layers) and publish them next to the "
+            "fp32 models as <model>_int8/, unless accuracy drops too much."
+        )
+    )
+    parser.add_argument(
+        "--model-root",
+        default=str(DEFAULT_MODEL_ROOT),
+        help=f"Directory holding intent_model/ and ner_model/. Default: {DEFAULT_MODEL_ROOT}",
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        choices=sorted(MODEL_SPECS),
+        default=sorted(MODEL_SPECS),
+        help="Which models to quantize. Default: both.",
+    )
+    parser.add_argument(
+        "--ner-validate",
+        default=str(DEFAULT_NER_VALIDATE),
+        help=f"CoNLL-style NER validation split. Default: {DEFAULT_NER_VALIDATE}",
+    )
+    parser.add_argument(
+        "--examples-per-intent",
+        type=int,
+        default=3,
+        help="Samples read from each intent_examples/*.json file on top of the basic cases.",
+    )
+    parser.add_argument(
+        "--max-accuracy-drop",
+        type=float,
+        default=0.01,
+        help=(
+            "Refuse to publish when intent accuracy or NER entity F1 drops by more "
+            "than this (absolute). Default: 0.01"
+        ),
+    )
+    return parser.parse_args()
+
+
+def configure_console_utf8() -> None:
+    for stream_name in ("stdout", "stderr"):
+        stream = getattr(sys, stream_name, None)
+        if hasattr(stream, "reconfigure"):
+            try:
+                stream.reconfigure(encoding="utf-8")
+            except Exception:
+                pass
+
+
+def resolve_path(base_dir: Path, raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path.resolve()
+    return (base_dir / path).resolve()
+
+
+def torch_runner(model) -> RunFn:
+    def run(input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            outputs = model(
+                input_ids=torch.as_tensor(input_ids, dtype=torch.long),
+                attention_mask=torch.as_tensor(attention_mask, dtype=torch.long),
+            )
+        return outputs.logits.float().numpy()
+
+    return run
+
+
+def load_intent_cases(examples_per_intent: int, id2label: dict[int, str]) -> list:
+    _, examples_dir, intent_map_file = test_intent.resolve_paths()
+    expected_intents = test_intent.load_expected_intents(intent_map_file, id2label)
+    cases = [
+        *test_intent.build_basic_cases(expected_intents),
+        *test_intent.load_example_cases(examples_dir, examples_per_intent),
+    ]
+    known = set(id2label.values())
+    return [case for case in test_intent.dedupe_cases(cases) if case.expected_intent in known]
+
+
+def evaluate_intent(run: RunFn, tokenizer, id2label: dict[int, str], cases: list) -> float:
+    if not cases:
+        raise ValueError("No intent test cases found.")
+
+    correct = 0
+    for start in range(0, len(cases), BATCH_SIZE):
+        batch = cases[start : start + BATCH_SIZE]
+        inputs = tokenizer(
+            [case.text for case in batch],
+            max_length=MAX_LENGTH,
+            truncation=True,
+            padding=True,
+            return_tensors="np",
+        )
+        predictions = run(inputs["input_ids"], inputs["attention_mask"]).argmax(axis=-1)
+        correct += sum(
+            id2label[int(pred)] == case.expected_intent
+            for pred, case in zip(predictions, batch)
+        )
+    return correct / len(cases)
+
+
+def load_ner_sentences(path: Path) -> list[tuple[list[str], list[str]]]:
+    sentences: list[tuple[list[str], list[str]]] = []
+    words: list[str] = []
+    labels: list[str] = []
+    with path.open("r", encoding="utf-8-sig") as file_obj:
+        for raw_line in [*file_obj, ""]:
+            parts = raw_line.split()
+            if len(parts) >= 2:
+                words.append(parts[0])
+                labels.append(parts[-1])
+                continue
+            if words:
+                sentences.append((words, labels))
+                words, labels = [], []
+    return sentences
+
+
+def extract_spans(labels: list[str]) -> set[tuple[int, int, str]]:
+    spans: set[tuple[int, int, str]] = set()
+    start, entity_type = None, None
+    for index, label in enumerate([*labels, "O"]):
+        inside = label.startswith("I-") and label[2:] == entity_type
+        if start is not None and not inside:
+            spans.add((start, index, entity_type))
+            start, entity_type = None, None
+        if label.startswith("B-") or (label.startswith("I-") and start is None):
+            start, entity_type = index, label[2:]
+    return spans
+
+
+def encode_words(tokenizer, words: list[str]) -> tuple[list[int], list[int]]:
+    """Mirror PhobertEntityExtractor: one encode per word, label on first subword."""
+    input_ids = [tokenizer.cls_token_id]
+    first_positions: list[int] = []
+    for word in words:
+        word_ids = tokenizer.encode(word, add_special_tokens=False) or [tokenizer.unk_token_id]
+        if len(input_ids) + len(word_ids) >= MAX_LENGTH:
+            break
+        first_positions.append(len(input_ids))
+        input_ids.extend(word_ids)
+    input_ids.append(tokenizer.sep_token_id)
+    return input_ids, first_positions
+
+
+def evaluate_ner(
+    run: RunFn,
+    tokenizer,
+    id2label: dict[int, str],
+    sentences: list[tuple[list[str], list[str]]],
+) -> float:
+    if not sentences:
+        raise ValueError("No NER validation sentences found.")
+
+    true_positive = predicted_total = gold_total = 0
+    for start in range(0, len(sentences), BATCH_SIZE):
+        batch = sentences[start : start + BATCH_SIZE]
+        encoded = [encode_words(tokenizer, words) for words, _ in batch]
+        width = max(len(ids) for ids, _ in encoded)
+        input_ids = np.full((len(batch), width), tokenizer.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+        for row, (ids, _) in enumerate(encoded):
+            input_ids[row, : len(ids)] = ids
+            attention_mask[row, : len(ids)] = 1
+
+        predictions = run(input_ids, attention_mask).argmax(axis=-1)
+        for row, ((_, gold_labels), (_, positions)) in enumerate(zip(batch, encoded)):
+            predicted_labels = [id2label[int(predictions[row, pos])] for pos in positions]
+            predicted_labels.extend(["O"] * (len(gold_labels) - len(predicted_labels)))
+            gold_spans = extract_spans(gold_labels)
+            predicted_spans = extract_spans(predicted_labels)
+            true_positive += len(gold_spans & predicted_spans)
+            predicted_total += len(predicted_spans)
+            gold_total += len(gold_spans)
+
+    if true_positive == 0:
+        return 0.0
+    precision = true_positive / predicted_total
+    recall = true_positive / gold_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def copy_support_files(model_dir: Path, output_dir: Path) -> None:
+    for path in model_dir.iterdir():
+        if path.is_file() and path.suffix not in WEIGHT_FILE_SUFFIXES:
+            shutil.copy2(path, output_dir / path.name)
+
+
+def quantize_torch(model, output_dir: Path) -> None:
+    quantized = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    torch.save(quantized.state_dict(), output_dir / QUANTIZED_WEIGHTS_NAME)
+
+
+def quantize_onnx(model_dir: Path, output_dir: Path) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        str(model_dir / ONNX_FILE_NAME),
+        str(output_dir / ONNX_FILE_NAME),
+        weight_type=QuantType.QInt8,
+    )
+
+
+def publish(staging_dir: Path, target_dir: Path) -> None:
+    """Swap staging_dir into place so readers never see a half-written model."""
+    backup_dir = target_dir.with_name(target_dir.name + ".old")
+    if backup_dir.exists():
+        shutil.rmtree(backup_dir)
+    if target_dir.exists():
+        target_dir.rename(backup_dir)
+    staging_dir.rename(target_dir)
+    if backup_dir.exists():
+        shutil.rmtree(backup_dir)
+
+
+def quantize_model(name: str, model_dir: Path, args: argparse.Namespace) -> dict:
+    _, model_cls, task = MODEL_SPECS[name]
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = model_cls.from_pretrained(model_dir)
+    model.eval()
+
+    if name == "intent":
+        # Same label source as PhobertIntentClassifier.
+        id2label = test_intent.load_id2label(model_dir)
+        cases = load_intent_cases(args.examples_per_intent, id2label)
+        metric_name = "accuracy"
+
+        def evaluate(run: RunFn) -> float:
+            return evaluate_intent(run, tokenizer, id2label, cases)
+    else:
+        id2label = {int(key): value for key, value in model.config.id2label.items()}
+        sentences = load_ner_sentences(args.ner_validate)
+        metric_name = "entity_f1"
+
+        def evaluate(run: RunFn) -> float:
+            return evaluate_ner(run, tokenizer, id2label, sentences)
+
+    report = {
+        "model": name,
+        "metric": metric_name,
+        "max_accuracy_drop": args.max_accuracy_drop,
+        "fp32": evaluate(torch_runner(model)),
+    }
+
+    target_dir = model_dir.with_name(model_dir.name + QUANTIZED_SUFFIX)
+    staging_dir = Path(tempfile.mkdtemp(prefix=f".{target_dir.name}-", dir=model_dir.parent))
+    try:
+        copy_support_files(model_dir, staging_dir)
+        quantize_torch(model, staging_dir)
+        # Load through the same backend the Rasa component uses.
+        report["torch_int8"] = evaluate(TorchBackend(str(staging_dir), task, {}).run)
+
+        if (model_dir / ONNX_FILE_NAME).exists():
+            quantize_onnx(model_dir, staging_dir)
+            report["onnx_int8"] = evaluate(OnnxBackend(str(staging_dir), task, {}).run)
+
+        drops = {
+            key: report["fp32"] - report[key]
+            for key in ("torch_int8", "onnx_int8")
+            if key in report
+        }
+        report["drop"] = drops
+        print(json.dumps(report, ensure_ascii=False))
+
+        failed = {key: drop for key, drop in drops.items() if drop > args.max_accuracy_drop}
+        if failed:
+            details = ", ".join(f"{key} -{drop:.4f}" for key, drop in failed.items())
+            raise ValueError(
+                f"Refusing to publish {target_dir.name}: {metric_name} dropped "
+                f"({details}) beyond --max-accuracy-drop {args.max_accuracy_drop}."
+            )
+
+        with (staging_dir / REPORT_FILE_NAME).open("w", encoding="utf-8") as file_obj:
+            json.dump(report, file_obj, ensure_ascii=False, indent=2)
+        publish(staging_dir, target_dir)
+    finally:
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir)
+
+    report["output"] = str(target_dir)
+    return report
+
+
+def main() -> int:
+    configure_console_utf8()
+    args = parse_args()
+    model_root = resolve_path(TOOLS_DIR, args.model_root)
+    args.ner_validate = resolve_path(TOOLS_DIR, args.ner_validate)
+
+    try:
+        for name in args.models:
+            model_dir = model_root / MODEL_SPECS[name][0]
+            if not model_dir.is_dir():
+                raise FileNotFoundError(f"Model directory does not exist: {model_dir}")
+            report = quantize_model(name, model_dir, args)
+            print(f"Published {report['output']}")
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+RASA_DIR = Path(__file__).resolve().parents[4]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.annotation_cache import AnnotationStore  # noqa: E402
+
+
+class AnnotationStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = str(Path(tmp.name) / "cache" / "annotations.sqlite")
+        self.calls: list[list[str]] = []
+
+    def _predict(self, messages):
+        self.calls.append(list(messages))
+        return [[message, len(message)] for message in messages]
+
+    def _run(self, store, messages):
+        words = [message.split() for message in messages]
+        predictions = store.predict(messages, words, self._predict)
+        store.close()
+        return predictions
+
+    def test_second_run_only_predicts_new_texts(self):
+        first = self._run(AnnotationStore("Ner", "v1", self.path), ["xoá task", "tạo note"])
+        second = self._run(
+            AnnotationStore("Ner", "v1", self.path), ["tạo  note", "xoá task", "đổi tên"]
+        )
+        self.assertEqual(self.calls, [["xoá task", "tạo note"], ["đổi tên"]])
+        self.assertEqual(second, [first[1], first[0], ["đổi tên", 7]])
+
+    def test_new_model_fingerprint_misses(self):
+        self._run(AnnotationStore("Ner", "v1", self.path), ["xoá task"])
+        self._run(AnnotationStore("Intent", "v1", self.path), ["xoá task"])
+        self._run(AnnotationStore("Ner", "v2", self.path), ["xoá task"])
+        self.assertEqual(len(self.calls), 3)
+
+    def test_without_path_always_predicts(self):
+        store = AnnotationStore("Ner", "v1", None)
+        self._run(store, ["xoá task"])
+        self._run(store, ["xoá task"])
+        self.assertEqual(len(self.calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+
+RASA_DIR = Path(__file__).resolve().parents[4]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.bio_decoding import (  # noqa: E402
+    VITERBI,
+    decode,
+    entity_spans,
+    first_subwords,
+)
+
+LABELS = ["O", "B-content", "I-content", "B-amount", "I-amount"]
+
+
+class BioDecodingTest(unittest.TestCase):
+    def test_first_subwords_skips_specials_and_continuations(self):
+        word_ids = [None, 0, 0, 1, 2, 2, 2, None]
+        self.assertEqual(first_subwords(word_ids).tolist(), [1, 3, 4])
+
+    def test_entity_spans_match_loop_decoding(self):
+        labels = ["B-content", "I-content", "O", "I-amount", "I-amount", "B-amount",
+                  "I-content", "B-content", "B-content", "I-content"]
+        # A stray I-amount run starts nothing and I-content ends the amount.
+        self.assertEqual(
+            entity_spans(labels),
+            [(0, 1, "content"), (5, 5, "amount"), (7, 7, "content"), (8, 9, "content")],
+        )
+        self.assertEqual(entity_spans([]), [])
+        self.assertEqual(entity_spans(["O", "O"]), [])
+
+    def test_greedy_takes_best_label_per_word(self):
+        probs = np.array([[0.1, 0.2, 0.6, 0.05, 0.05], [0.7, 0.1, 0.1, 0.05, 0.05]])
+        label_ids, label_probs = decode(probs, LABELS)
+        self.assertEqual(label_ids.tolist(), [2, 0])
+        np.testing.assert_allclose(label_probs, [0.6, 0.7])
+
+    def test_viterbi_never_starts_with_inside_label(self):
+        probs = np.array(
+            [
+                [0.1, 0.35, 0.45, 0.05, 0.05],
+                [0.1, 0.1, 0.7, 0.05, 0.05],
+                [0.1, 0.05, 0.1, 0.05, 0.7],
+            ]
+        )
+        label_ids, _ = decode(probs, LABELS, VITERBI)
+        decoded = [LABELS[index] for index in label_ids]
+        self.assertEqual(decoded[:2], ["B-content", "I-content"])
+        self.assertNotEqual(decoded[2], "I-amount")
+        self.assertEqual(decode(np.zeros((0, 5)), LABELS, VITERBI)[0].tolist(), [])
+
+    def test_unknown_decoder_is_rejected(self):
+        with self.assertRaises(ValueError):
+            decode(np.ones((1, 5)) / 5, LABELS, "beam")
+
+
+if __name__ == "__main__":
+    unittest.main()
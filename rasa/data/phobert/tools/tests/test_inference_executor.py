@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+
+RASA_DIR = Path(__file__).resolve().parents[4]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+try:
+    import numpy as np
+
+    from custom_components.inference_executor import InferenceExecutor
+except ImportError:
+    np = None
+
+
+class _SumBackend:
+    """Token-level "logits": each id times its mask, plus the row's total."""
+
+    def __init__(self) -> None:
+        self.batch_sizes: list[int] = []
+
+    def run(self, input_ids, attention_mask):
+        time.sleep(0.005)
+        self.batch_sizes.append(len(input_ids))
+        masked = input_ids * attention_mask
+        return masked.sum(axis=-1), masked
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class InferenceExecutorTest(unittest.TestCase):
+    ENCODED = [[0, 5, 2], [0, 7, 8, 9, 2], [0, 2], [0, 3, 3, 3, 3, 3, 2]]
+
+    def _check(self, rows):
+        for ids, (total, tokens) in zip(self.ENCODED, rows):
+            self.assertEqual(int(total), sum(ids))
+            self.assertEqual(tokens[: len(ids)].tolist(), ids)
+            self.assertFalse(tokens[len(ids) :].any())
+
+    def test_inline_keeps_input_order(self):
+        backend = _SumBackend()
+        executor = InferenceExecutor(backend, pad_token_id=1, max_batch=3, threaded=False)
+        self._check(executor.run(self.ENCODED))
+        self.assertEqual(backend.batch_sizes, [3, 1])
+
+    def test_concurrent_callers_share_forwards(self):
+        backend = _SumBackend()
+        executor = InferenceExecutor(backend, pad_token_id=1, max_batch=64, max_wait_ms=20)
+        self.addCleanup(executor.close)
+        results: dict[int, list] = {}
+
+        def parse(index: int) -> None:
+            results[index] = executor.run(self.ENCODED)
+
+        threads = [threading.Thread(target=parse, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for rows in results.values():
+            self._check(rows)
+        self.assertEqual(sum(backend.batch_sizes), 8 * len(self.ENCODED))
+        self.assertLess(len(backend.batch_sizes), 8)
+
+    def test_backend_error_reaches_every_caller(self):
+        class _Broken:
+            def run(self, input_ids, attention_mask):
+                raise RuntimeError("boom")
+
+        executor = InferenceExecutor(_Broken(), pad_token_id=1)
+        self.addCleanup(executor.close)
+        with self.assertRaisesRegex(RuntimeError, "boom"):
+            executor.run(self.ENCODED)
+
+
+if __name__ == "__main__":
+    unittest.main()
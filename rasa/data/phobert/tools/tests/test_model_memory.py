@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+RASA_DIR = Path(__file__).resolve().parents[4]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.model_memory import _smaps_fields, mmap_safetensors  # noqa: E402
+
+try:
+    import torch
+    from safetensors.torch import save_file
+except ImportError:
+    torch = None
+
+SMAPS = """\
+7f0000000000-7f0000100000 r--p 00000000 08:01 42    /models/intent_model/model.safetensors
+Rss:                 900 kB
+Shared_Clean:        800 kB
+Private_Clean:       100 kB
+VmFlags: rd mr mw me
+7f0000200000-7f0000300000 rw-p 00000000 00:00 0
+Rss:                 300 kB
+Private_Dirty:       300 kB
+"""
+
+
+class ModelMemoryTest(unittest.TestCase):
+    def test_smaps_fields_for_one_file_and_all_mappings(self):
+        lines = SMAPS.splitlines()
+        weights = _smaps_fields(lines, "/models/intent_model/model.safetensors")
+        self.assertEqual(weights, {"Rss": 900, "Shared_Clean": 800, "Private_Clean": 100})
+        self.assertEqual(_smaps_fields(lines, None)["Rss"], 1200)
+
+    @unittest.skipIf(torch is None, "torch/safetensors not installed")
+    def test_mapped_tensors_match_saved_ones(self):
+        tensors = {
+            "embeddings.weight": torch.randn(7, 4),
+            "classifier.bias": torch.arange(3, dtype=torch.float16),
+            "position_ids": torch.arange(5, dtype=torch.int64).unsqueeze(0),
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "model.safetensors")
+            save_file(tensors, path)
+            mapped = mmap_safetensors(path)
+            self.assertEqual(set(mapped), set(tensors))
+            for name, tensor in tensors.items():
+                self.assertEqual(mapped[name].dtype, tensor.dtype)
+                self.assertTrue(torch.equal(mapped[name], tensor))
+            del mapped
+
+
+if __name__ == "__main__":
+    unittest.main()
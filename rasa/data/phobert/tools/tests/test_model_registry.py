@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+RASA_DIR = Path(__file__).resolve().parents[4]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.model_registry import (  # noqa: E402
+    LoadedModel,
+    ModelSlot,
+    activate,
+    active_version,
+    read_manifest,
+    rollback,
+    version_dir,
+    write_manifest,
+)
+
+
+class _Executor:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _publish(root: Path, version: str, weights: bytes) -> Path:
+    directory = Path(version_dir(str(root), version))
+    directory.mkdir(parents=True)
+    (directory / "model.safetensors").write_bytes(weights)
+    write_manifest(str(directory), version, {"intent": {0: "greet", 1: "goodbye"}})
+    return directory
+
+
+def _fake_load(root: Path):
+    def load(version: str) -> LoadedModel:
+        directory = version_dir(str(root), version)
+        return LoadedModel(
+            version=version,
+            model_dir=directory,
+            tokenizer=None,
+            encoder=None,
+            backend=None,
+            executor=_Executor(),
+            cache=None,
+            annotations=None,
+            manifest=read_manifest(directory),
+            labels={"intent": {0: "greet", 1: "goodbye"}},
+        )
+
+    return load
+
+
+class ModelRegistryTest(unittest.TestCase):
+    def test_activate_and_rollback_follow_history(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for version in ("v1", "v2", "v3"):
+                _publish(root, version, version.encode())
+            self.assertIsNone(active_version(str(root)))
+
+            for version in ("v1", "v2", "v3"):
+                activate(str(root), version)
+            self.assertEqual(rollback(str(root)), "v2")
+            self.assertEqual(rollback(str(root)), "v1")
+            self.assertEqual(active_version(str(root)), "v1")
+            with self.assertRaises(ValueError):
+                rollback(str(root))
+            with self.assertRaises(FileNotFoundError):
+                activate(str(root), "v9")
+
+    def test_slot_swaps_versions_and_keeps_serving_on_bad_weights(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            _publish(root, "v1", b"one")
+            v2 = _publish(root, "v2", b"two")
+            activate(str(root), "v1")
+            slot = ModelSlot("Test", str(root), {"model_watch_interval": 0}, _fake_load(root))
+            first = slot.model
+            self.assertEqual(first.version, "v1")
+
+            activate(str(root), "v2")
+            self.assertTrue(slot.check())
+            self.assertEqual(slot.model.version, "v2")
+            self.assertTrue(first.executor.closed)
+
+            (v2 / "model.safetensors").write_bytes(b"tampered")
+            rollback(str(root))
+            slot.check()
+            activate(str(root), "v2")
+            self.assertFalse(slot.check())
+            self.assertEqual(slot.model.version, "v1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+
+RASA_DIR = Path(__file__).resolve().parents[4]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+try:
+    from rasa.shared.nlu.training_data.message import Message
+
+    from custom_components.phobert_ner import build_entities
+except ImportError:
+    Message = None
+
+
+def _aligned(words, labels, prob=0.9):
+    return [
+        {"word": word, "label": label, "prob": prob}
+        for word, label in zip(words, labels)
+    ]
+
+
+@unittest.skipIf(Message is None, "rasa not installed")
+class BuildEntitiesTest(unittest.TestCase):
+    def test_value_joins_segmented_words(self):
+        message = Message(data={"text": "mua sữa tươi 50k"})
+        aligned = _aligned(["mua", "sữa_tươi", "50k"], ["O", "B-content", "B-amount"])
+        entities = build_entities(aligned, message, "PhobertNER")
+        self.assertEqual(
+            [(e["entity"], e["value"], e["start"], e["end"]) for e in entities],
+            [("content", "sữa tươi", 4, 12), ("amount", "50k", 13, 16)],
+        )
+
+    def test_value_ignores_spacing_in_the_text(self):
+        # Offsets follow the text, the value stays the joined words so that
+        # synonym lookups see the same string as before.
+        message = Message(data={"text": "mua sữa  tươi 50k"})
+        aligned = _aligned(
+            ["mua", "sữa", "tươi", "50k"], ["O", "B-content", "I-content", "O"]
+        )
+        (entity,) = build_entities(aligned, message, "PhobertNER")
+        self.assertEqual(entity["value"], "sữa tươi")
+        self.assertEqual((entity["start"], entity["end"]), (4, 13))
+
+
+if __name__ == "__main__":
+    unittest.main()
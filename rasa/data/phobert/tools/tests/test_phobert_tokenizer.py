@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PHOBERT_DIR = Path(__file__).resolve().parents[2]
+TOOLS_DIR = PHOBERT_DIR / "tools"
+MODEL_DIR = PHOBERT_DIR.parent / "model" / "intent_model"
+for path in (TOOLS_DIR, PHOBERT_DIR.parents[1]):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+try:
+    from transformers import AutoTokenizer, PhobertTokenizer
+
+    from convert_tokenizer import DEFAULT_CORPORA, parity_mismatches
+    from build_segmenter_dict import read_corpus
+    from custom_components.phobert_tokenizer import PhobertTokenizerFast, convert_slow_tokenizer
+except ImportError:
+    PhobertTokenizer = None
+
+# fastBPE codes: "</w>" ends a word. "tas@@" (from "tasx") is merged but
+# missing from the vocab, so the slow tokenizer gives <unk> for it.
+CODES = ["t a", "ta s", "tas k</w>", "n o", "no t", "not e</w>", "x o", "xo á</w>", "c h", "ch i</w>"]
+VOCAB = ["task", "note", "xoá", "chi", "t@@", "ta@@", "n@@", "no@@", "not@@", "x@@", "xo@@",
+         "c@@", "ch@@", "a", "s", "k", "e", "á", "i", "o", "t", "h"]
+
+
+def _sentences(words: list[str], count: int) -> list[list[str]]:
+    chars = sorted(set("".join(words))) + ["_"]
+    rng = random.Random(0)
+    pieces = words + ["".join(rng.choice(chars) for _ in range(rng.randint(1, 6))) for _ in range(200)]
+    return [rng.sample(pieces, rng.randint(1, 8)) for _ in range(count)]
+
+
+@unittest.skipIf(PhobertTokenizer is None, "transformers/tokenizers not installed")
+class FastTokenizerParityTest(unittest.TestCase):
+    def test_converted_vocab_matches_slow_tokenizer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            vocab_file = Path(tmp) / "vocab.txt"
+            codes_file = Path(tmp) / "bpe.codes"
+            vocab_file.write_text("".join(f"{token} 1\n" for token in VOCAB), encoding="utf-8")
+            codes_file.write_text("".join(f"{code} 1\n" for code in CODES), encoding="utf-8")
+            slow = PhobertTokenizer(str(vocab_file), str(codes_file))
+
+        fast = PhobertTokenizerFast(tokenizer_object=convert_slow_tokenizer(slow))
+        sentences = _sentences(["task", "note", "xoá", "chi", "tas", "tasx"], 500)
+        self.assertEqual(parity_mismatches(slow, fast, sentences), [])
+        self.assertIn(slow.unk_token_id, fast.encode("tasx", add_special_tokens=False))
+
+    @unittest.skipUnless((MODEL_DIR / "bpe.codes").is_file(), "PhoBERT intent model not available")
+    def test_training_corpora_parity(self):
+        slow = AutoTokenizer.from_pretrained(str(MODEL_DIR), use_fast=False)
+        fast = PhobertTokenizerFast(tokenizer_object=convert_slow_tokenizer(slow))
+        sentences = [words for path in DEFAULT_CORPORA for words in read_corpus(TOOLS_DIR / path)]
+        self.assertEqual(parity_mismatches(slow, fast, sentences), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+
+RASA_DIR = Path(__file__).resolve().parents[4]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+try:
+    from custom_components.subword_encoding import (
+        MAX_LENGTH,
+        merge_windows,
+        split_windows,
+        truncate,
+        window_starts,
+    )
+except ImportError:
+    split_windows = None
+
+BOS, EOS = 0, 2
+
+
+def _encoding(length: int) -> tuple[list[int], list[int | None]]:
+    """<s> + ``length`` subwords (ids 100..) of two subwords per word + </s>."""
+    input_ids = [BOS] + list(range(100, 100 + length)) + [EOS]
+    word_ids = [None] + [index // 2 for index in range(length)] + [None]
+    return input_ids, word_ids
+
+
+@unittest.skipIf(split_windows is None, "rasa not installed")
+class SlidingWindowTest(unittest.TestCase):
+    def test_short_message_is_one_window(self):
+        input_ids, word_ids = _encoding(10)
+        windows, starts = split_windows(input_ids, word_ids, stride=64)
+        self.assertEqual(windows, [input_ids])
+        self.assertEqual(starts, [0])
+
+    def test_windows_cover_long_message_with_overlap(self):
+        input_ids, word_ids = _encoding(700)
+        windows, starts = split_windows(input_ids, word_ids, stride=64)
+        self.assertTrue(all(len(window) <= MAX_LENGTH for window in windows))
+        self.assertTrue(all(window[0] == BOS and window[-1] == EOS for window in windows))
+        self.assertEqual(starts, window_starts(700, MAX_LENGTH - 2, 64))
+        self.assertEqual(starts[0], 0)
+        self.assertEqual(starts[-1] + MAX_LENGTH - 2, 700)
+        for previous, start in zip(starts, starts[1:]):
+            self.assertGreaterEqual(previous + MAX_LENGTH - 2 - start, 64)
+
+    def test_merge_rebuilds_token_outputs_in_order(self):
+        input_ids, word_ids = _encoding(700)
+        windows, starts = split_windows(input_ids, word_ids, stride=64)
+        # Each window "predicts" its own token ids, so the merged rows must
+        # give back the message's ids; the column marks which window won.
+        rows = [
+            np.stack([np.asarray(window, dtype=float), np.full(len(window), index)], axis=1)
+            for index, window in enumerate(windows)
+        ]
+        merged = merge_windows(rows, starts, len(input_ids))
+        self.assertEqual(merged[:, 0].astype(int).tolist(), input_ids)
+        # Around a window edge the token comes from the window where it has context.
+        boundary = starts[1] + 1
+        self.assertEqual(merged[boundary, 1], 0)
+        self.assertEqual(merged[starts[0] + MAX_LENGTH - 2, 1], 1)
+
+    def test_truncate_keeps_first_window(self):
+        input_ids, word_ids = _encoding(700)
+        truncated_ids, truncated_word_ids = truncate(input_ids, word_ids)
+        self.assertEqual(truncated_ids, split_windows(input_ids, word_ids)[0][0])
+        self.assertEqual(len(truncated_word_ids), MAX_LENGTH)
+        self.assertIsNone(truncated_word_ids[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
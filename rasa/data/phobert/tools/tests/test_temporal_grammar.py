@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+
+RASA_DIR = Path(__file__).resolve().parents[4]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.temporal_grammar import find_all, to_duckling  # noqa: E402
+
+try:
+    from rasa.shared.nlu.training_data.message import Message
+
+    from custom_components.extraction_gate import GRAMMAR_COVERED_ATTRIBUTE
+    from custom_components.temporal_grammar_extractor import (
+        TemporalGrammarExtractor,
+        _uncovered_text,
+    )
+except ImportError:
+    Message = None
+
+# A Saturday.
+NOW = datetime(2026, 10, 17, 9, 30)
+
+# (phrase, Duckling value) for a point, (phrase, (from, to)) for an interval;
+# resolved against NOW as Duckling would (future-rolling).
+GRAMMAR_CASES = [
+    ("ngày mai", "2026-10-18T00:00:00.000"),
+    ("hôm qua", "2026-10-16T00:00:00.000"),
+    ("ngày kia", "2026-10-19T00:00:00.000"),
+    ("9h sáng mai", "2026-10-18T09:00:00.000"),
+    ("3 giờ chiều", "2026-10-17T15:00:00.000"),
+    ("8h30 tối nay", "2026-10-17T20:30:00.000"),
+    ("7 giờ kém 15", "2026-10-18T06:45:00.000"),
+    ("15/11", "2026-11-15T00:00:00.000"),
+    ("20/10/2027", "2027-10-20T00:00:00.000"),
+    ("ngày 5 tháng 12", "2026-12-05T00:00:00.000"),
+    ("ngày 10", "2026-11-10T00:00:00.000"),
+    ("thứ 2", "2026-10-19T00:00:00.000"),
+    ("chủ nhật", "2026-10-18T00:00:00.000"),
+    ("sáng thứ 3", "2026-10-20T09:00:00.000"),
+    ("thứ 6 này", "2026-10-16T00:00:00.000"),
+    ("thứ 6 tuần sau", "2026-10-23T00:00:00.000"),
+    ("thứ 6 tuần sau nữa", "2026-10-30T00:00:00.000"),
+    ("next friday", "2026-10-23T00:00:00.000"),
+    ("3 ngày nữa", "2026-10-20T00:00:00.000"),
+    ("sau 2 tiếng", "2026-10-17T11:30:00.000"),
+    ("tonight", "2026-10-17T19:00:00.000"),
+    ("tuần này", ("2026-10-12T00:00:00.000", "2026-10-19T00:00:00.000")),
+    ("tuần sau", ("2026-10-19T00:00:00.000", "2026-10-26T00:00:00.000")),
+    ("tuần sau nữa", ("2026-10-26T00:00:00.000", "2026-11-02T00:00:00.000")),
+    ("tuần tới nữa", ("2026-10-26T00:00:00.000", "2026-11-02T00:00:00.000")),
+    ("tuần trước nữa", ("2026-09-28T00:00:00.000", "2026-10-05T00:00:00.000")),
+    ("tháng sau nữa", ("2026-12-01T00:00:00.000", "2027-01-01T00:00:00.000")),
+    ("năm ngoái", ("2025-01-01T00:00:00.000", "2026-01-01T00:00:00.000")),
+    ("cuối tuần", ("2026-10-17T00:00:00.000", "2026-10-19T00:00:00.000")),
+    ("next week", ("2026-10-19T00:00:00.000", "2026-10-26T00:00:00.000")),
+    ("từ 8h đến 10h sáng mai", ("2026-10-18T08:00:00.000", "2026-10-18T11:00:00.000")),
+]
+
+
+class TemporalGrammarTest(unittest.TestCase):
+    def test_rules(self):
+        for phrase, expected in GRAMMAR_CASES:
+            with self.subTest(phrase=phrase):
+                [match] = find_all(f"họp {phrase} nhé", NOW)
+                self.assertEqual(match.text, phrase)
+                value = to_duckling(match)["value"]
+                if isinstance(expected, tuple):
+                    self.assertEqual(value["type"], "interval")
+                    self.assertEqual((value["from"]["value"], value["to"]["value"]), expected)
+                else:
+                    self.assertEqual(value["type"], "value")
+                    self.assertEqual(value["value"], expected)
+
+    def test_weekday_ranges_share_one_week(self):
+        wednesday = datetime(2026, 10, 14, 10, 0)
+        cases = [
+            ("từ thứ 2 đến thứ 6", wednesday, ("2026-10-12", "2026-10-17")),
+            ("từ thứ 2 đến thứ 6 tuần này", wednesday, ("2026-10-12", "2026-10-17")),
+            ("từ thứ 2 tuần sau đến thứ 4", wednesday, ("2026-10-19", "2026-10-22")),
+            ("từ thứ 6 đến thứ 2", wednesday, ("2026-10-16", "2026-10-20")),
+            # The whole pair has passed this week: both ends roll together.
+            ("từ thứ 2 đến thứ 3", wednesday, ("2026-10-19", "2026-10-21")),
+            ("từ thứ 2 đến thứ 6", NOW, ("2026-10-19", "2026-10-24")),
+        ]
+        for phrase, now, (start, end) in cases:
+            with self.subTest(phrase=phrase, now=now):
+                [match] = find_all(f"xem task {phrase}", now)
+                self.assertEqual(match.text, phrase)
+                self.assertEqual(
+                    [value.date().isoformat() for value in match.interval], [start, end]
+                )
+
+    def test_weekday_abbreviations_need_a_date_word(self):
+        for text in ["task t2 của team", "mã t6", "gửi file cho cn"]:
+            with self.subTest(text=text):
+                self.assertEqual(find_all(text, NOW), [])
+        cases = [
+            ("họp vào t6", "t6"),
+            ("nghỉ từ t2 đến t4", "từ t2 đến t4"),
+            ("sáng t2", "sáng t2"),
+            ("cn", "cn"),
+        ]
+        for text, phrase in cases:
+            with self.subTest(text=text):
+                self.assertEqual([match.text for match in find_all(text, NOW)], [phrase])
+
+    def test_clock_only_matches_are_not_dated(self):
+        for text, dated in [("lúc 9h", False), ("2 tiếng nữa", False), ("9h sáng mai", True),
+                            ("từ 8h đến 10h", False), ("thứ 2", True)]:
+            with self.subTest(text=text):
+                [match] = find_all(text, NOW)
+                self.assertEqual(match.dated, dated)
+
+    def test_unresolvable_range_is_flagged(self):
+        matches = find_all("từ ngày mai đến hôm qua", NOW)
+        self.assertEqual([match.text for match in matches], ["ngày mai", "hôm qua"])
+        self.assertTrue(all(match.unjoined_range for match in matches))
+
+
+@unittest.skipIf(Message is None, "rasa not installed")
+class TemporalGrammarExtractorTest(unittest.TestCase):
+    def setUp(self):
+        self.extractor = TemporalGrammarExtractor(TemporalGrammarExtractor.get_default_config())
+
+    def _process(self, text):
+        message = Message(data={"text": text}, time=NOW.timestamp())
+        self.extractor.process([message])
+        return message
+
+    def test_uncovered_text(self):
+        cases = [
+            ("nhắc tôi 9h sáng mai nhé", "nhắc tôi   nhé"),
+            ("họp tuần sau nữa", "họp  "),
+            ("từ thứ 2 đến thứ 4 tuần sau", " "),
+            ("9h sáng mai, mấy giờ về?", " , mấy giờ về?"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(_uncovered_text(text, find_all(text, NOW)), expected)
+
+    def test_covered_messages_skip_duckling(self):
+        for text in ["họp tuần sau nữa", "nhắc tôi 9h sáng mai nhé", "đi chơi cuối tuần"]:
+            with self.subTest(text=text):
+                message = self._process(text)
+                self.assertTrue(message.get(GRAMMAR_COVERED_ATTRIBUTE))
+                [entity] = message.get("entities")
+                self.assertEqual(entity["entity"], "time")
+
+    def test_leftover_cue_is_left_to_duckling(self):
+        message = self._process("9h sáng mai, mấy giờ về?")
+        self.assertFalse(message.get(GRAMMAR_COVERED_ATTRIBUTE))
+        self.assertEqual(message.get("entities", []), [])
+
+    def test_unjoined_range_is_left_to_duckling(self):
+        message = self._process("xem task từ ngày mai đến hôm qua")
+        self.assertFalse(message.get(GRAMMAR_COVERED_ATTRIBUTE))
+        self.assertEqual(message.get("entities", []), [])
+
+    def test_mid_week_weekday_range_is_one_interval(self):
+        message = Message(
+            data={"text": "xem task từ thứ 2 đến thứ 6"},
+            time=datetime(2026, 10, 14, 10, 0).timestamp(),
+        )
+        self.extractor.process([message])
+        self.assertTrue(message.get(GRAMMAR_COVERED_ATTRIBUTE))
+        [entity] = message.get("entities")
+        self.assertEqual(entity["value"]["from"][:10], "2026-10-12")
+
+
+if __name__ == "__main__":
+    unittest.main()
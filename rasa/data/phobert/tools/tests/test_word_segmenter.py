@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import sys
+import unittest
+from pathlib import Path
+
+
+PHOBERT_DIR = Path(__file__).resolve().parents[2]
+RASA_DIR = PHOBERT_DIR.parents[1]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.word_segmenter import WordSegmenter, normalize_tones
+
+sys.path.insert(0, str(PHOBERT_DIR / "tools"))
+from build_segmenter_dict import read_corpus  # noqa: E402
+
+
+class WordSegmenterTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.segmenter = WordSegmenter.from_file()
+        with (PHOBERT_DIR / "train" / "intent_train.json").open("r", encoding="utf-8-sig") as f:
+            cls.rows = json.load(f)
+
+    def _mismatches(self, sentences):
+        mismatches = []
+        for words in sentences:
+            expected = " ".join(words)
+            segmented = " ".join(self.segmenter.segment(expected.replace("_", " ")))
+            if segmented != expected:
+                mismatches.append((expected, segmented))
+        return mismatches
+
+    def test_parity_with_intent_train(self):
+        # The word list is built from this split, so this only checks the build.
+        self.assertEqual(self._mismatches(row["text"].split() for row in self.rows), [])
+
+    def test_held_out_parity(self):
+        # Floors just under the measured rates (about 83% and 63% of sentences).
+        # Compounds that never occur in the train splits stay split.
+        for name, floor in (("intent_validate.json", 0.80), ("ner_validate.txt", 0.60)):
+            with self.subTest(split=name):
+                sentences = read_corpus(PHOBERT_DIR / "train" / name)
+                mismatches = self._mismatches(sentences)
+                rate = 1 - len(mismatches) / len(sentences)
+                self.assertGreaterEqual(rate, floor, mismatches[:10])
+
+    def test_raw_examples_match_vncorenlp_output(self):
+        expected = {row["text"] for row in self.rows}
+        for path in sorted((PHOBERT_DIR / "intent" / "intent_examples").glob("*.json")):
+            with path.open("r", encoding="utf-8-sig") as f:
+                sentences = json.load(f)["sentences"]
+            for sentence in sentences:
+                [segmented] = self.segmenter.word_segment(sentence)
+                self.assertIn(segmented, expected, sentence)
+
+    def test_client_compatible_results(self):
+        self.assertEqual(self.segmenter.tokenize("xóa ghi chú."), [["xoá", "ghi_chú", "."]])
+        self.assertEqual(self.segmenter.word_segment("  "), [])
+        self.assertEqual(normalize_tones("Hóa đơn của Thúy"), "Hoá đơn của Thuý")
+
+
+if __name__ == "__main__":
+    unittest.main()
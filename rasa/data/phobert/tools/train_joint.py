@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoTokenizer, get_linear_schedule_with_warmup
+
+TOOLS_DIR = Path(__file__).resolve().parent
+RASA_DIR = TOOLS_DIR.parents[2]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+from custom_components.joint_model import IGNORE_INDEX, PhobertJointModel  # noqa: E402
+from quantize_models import encode_words, extract_spans, load_ner_sentences  # noqa: E402
+
+
+DEFAULT_BASE_MODEL = "vinai/phobert-base"
+DEFAULT_INTENT_TRAIN = Path("../train/intent_train.json")
+DEFAULT_INTENT_VALIDATE = Path("../train/intent_validate.json")
+DEFAULT_NER_TRAIN = Path("../train/ner_train.txt")
+DEFAULT_NER_VALIDATE = Path("../train/ner_validate.txt")
+DEFAULT_INTENT_MAP = Path("../intent/intent.json")
+DEFAULT_OUTPUT_DIR = Path("../../model/joint_model")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Fine-tune one PhoBERT encoder with an intent head and a BIO entity "
+            "head on intent_train.json + ner_train.txt, for PhobertJointClassifier."
+        )
+    )
+    parser.add_argument(
+        "--base-model",
+        default=DEFAULT_BASE_MODEL,
+        help=f"Pretrained encoder name or path. Default: {DEFAULT_BASE_MODEL}",
+    )
+    parser.add_argument("--intent-train", default=str(DEFAULT_INTENT_TRAIN))
+    parser.add_argument("--intent-validate", default=str(DEFAULT_INTENT_VALIDATE))
+    parser.add_argument("--ner-train", default=str(DEFAULT_NER_TRAIN))
+    parser.add_argument("--ner-validate", default=str(DEFAULT_NER_VALIDATE))
+    parser.add_argument(
+        "--intent-map",
+        default=str(DEFAULT_INTENT_MAP),
+        help="id -> intent mapping; keeps intent ids aligned with intent_model.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=str(DEFAULT_OUTPUT_DIR),
+        help=f"Where the best checkpoint is saved. Default: {DEFAULT_OUTPUT_DIR}",
+    )
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--learning-rate", type=float, default=3e-5)
+    parser.add_argument("--warmup-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def configure_console_utf8() -> None:
+    for stream_name in ("stdout", "stderr"):
+        stream = getattr(sys, stream_name, None)
+        if hasattr(stream, "reconfigure"):
+            try:
+                stream.reconfigure(encoding="utf-8")
+            except Exception:
+                pass
+
+
+def resolve_path(base_dir: Path, raw_path: str) -> Path:
+    path = Path(raw_path)
+    if path.is_absolute():
+        return path.resolve()
+    return (base_dir / path).resolve()
+
+
+def load_intent_rows(path: Path) -> list[tuple[list[str], str]]:
+    with path.open("r", encoding="utf-8-sig") as file_obj:
+        payload = json.load(file_obj)
+    if not isinstance(payload, list):
+        raise ValueError(f"{path} must be a JSON list of {{text, intent}} objects.")
+    return [
+        (str(row["text"]).split(), str(row["intent"]).strip())
+        for row in payload
+        if isinstance(row, dict) and str(row.get("text", "")).strip()
+    ]
+
+
+def build_intent_labels(intent_map: Path, rows: list[tuple[list[str], str]]) -> dict[int, str]:
+    if intent_map.exists():
+        with intent_map.open("r", encoding="utf-8-sig") as file_obj:
+            payload = json.load(file_obj)
+        return {int(key): str(value).strip() for key, value in payload.items()}
+    return dict(enumerate(sorted({intent for _, intent in rows})))
+
+
+def build_ner_labels(sentences: list[tuple[list[str], list[str]]]) -> dict[int, str]:
+    entity_types = sorted(
+        {label[2:] for _, labels in sentences for label in labels if label != "O"}
+    )
+    labels = ["O"]
+    for entity_type in entity_types:
+        labels.extend([f"B-{entity_type}", f"I-{entity_type}"])
+    return dict(enumerate(labels))
+
+
+def build_examples(
+    tokenizer,
+    intent_rows: list[tuple[list[str], str]],
+    ner_sentences: list[tuple[list[str], list[str]]],
+    intent2id: dict[str, int],
+    ner2id: dict[str, int],
+) -> list[tuple[list[int], list[int], int]]:
+    """Encode both corpora the way inference does: per word, tag on first subword."""
+    examples: list[tuple[list[int], list[int], int]] = []
+    for words, intent in intent_rows:
+        if intent not in intent2id:
+            raise ValueError(f"Intent '{intent}' is missing from the intent map.")
+        input_ids, _ = encode_words(tokenizer, words)
+        examples.append((input_ids, [IGNORE_INDEX] * len(input_ids), intent2id[intent]))
+
+    for words, labels in ner_sentences:
+        input_ids, positions = encode_words(tokenizer, words)
+        tags = [IGNORE_INDEX] * len(input_ids)
+        for position, label in zip(positions, labels):
+            tags[position] = ner2id[label]
+        examples.append((input_ids, tags, IGNORE_INDEX))
+    return examples
+
+
+def collate(
+    batch: list[tuple[list[int], list[int], int]], pad_token_id: int
+) -> dict[str, torch.Tensor]:
+    width = max(len(input_ids) for input_ids, _, _ in batch)
+    input_ids = torch.full((len(batch), width), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+    ner_labels = torch.full((len(batch), width), IGNORE_INDEX, dtype=torch.long)
+    for row, (ids, tags, _) in enumerate(batch):
+        input_ids[row, : len(ids)] = torch.tensor(ids)
+        attention_mask[row, : len(ids)] = 1
+        ner_labels[row, : len(tags)] = torch.tensor(tags)
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "intent_labels": torch.tensor([intent for _, _, intent in batch]),
+        "ner_labels": ner_labels,
+    }
+
+
+def evaluate(
+    model: PhobertJointModel,
+    tokenizer,
+    device: torch.device,
+    intent_rows: list[tuple[list[str], str]],
+    ner_sentences: list[tuple[list[str], list[str]]],
+    batch_size: int,
+) -> dict[str, float]:
+    intent_id2label = {int(key): value for key, value in model.config.intent_id2label.items()}
+    ner_id2label = {int(key): value for key, value in model.config.ner_id2label.items()}
+
+    def forward(rows: list[list[str]]) -> tuple[np.ndarray, np.ndarray, list[list[int]]]:
+        encoded = [encode_words(tokenizer, words) for words in rows]
+        inputs = collate([(ids, [], 0) for ids, _ in encoded], tokenizer.pad_token_id)
+        with torch.no_grad():
+            outputs = model(
+                input_ids=inputs["input_ids"].to(device),
+                attention_mask=inputs["attention_mask"].to(device),
+            )
+        return (
+            outputs.intent_logits.argmax(dim=-1).cpu().numpy(),
+            outputs.ner_logits.argmax(dim=-1).cpu().numpy(),
+            [positions for _, positions in encoded],
+        )
+
+    model.eval()
+    correct = 0
+    for start in range(0, len(intent_rows), batch_size):
+        batch = intent_rows[start : start + batch_size]
+        intent_ids, _, _ = forward([words for words, _ in batch])
+        correct += sum(
+            intent_id2label[int(pred)] == intent for pred, (_, intent) in zip(intent_ids, batch)
+        )
+
+    true_positive = predicted_total = gold_total = 0
+    for start in range(0, len(ner_sentences), batch_size):
+        batch = ner_sentences[start : start + batch_size]
+        _, tag_ids, positions = forward([words for words, _ in batch])
+        for row, (_, gold_labels) in enumerate(batch):
+            predicted = [ner_id2label[int(tag_ids[row, pos])] for pos in positions[row]]
+            predicted.extend(["O"] * (len(gold_labels) - len(predicted)))
+            gold_spans = extract_spans(gold_labels)
+            predicted_spans = extract_spans(predicted)
+            true_positive += len(gold_spans & predicted_spans)
+            predicted_total += len(predicted_spans)
+            gold_total += len(gold_spans)
+
+    precision = true_positive / predicted_total if predicted_total else 0.0
+    recall = true_positive / gold_total if gold_total else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if true_positive else 0.0
+    return {
+        "intent_accuracy": correct / len(intent_rows) if intent_rows else 0.0,
+        "entity_f1": f1,
+    }
+
+
+def main() -> int:
+    configure_console_utf8()
+    args = parse_args()
+    paths = {
+        name: resolve_path(TOOLS_DIR, getattr(args, name))
+        for name in (
+            "intent_train",
+            "intent_validate",
+            "ner_train",
+            "ner_validate",
+            "intent_map",
+            "output_dir",
+        )
+    }
+
+    try:
+        random.seed(args.seed)
+        torch.manual_seed(args.seed)
+
+        intent_train = load_intent_rows(paths["intent_train"])
+        intent_validate = load_intent_rows(paths["intent_validate"])
+        ner_train = load_ner_sentences(paths["ner_train"])
+        ner_validate = load_ner_sentences(paths["ner_validate"])
+
+        intent_id2label = build_intent_labels(paths["intent_map"], intent_train)
+        ner_id2label = build_ner_labels([*ner_train, *ner_validate])
+
+        tokenizer = AutoTokenizer.from_pretrained(args.base_model)
+        config = AutoConfig.from_pretrained(args.base_model)
+        # Extra config attributes are serialized to config.json with the model.
+        config.intent_id2label = intent_id2label
+        config.ner_id2label = ner_id2label
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        model = PhobertJointModel.from_pretrained(args.base_model, config=config)
+        model.to(device)
+
+        examples = build_examples(
+            tokenizer,
+            intent_train,
+            ner_train,
+            {label: index for index, label in intent_id2label.items()},
+            {label: index for index, label in ner_id2label.items()},
+        )
+        steps_per_epoch = (len(examples) + args.batch_size - 1) // args.batch_size
+        total_steps = steps_per_epoch * args.epochs
+        optimizer = torch.optim.AdamW(model.parameters(), lr=args.learning_rate)
+        scheduler = get_linear_schedule_with_warmup(
+            optimizer, int(total_steps * args.warmup_ratio), total_steps
+        )
+
+        print(
+            f"Training on {len(intent_train)} intent rows + {len(ner_train)} NER sentences "
+            f"({device}, {args.epochs} epochs)."
+        )
+        best_score = -1.0
+        for epoch in range(1, args.epochs + 1):
+            model.train()
+            random.shuffle(examples)
+            total_loss = 0.0
+            for start in range(0, len(examples), args.batch_size):
+                batch = collate(examples[start : start + args.batch_size], tokenizer.pad_token_id)
+                loss = model(**{key: value.to(device) for key, value in batch.items()}).loss
+                loss.backward()
+                torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
+                optimizer.step()
+                scheduler.step()
+                optimizer.zero_grad()
+                total_loss += float(loss.item())
+
+            metrics = evaluate(
+                model, tokenizer, device, intent_validate, ner_validate, args.batch_size
+            )
+            score = metrics["intent_accuracy"] + metrics["entity_f1"]
+            print(
+                json.dumps(
+                    {"epoch": epoch, "loss": total_loss / steps_per_epoch, **metrics}
+                )
+            )
+            if score > best_score:
+                best_score = score
+                output_dir = paths["output_dir"]
+                output_dir.mkdir(parents=True, exist_ok=True)
+                model.save_pretrained(output_dir)
+                tokenizer.save_pretrained(output_dir)
+                with (output_dir / "intent_labels.json").open("w", encoding="utf-8") as file_obj:
+                    json.dump(
+                        {str(key): value for key, value in intent_id2label.items()},
+                        file_obj,
+                        ensure_ascii=False,
+                        indent=2,
+                    )
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    print(f"Saved best checkpoint to {paths['output_dir']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
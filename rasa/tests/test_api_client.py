@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+import pytest
+
+
+RASA_DIR = Path(__file__).resolve().parents[1]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+web = pytest.importorskip("aiohttp.web")
+# Importing the actions package loads every action module, hence rasa_sdk.
+pytest.importorskip("rasa_sdk")
+
+from actions.common.api_utils import (  # noqa: E402
+    ApiTimeout,
+    CircuitOpenError,
+    TaskifyApiClient,
+    api_deadline,
+)
+from actions.common.circuit_breaker import CLOSED, OPEN  # noqa: E402
+
+
+class TaskifyApiClientTest(unittest.IsolatedAsyncioTestCase):
+    """request()'s deadline budget against the per-endpoint breakers."""
+
+    async def asyncSetUp(self):
+        self.requests = 0
+        self.delay = 0.0
+        self.status = 200
+
+        async def handle(request):
+            self.requests += 1
+            await asyncio.sleep(self.delay)
+            return web.json_response({"reply": "ok"}, status=self.status)
+
+        app = web.Application()
+        app.router.add_route("*", "/api/internal/{tail:.*}", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        self.addAsyncCleanup(runner.cleanup)
+        port = site._server.sockets[0].getsockname()[1]
+
+        self.client = TaskifyApiClient(
+            base_url=f"http://127.0.0.1:{port}",
+            timeouts={"ai": 0.2, "tasks": 0.2},
+            connect_timeout=1,
+            cache_size=0,
+            breaker_failures=2,
+            breaker_cooldown=30,
+        )
+        self.addAsyncCleanup(self.client.close)
+
+    async def _fallback(self, budget):
+        @api_deadline(budget)
+        async def run():
+            return await self.client.ai_fallback("u1", "xin chào", "vi")
+
+        return await run()
+
+    async def test_read_timeouts_open_the_circuit(self):
+        # The budget covers connect + read: the read timeout fires first.
+        self.delay = 0.5
+        for _ in range(2):
+            with self.assertRaises(ApiTimeout):
+                await self._fallback(1.2)
+        self.assertEqual(self.client.breakers["ai"].state, OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            await self._fallback(1.2)
+        self.assertEqual(self.requests, 2)
+
+    async def test_budget_cut_timeouts_do_not_count(self):
+        self.delay = 0.5
+        for _ in range(3):
+            with self.assertRaises(ApiTimeout):
+                await self._fallback(0.1)
+        self.assertEqual(self.client.breakers["ai"].state, CLOSED)
+        self.assertEqual(self.requests, 3)
+
+    async def test_spent_budget_is_not_sent(self):
+        @api_deadline(0)
+        async def run():
+            return await self.client.list_tasks("u1")
+
+        with self.assertRaises(ApiTimeout):
+            await run()
+        self.assertEqual(self.requests, 0)
+
+    async def test_server_errors_count_and_client_errors_do_not(self):
+        self.status = 404
+        for _ in range(3):
+            response = await self.client.list_tasks("u1")
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.breakers["tasks"].state, CLOSED)
+
+        self.status = 503
+        for _ in range(2):
+            await self.client.list_tasks("u1")
+        self.assertEqual(self.client.breakers["tasks"].state, OPEN)
+        self.assertEqual(self.client.breakers.get("ai"), None)
+
+
+class SessionLifecycleTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TaskifyApiClient(base_url="http://127.0.0.1:9")
+
+    async def _session(self):
+        return self.client._get_session()
+
+    def test_new_loop_closes_the_superseded_session(self):
+        first = asyncio.run(self._session())
+        second = asyncio.run(self._session())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+        self.client.close_at_exit()
+        self.assertTrue(second.closed)
+
+    def test_close_at_exit_uses_the_idle_loop(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        session = loop.run_until_complete(self._session())
+        self.client.close_at_exit()
+        self.assertTrue(session.closed)
+        self.client.close_at_exit()
+
+
+if __name__ == "__main__":
+    unittest.main()
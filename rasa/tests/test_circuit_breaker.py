@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+
+RASA_DIR = Path(__file__).resolve().parents[1]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+# Importing the actions package loads every action module, hence rasa_sdk.
+pytest.importorskip("rasa_sdk")
+
+from actions.common import circuit_breaker  # noqa: E402
+from actions.common.circuit_breaker import (  # noqa: E402
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = 100.0
+        patcher = mock.patch.object(circuit_breaker.time, "monotonic", lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker("tasks", failure_threshold=3, reset_timeout=30)
+
+    def _fail(self, times):
+        for _ in range(times):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self._fail(2)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self._fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+    def test_success_resets_the_count(self):
+        self._fail(2)
+        self.breaker.record_success()
+        self._fail(2)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_release_is_no_verdict(self):
+        self._fail(2)
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self._fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_lets_one_probe_through(self):
+        self._fail(3)
+        self.clock += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        self._fail(3)
+        self.clock += 30
+        self._fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+    def test_released_probe_frees_the_slot(self):
+        self._fail(3)
+        self.clock += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
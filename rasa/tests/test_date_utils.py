@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+
+RASA_DIR = Path(__file__).resolve().parents[1]
+if str(RASA_DIR) not in sys.path:
+    sys.path.insert(0, str(RASA_DIR))
+
+# Importing the actions package loads every action module, hence rasa_sdk.
+pytest.importorskip("rasa_sdk")
+
+from actions.common.date_utils import parse_finance_date  # noqa: E402
+
+# A Saturday.
+NOW = datetime(2026, 10, 17, 9, 30)
+
+
+class FinanceDateTest(unittest.TestCase):
+    def _date(self, text):
+        parsed, had_date = parse_finance_date(text, NOW)
+        return parsed.date().isoformat() if had_date else None
+
+    def test_weekdays_resolve_to_the_latest_past_day(self):
+        cases = [
+            ("chi 50k chủ nhật", "2026-10-11"),
+            ("ăn trưa thứ sáu 40k", "2026-10-16"),
+            ("chi 30k thứ 2", "2026-10-12"),
+            ("cafe 25k thứ bảy", "2026-10-17"),
+            ("taxi 80k last saturday", "2026-10-10"),
+            ("mua sách thứ 3 tuần trước", "2026-10-06"),
+            ("thứ 5 tuần này tiêu 100k", "2026-10-15"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(self._date(text), expected)
+
+    def test_future_weekdays_are_not_dates(self):
+        for text in ["chi 50k chủ nhật tuần này", "chi 50k thứ 6 tuần sau", "lunch 40k next friday"]:
+            with self.subTest(text=text):
+                self.assertIsNone(self._date(text))
+
+    def test_weekday_this_is_the_current_week(self):
+        wednesday = datetime(2026, 10, 14, 10, 0)
+        cases = [
+            ("chi 50k thứ sáu này", None),
+            ("thứ 2 này ăn 40k", "2026-10-12"),
+            ("cafe 30k thứ tư này", "2026-10-14"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                parsed, had_date = parse_finance_date(text, wednesday)
+                self.assertEqual(parsed.date().isoformat() if had_date else None, expected)
+
+    def test_clock_times_and_codes_are_not_dates(self):
+        for text in ["chi 50k lúc 9h", "mua vé cn 200k", "chi 50k cn", "nạp thẻ t2 100k"]:
+            with self.subTest(text=text):
+                self.assertIsNone(self._date(text))
+        self.assertEqual(self._date("ăn sáng 9h hôm qua 30k"), "2026-10-16")
+        self.assertEqual(self._date("hôm cn ăn 50k"), "2026-10-11")
+
+    def test_relative_days_are_unchanged(self):
+        self.assertEqual(self._date("hôm qua ăn phở 50k"), "2026-10-16")
+        self.assertEqual(self._date("ngày 15 chi 200k"), "2026-10-15")
+
+
+if __name__ == "__main__":
+    unittest.main()